@@ -1,183 +1,464 @@
+import math
 import random
 import time
-from pieces import King, Rook, Queen, Bishop, Knight, Pawn
+from book import PolyglotBook
+from bitbase import default_bitbases
+from limits import SearchLimits, SearchStopped
+from tables import PIECE_VALUE, PHASE_WEIGHT, MAX_PHASE, PST_MG, PST_EG, ORDER_VALUE, ATTACKER_BIAS
+from tables import BISHOP_PAIR, DOUBLED_PAWN, ISOLATED_PAWN, ROOK_OPEN_FILE, ROOK_SEMI_OPEN_FILE
+from tables import KING_ATTACK_WEIGHT, KING_ATTACK_SCALE
+from attacks import AttackInfo, WHITE, BLACK
+from zobrist import SIDE_KEY
+
+# Size of the ply-indexed search tables
+MAX_PLY = 128
+# History scores saturate here (kept below capture/killer ordering bonuses)
+MAX_HISTORY = 8000
+COLOR_INDEX = {'white': 0, 'black': 1}
+# Bound of a score seen from the other side
+FLIPPED_BOUND = {'EXACT': 'EXACT', 'LOWERBOUND': 'UPPERBOUND', 'UPPERBOUND': 'LOWERBOUND'}
+# Late-move reduction table: LMR_TABLE[depth][move_index], log-log formula
+LMR_TABLE = [[0] * 64 for _ in range(64)]
+for _d in range(1, 64):
+    for _i in range(1, 64):
+        LMR_TABLE[_d][_i] = int(0.5 + math.log(_d) * math.log(_i) / 2.5)
+
+class SearchInfo:
+    # One progress report from AI.iter_search. Scores are from the AI's side;
+    # bound is 'exact', 'lower' (fail high), 'upper' (fail low), 'book' or 'none'.
+    def __init__(self, depth, score, bound, move, nodes, time_ms, pv=None):
+        self.depth = depth
+        self.score = score
+        self.bound = bound
+        self.move = move
+        self.pv = pv or ([move] if move else [])
+        self.nodes = nodes
+        self.time_ms = time_ms
+
+    def __repr__(self):
+        return f"SearchInfo(depth={self.depth}, score={self.score}, bound={self.bound!r}, move={self.move})"
+
 
 class AI:
     def __init__(self, color):
         self.color = color
         self.opponent_color = 'black' if color == 'white' else 'white'
         self.depth = 4
-        # Tapered evaluation piece-square tables (MG/EG)
-        self.pst_mg, self.pst_eg = self.initialize_piece_square_tables()
+        # Tapered evaluation piece-square tables (MG/EG), shared module-level
+        # tuples indexed [piece.code][row * 8 + col] (see tables.py)
+        self.pst_mg, self.pst_eg = PST_MG, PST_EG
         self.transposition_table = {}
-        self.zobrist_keys = self.initialize_zobrist_keys()
         self.MATE_VALUE = 1000000
-        # Move ordering helpers
-        self.history = {}
-        self.killers = {}
+        # Move ordering helpers, preallocated and indexed by integers:
+        # killers[2 * ply + slot], history[(color * 64 + from) * 64 + to],
+        # countermoves[prev_from * 64 + prev_to]
+        self.killers = [None] * (2 * MAX_PLY)
+        self.history = [0] * (2 * 64 * 64)
+        self.countermoves = [None] * (64 * 64)
         # Time management (milliseconds per move). None = unlimited
         self.time_ms = 1500
+        # Optional timeman.Clock; when set it replaces the fixed time_ms budget
+        self.clock = None
+        # Poll the clock once every N nodes
+        self.node_check_interval = 64
+        self.nodes = 0
         self._deadline = None
+        self._node_limit = float('inf')
+        self._stop_event = None
         self._aborted = False
+        # Triangular PV table: pv_table[ply] holds the line from ply onwards,
+        # valid for pv_length[ply] entries (indices ply..pv_length[ply]-1)
+        self.pv_table = [[None] * MAX_PLY for _ in range(MAX_PLY)]
+        self.pv_length = [0] * MAX_PLY
+        self.pv = []
+        self.ponder_move = None
+        self._prev_pv = []
+        self._follow_pv = False
+        # Selective pruning options (switch off or tune via these attributes)
+        self.use_null_move = True
+        self.use_rfp = True            # reverse futility / static null move pruning
+        self.rfp_depth = 3
+        self.rfp_margin = 120          # per ply of depth
+        self.use_razoring = True
+        self.razor_depth = 2
+        self.razor_margin = 300        # per ply of depth
+        self.use_futility = True       # skip quiet moves at frontier nodes
+        self.futility_depth = 2
+        self.futility_margin = 150     # per ply of depth
+        self.use_lmp = True            # late-move (move-count) pruning
+        self.lmp_depth = 3
+        self.lmp_base = 4              # quiet moves allowed = lmp_base + depth * depth
+        self.use_lmr_table = True      # log-formula reductions instead of a fixed 1 ply
+        # Initial half-width of the root aspiration window (centipawns)
+        self.aspiration_window = 50
+        # Optional Polyglot opening book (see load_book)
+        self.book = None
+        self.book_max_ply = 20
+        self.book_mode = 'weighted'  # or 'best'
+        self._book_rng = random.Random()
+        # Optional NNUE evaluation replacing evaluate_board's hand-written
+        # terms (see load_nnue); setting nnue_path loads it at the next search
+        self.nnue = None
+        self.nnue_path = None
+        # Optional analysis_cache.AnalysisCache shared across instances and
+        # sessions (answers repeat searches, seeds the transposition table)
+        self.analysis_cache = None
+        # Endgame bitbases (KQK/KRK/KPK); set to None to disable probing
+        self.bitbases = default_bitbases()
+        self._root_in_bitbase = False
+        # Score of the last fully completed iteration (from self.color's perspective)
+        self.last_score = None
+
+    def load_book(self, path, max_ply=None, mode=None):
+        self.book = PolyglotBook(path)
+        if max_ply is not None:
+            self.book_max_ply = max_ply
+        if mode is not None:
+            self.book_mode = mode
+
+    def load_nnue(self, path):
+        # Requires NumPy; the network file is memory-mapped (see nnue.py)
+        import nnue
+        self.nnue = nnue.Network(path)
+        self.nnue_path = path
+
+    def default_limits(self):
+        # Limits used when get_move is called without any: the instance's
+        # depth plus either its clock or a fixed time_ms budget
+        if self.clock is not None:
+            return SearchLimits(depth=self.depth, clock=self.clock)
+        return SearchLimits(depth=self.depth, movetime_ms=self.time_ms, early_stop=True)
+
+    def get_move(self, board, limits=None):
+        # Runs the search to completion and returns the final best move
+        # (the full principal variation is left in self.pv, its second move in self.ponder_move)
+        best_move = None
+        self.pv = []
+        for info in self.iter_search(board, limits):
+            best_move = info.move
+            self.pv = info.pv
+        self.ponder_move = self.pv[1] if len(self.pv) > 1 else None
+        return best_move
+
+    def iter_search(self, board, limits=None):
+        # Iterative deepening as a generator of SearchInfo. Every completed
+        # iteration yields an 'exact' result; aspiration fail-highs/lows yield
+        # 'lower'/'upper' bounds before the re-search. The last item's move is
+        # the move to play.
+        if limits is None:
+            limits = self.default_limits()
+        self.last_score = None
+        start = time.monotonic()
+        if self.nnue_path and (self.nnue is None or self.nnue.path != self.nnue_path):
+            self.load_nnue(self.nnue_path)
+        # Opening book moves skip the search entirely
+        if self.book is not None and not limits.searchmoves \
+                and board.ply_offset + len(board.move_history) < self.book_max_ply:
+            move = self.book.find_move(board, self.color, self.book_mode, self._book_rng)
+            if move:
+                yield SearchInfo(0, None, 'book', move, 0, 0)
+                return
 
-    def initialize_piece_square_tables(self):
-        # Midgame piece-square tables (values in centipawns)
-        pawn = [
-            [0,   0,   0,   0,   0,   0,   0,   0],
-            [50,  50,  50,  50,  50,  50,  50,  50],
-            [10,  10,  20,  30,  30,  20,  10,  10],
-            [5,   5,  10,  25,  25,  10,   5,   5],
-            [0,   0,   0,  20,  20,   0,   0,   0],
-            [5,  -5, -10,   0,   0, -10, -5,   5],
-            [5,  10,  10, -20, -20,  10, 10,   5],
-            [0,   0,   0,   0,   0,   0,  0,   0],
-        ]
-        knight = [
-            [-50, -40, -30, -30, -30, -30, -40, -50],
-            [-40, -20,   0,   0,   0,   0, -20, -40],
-            [-30,   0,  10,  15,  15,  10,   0, -30],
-            [-30,   5,  15,  20,  20,  15,   5, -30],
-            [-30,   0,  15,  20,  20,  15,   0, -30],
-            [-30,   5,  10,  15,  15,  10,   5, -30],
-            [-40, -20,   0,   5,   5,   0, -20, -40],
-            [-50, -40, -30, -30, -30, -30, -40, -50],
-        ]
-        bishop = [
-            [-20, -10, -10, -10, -10, -10, -10, -20],
-            [-10,   5,   0,   0,   0,   0,   5, -10],
-            [-10,  10,  10,  10,  10,  10,  10, -10],
-            [-10,   0,  10,  10,  10,  10,   0, -10],
-            [-10,   5,   5,  10,  10,   5,   5, -10],
-            [-10,   0,   5,  10,  10,   5,   0, -10],
-            [-10,   0,   0,   0,   0,   0,   0, -10],
-            [-20, -10, -10, -10, -10, -10, -10, -20],
-        ]
-        rook = [
-            [0,   0,  5,  10,  10,   5,   0,   0],
-            [-5,  0,  0,   0,   0,   0,   0,  -5],
-            [-5,  0,  0,   0,   0,   0,   0,  -5],
-            [-5,  0,  0,   0,   0,   0,   0,  -5],
-            [-5,  0,  0,   0,   0,   0,   0,  -5],
-            [-5,  0,  0,   0,   0,   0,   0,  -5],
-            [5,  10, 10,  10,  10,  10,  10,  5],
-            [0,   0,  0,   0,   0,   0,   0,   0],
-        ]
-        queen = [
-            [-20, -10, -10, -5, -5, -10, -10, -20],
-            [-10,   0,   5,  0,  0,   0,   0, -10],
-            [-10,   5,   5,  5,  5,   5,   0, -10],
-            [ -5,   0,   5,  5,  5,   5,   0,  -5],
-            [  0,   0,   5,  5,  5,   5,   0,  -5],
-            [-10,   5,   5,  5,  5,   5,   0, -10],
-            [-10,   0,   5,  0,  0,   0,   0, -10],
-            [-20, -10, -10, -5, -5, -10, -10, -20],
-        ]
-        king_mg = [
-            [-30, -40, -40, -50, -50, -40, -40, -30],
-            [-30, -40, -40, -50, -50, -40, -40, -30],
-            [-30, -40, -40, -50, -50, -40, -40, -30],
-            [-30, -40, -40, -50, -50, -40, -40, -30],
-            [-20, -30, -30, -40, -40, -30, -30, -20],
-            [-10, -20, -20, -20, -20, -20, -20, -10],
-            [ 20,  20,   0,   0,   0,   0,  20,  20],
-            [ 20,  30,  10,   0,   0,  10,  30,  20],
-        ]
-        # Endgame king table (centralization)
-        king_eg = [
-            [-50, -40, -30, -20, -20, -30, -40, -50],
-            [-40, -20,   0,  10,  10,   0, -20, -40],
-            [-30,  10,  20,  30,  30,  20,  10, -30],
-            [-20,  20,  40,  50,  50,  40,  20, -20],
-            [-20,  20,  40,  50,  50,  40,  20, -20],
-            [-30,  10,  20,  30,  30,  20,  10, -30],
-            [-40, -20,   0,  10,  10,   0, -20, -40],
-            [-50, -40, -30, -20, -20, -30, -40, -50],
-        ]
-
-        pst_mg = {'pawn': pawn, 'knight': knight, 'bishop': bishop, 'rook': rook, 'queen': queen, 'king': king_mg}
-        pst_eg = {'pawn': pawn, 'knight': knight, 'bishop': bishop, 'rook': rook, 'queen': queen, 'king': king_eg}
-        return pst_mg, pst_eg
-
-    def initialize_zobrist_keys(self):
-        random.seed(0)
-        zobrist = {}
-        pieces = ['pawn', 'knight', 'bishop', 'rook', 'queen', 'king']
-        colors = ['white', 'black']
-        for piece in pieces:
-            for color in colors:
-                for square in range(64):
-                    zobrist[(piece, color, square)] = random.getrandbits(64)
-        zobrist['white_to_move'] = random.getrandbits(64)
-        # Castling rights
-        for k in ['WK', 'WQ', 'BK', 'BQ']:
-            zobrist[f'castling_{k}'] = random.getrandbits(64)
-        return zobrist
-
-    def get_move(self, board):
-        # Iterative deepening at root; preserves best move each iteration
         moves = self.get_all_moves(board, self.color)
+        if limits.searchmoves:
+            moves = [m for m in moves if m in limits.searchmoves]
         if not moves:
-            return None
+            return
+        moves = self.filter_bitbase_moves(board, moves)
+        # Cached root results cover every root move, not a subset
+        analysis_cache = self.analysis_cache if not limits.searchmoves else None
 
-        best_move = moves[0]
         # Root hash with side to move
-        root_hash = self.hash_board(board)
-        if self.color == 'white':
-            root_hash ^= self.zobrist_keys['white_to_move']
+        root_hash = self.position_key(board, self.color)
+        if analysis_cache is not None:
+            cached = self.probe_analysis_cache(board, moves, root_hash, limits)
+            if cached:
+                yield cached
+                return
         tt_move = None
         entry = self.transposition_table.get(root_hash)
         if entry:
             _, _, _, tt_move = entry
 
-        # Initialize time budget
+        # Initialize time budget: the hard limit aborts the search, the soft limit
+        # decides whether another iteration is started
         self._aborted = False
-        self._deadline = (time.time() + self.time_ms / 1000.0) if self.time_ms else None
-
+        self.nodes = 0
+        self._node_limit = limits.nodes or float('inf')
+        self._stop_event = limits.stop_event
+        soft_ms, hard_ms = self.time_budget(limits)
+        self._deadline = start + hard_ms / 1000.0 if hard_ms else None
+
+        reported = []
+        self._prev_pv = []
+        # Age ordering statistics from earlier searches; killers are position specific
+        self.history = [h // 2 for h in self.history]
+        self.killers = [None] * (2 * MAX_PLY)
+
+        def info(depth, score, bound, move):
+            reported.append(move)
+            pv = self.root_pv()
+            if not pv or pv[0] != move:
+                pv = [move]
+            pv = self.extend_pv_from_tt(board, pv, depth)
+            return SearchInfo(depth, score, bound, move, self.nodes, int((time.monotonic() - start) * 1000), pv)
+
+        best_move = tt_move if tt_move in moves else None
+        stable = 0
         prev_score = 0
-        for depth in range(1, self.depth + 1):
-            alpha = float('-inf')
-            beta = float('inf')
-            best_score = float('-inf')
-            # Simple aspiration window around previous iteration score
-            if depth > 1:
-                window = 50
-                alpha = prev_score - window
-                beta = prev_score + window
-            for move in self.order_moves(moves, board, tt_move=tt_move, depth=depth):
-                if self._deadline and time.time() >= self._deadline:
-                    self._aborted = True
+        completed_depth = 0
+        for depth in range(1, limits.max_depth() + 1):
+            # Aspiration window around the previous score, widened on each fail
+            delta = self.aspiration_window
+            if depth > 1 and abs(prev_score) < self.MATE_VALUE // 2:
+                alpha, beta = prev_score - delta, prev_score + delta
+            else:
+                alpha, beta = float('-inf'), float('inf')
+            while True:
+                score, move = self.search_root(board, moves, depth, alpha, beta, tt_move)
+                if self._aborted:
                     break
-                board.make_move(*move[0], *move[1], switch_turn=False, validate=False)
-                try:
-                    score = self.alpha_beta(board, depth - 1, alpha, beta, False)
-                except TimeoutError:
-                    self._aborted = True
-                    score = float('-inf')
-                finally:
-                    board.unmake_move(switch_turn=False)
-                if score > best_score:
-                    best_score = score
-                    best_move = move
-                if score > alpha:
-                    alpha = score
-                if beta <= alpha or self._aborted:
+                if score <= alpha:
+                    # Fail low: keep the current best move, open the window downwards
+                    yield info(depth, score, 'upper', best_move or moves[0])
+                    beta = (alpha + beta) / 2
+                    alpha = score - delta if delta < 1000 else float('-inf')
+                elif score >= beta:
+                    # Fail high: the refuting move is searched first next time
+                    best_move = tt_move = move
+                    yield info(depth, score, 'lower', move)
+                    beta = score + delta if delta < 1000 else float('inf')
+                else:
                     break
-            tt_move = best_move
-            prev_score = best_score
+                delta *= 2
+
             if self._aborted:
+                # A partial pass only counts if some move beat the window's alpha;
+                # the previous best is searched first, so that move is an improvement
+                if move is not None and move != best_move:
+                    best_move = move
+                    yield info(depth, score, 'lower', move)
                 break
 
-        return best_move
+            stable = stable + 1 if move == best_move else 0
+            dropped = depth > 1 and score < prev_score - 30
+            best_move = tt_move = move
+            prev_score = score
+            completed_depth = depth
+            self.last_score = score
+            # The completed line seeds move ordering of the next iteration
+            self._prev_pv = self.root_pv()
+            yield info(depth, score, 'exact', move)
+
+            if limits.mate and score >= self.MATE_VALUE:
+                break
+            if soft_ms:
+                # Stop early on a stable best move, extend when the score drops
+                scale = max(0.5, 1.0 - 0.1 * stable)
+                if dropped:
+                    scale *= 2.0
+                if (time.monotonic() - start) * 1000 >= soft_ms * scale:
+                    break
+
+        if analysis_cache is not None and completed_depth and self.history_independent(board):
+            self.store_analysis(board, moves, root_hash, completed_depth, prev_score, best_move)
+
+        if not reported or reported[-1] != (best_move or moves[0]):
+            # Stopped before the final choice was reported (e.g. during depth 1)
+            yield info(0, None, 'none', best_move or moves[0])
 
-    def alpha_beta(self, board, depth, alpha, beta, is_maximizing):
+    def white_view(self, bound, score):
+        # Converts between this engine's scores (self.color's side) and the
+        # analysis cache's (White's); the conversion is its own inverse
+        if self.color == 'white':
+            return bound, score
+        return FLIPPED_BOUND[bound], -score
+
+    def child_keys(self, board, moves):
+        # Position key after each root move -> move
+        keys = {}
+        for move in moves:
+            board.make_move(*move[0], *move[1], switch_turn=False, validate=False)
+            keys[self.position_key(board, self.opponent_color)] = move
+            board.unmake_move(switch_turn=False)
+        return keys
+
+    def history_independent(self, board):
+        # The analysis cache key has no halfmove clock or history. Only right
+        # after a capture or pawn move can neither matter: is_repetition
+        # matches any earlier position since then, even one before the root.
+        return board.halfmove_clock == 0
+
+    def probe_analysis_cache(self, board, moves, root_hash, limits):
+        # Copies cached root and child results into the transposition table.
+        # Returns a SearchInfo when the root holds an exact result at least
+        # as deep as the limits ask for and the position's history cannot
+        # change it, so no search is needed.
+        found = self.analysis_cache.get_many([root_hash, *self.child_keys(board, moves)])
+        for key, (depth, bound, score, move) in found.items():
+            entry = self.transposition_table.get(key)
+            if entry is None or entry[0] < depth:
+                bound, score = self.white_view(bound, score)
+                self.transposition_table[key] = (depth, bound, score, move)
+        root = found.get(root_hash)
+        if root is None or root[3] not in moves or not self.history_independent(board):
+            return None
+        depth, bound, score, move = root
+        if bound != 'EXACT' or depth < limits.max_depth() or limits.mate or limits.infinite:
+            return None
+        _, score = self.white_view(bound, score)
+        self.last_score = score
+        pv = self.extend_pv_from_tt(board, [move], depth)
+        return SearchInfo(depth, score, 'exact', move, 0, 0, pv)
+
+    def store_analysis(self, board, moves, root_hash, depth, score, move):
+        # Root result of the last completed iteration plus the transposition
+        # table's entries for the positions after each root move
+        bound, white_score = self.white_view('EXACT', score)
+        entries = [(root_hash, depth, bound, white_score, move)]
+        for key in self.child_keys(board, moves):
+            entry = self.transposition_table.get(key)
+            if entry and entry[0] > 0 and abs(entry[2]) != float('inf'):
+                child_depth, bound, child_score, child_move = entry
+                bound, child_score = self.white_view(bound, child_score)
+                entries.append((key, child_depth, bound, child_score, child_move))
+        self.analysis_cache.put_many(entries)
+
+    def search_root(self, board, moves, depth, alpha, beta, tt_move):
+        # Fail-soft root search. Returns (score, move); move is None unless some
+        # move scored above alpha. Sets self._aborted when a limit is hit.
+        best_score = float('-inf')
+        best_move = None
+        self._follow_pv = bool(self._prev_pv)
+        for move in self.order_moves(moves, board, tt_move=tt_move, ply=0):
+            self._follow_pv = self._follow_pv and move == self._prev_pv[0]
+            board.make_move(*move[0], *move[1], switch_turn=False, validate=False)
+            try:
+                score = self.alpha_beta(board, depth - 1, alpha, beta, False, 1)
+            except SearchStopped:
+                self._aborted = True
+            finally:
+                board.unmake_move(switch_turn=False)
+            if self._aborted:
+                break
+            if score > best_score:
+                best_score = score
+            self._follow_pv = False
+            if score > alpha:
+                alpha = score
+                best_move = move
+                self.update_pv(0, move)
+                if alpha >= beta:
+                    break
+        return best_score, best_move
+
+    def update_pv(self, ply, move):
+        # New best move at ply: the line is the move followed by the child's line
+        row = self.pv_table[ply]
+        row[ply] = move
+        child = ply + 1
+        length = self.pv_length[child] if child < MAX_PLY else child
+        row[child:length] = self.pv_table[child][child:length]
+        self.pv_length[ply] = length
+
+    def root_pv(self):
+        return [m for m in self.pv_table[0][:self.pv_length[0]] if m]
+
+    def extend_pv_from_tt(self, board, pv, depth):
+        # TT cutoffs truncate the triangular PV; follow stored best moves to fill it up
+        line = list(pv)
+        played = 0
+        color = self.color
+        try:
+            for move in pv:
+                board.make_move(*move[0], *move[1], switch_turn=False, validate=False)
+                played += 1
+                color = 'black' if color == 'white' else 'white'
+            while len(line) < depth:
+                h = self.position_key(board, color)
+                entry = self.transposition_table.get(h)
+                move = entry[3] if entry else None
+                if not move or move not in self.get_all_moves(board, color):
+                    break
+                board.make_move(*move[0], *move[1], switch_turn=False, validate=False)
+                played += 1
+                line.append(move)
+                color = 'black' if color == 'white' else 'white'
+        finally:
+            for _ in range(played):
+                board.unmake_move(switch_turn=False)
+        return line
+
+    def time_budget(self, limits):
+        # (soft_ms, hard_ms) for this move; None means no such limit
+        if limits.infinite:
+            return None, None
+        if limits.movetime_ms:
+            return (limits.movetime_ms if limits.early_stop else None), limits.movetime_ms
+        if limits.clock is not None:
+            return limits.clock.allocate()
+        return None, None
+
+    def check_limits(self):
+        # Called once per node: exact node limit, periodic clock/stop polling
+        self.nodes += 1
+        if self.nodes >= self._node_limit:
+            raise SearchStopped()
+        if not self.nodes % self.node_check_interval:
+            if self._deadline and time.monotonic() >= self._deadline:
+                raise SearchStopped()
+            if self._stop_event is not None and self._stop_event.is_set():
+                raise SearchStopped()
+
+    def filter_bitbase_moves(self, board, moves):
+        # At the root of a bitbase ending keep only moves that preserve the result
+        self._root_in_bitbase = False
+        if not self.bitbases:
+            return moves
+        root = self.bitbases.probe(board, self.color)
+        if root is None:
+            return moves
+        self._root_in_bitbase = True
+        strong, win = root[0], root[1]
+        keep = []
+        for move in moves:
+            board.make_move(*move[0], *move[1], switch_turn=False, validate=False)
+            after = self.bitbases.probe(board, self.opponent_color)
+            board.unmake_move(switch_turn=False)
+            won_after = after is not None and after[1]
+            if strong == self.color and win:
+                # Promotions leave KPK for KQK, which is still probed
+                if won_after:
+                    keep.append(move)
+            elif strong != self.color and not win:
+                if not won_after:
+                    keep.append(move)
+            else:
+                return moves
+        return keep or moves
+
+    def alpha_beta(self, board, depth, alpha, beta, is_maximizing, ply=1):
         color_to_move = self.color if is_maximizing else self.opponent_color
-        board_hash = self.hash_board(board)
-        if color_to_move == 'white':
-            board_hash ^= self.zobrist_keys['white_to_move']
+        board_hash = self.position_key(board, color_to_move)
+
+        # Node/time/stop limits
+        self.check_limits()
+        if ply < MAX_PLY:
+            self.pv_length[ply] = ply
+
+        # Draws by repetition (a single repeat inside the tree is enough),
+        # the fifty-move rule or insufficient material
+        if board.is_repetition() or board.is_fifty_move_draw() or board.is_insufficient_material():
+            return 0
 
-        # Time check
-        if self._deadline and time.time() >= self._deadline:
-            raise TimeoutError()
+        # Bitbase cut. When the root is already inside a won ending, wins are only
+        # cut at the horizon so the search still looks for mate and progress;
+        # won positions with the loser in check are searched so mates are found.
+        if self.bitbases:
+            bb_score = self.bitbases.score(board, color_to_move)
+            if bb_score is not None and (bb_score == 0 or depth <= 0 or not self._root_in_bitbase) \
+                    and not (bb_score and board.is_in_check(color_to_move)):
+                return bb_score if self.color == 'white' else -bb_score
 
         entry = self.transposition_table.get(board_hash)
         if entry and entry[0] >= depth:
@@ -191,74 +472,130 @@ class AI:
             if alpha >= beta:
                 return tt_value
 
-        if depth == 0:
+        if depth <= 0:
             return self.qsearch(board, alpha, beta, is_maximizing)
 
-        # Null-move pruning (skip if in check)
-        if depth >= 3 and not board.is_in_check(color_to_move):
+        in_check = board.is_in_check(color_to_move)
+        # Zero-window nodes are not on the principal variation
+        pv_node = beta - alpha > 1
+        mate_bound = self.MATE_VALUE // 2
+
+        # Static evaluation for the depth-based forward pruning below (self.color's view)
+        static = None
+        if not in_check and depth <= max(self.rfp_depth, self.razor_depth, self.futility_depth) \
+                and abs(alpha) < mate_bound and abs(beta) < mate_bound:
+            static = self.evaluate_board(board)
+
+        if static is not None and not pv_node:
+            # Reverse futility pruning: far above beta even after a margin
+            if self.use_rfp and depth <= self.rfp_depth:
+                margin = self.rfp_margin * depth
+                if is_maximizing and static - margin >= beta:
+                    return static - margin
+                if not is_maximizing and static + margin <= alpha:
+                    return static + margin
+            # Razoring: hopeless positions drop straight into quiescence
+            if self.use_razoring and depth <= self.razor_depth:
+                margin = self.razor_margin * depth
+                if is_maximizing and static + margin <= alpha:
+                    value = self.qsearch(board, alpha, beta, True)
+                    if value <= alpha:
+                        return value
+                if not is_maximizing and static - margin >= beta:
+                    value = self.qsearch(board, alpha, beta, False)
+                    if value >= beta:
+                        return value
+
+        # Null-move pruning (skip if in check, and in king-and-pawn positions where zugzwang is common)
+        if self.use_null_move and depth >= 3 and not in_check and self.has_non_pawn_material(board, color_to_move):
             R = 2 + (depth // 6)
-            if is_maximizing:
-                val = self.alpha_beta(board, depth - 1 - R, alpha, beta, False)
-                if val >= beta:
-                    return val
-            else:
-                val = self.alpha_beta(board, depth - 1 - R, alpha, beta, True)
-                if val <= alpha:
-                    return val
+            following, self._follow_pv = self._follow_pv, False
+            # The null move passes the turn without a board move: a placeholder
+            # key keeps every second history entry on the same side to move,
+            # and a cleared halfmove clock ends repetition scans at the null move
+            halfmove_clock, board.halfmove_clock = board.halfmove_clock, 0
+            board.key_history.append(None)
+            try:
+                val = self.alpha_beta(board, depth - 1 - R, alpha, beta, not is_maximizing, ply + 1)
+            finally:
+                board.key_history.pop()
+                board.halfmove_clock = halfmove_clock
+                self._follow_pv = following
+            if val >= beta if is_maximizing else val <= alpha:
+                return val
 
         moves = self.get_all_moves(board, color_to_move)
         if not moves:
-            if board.is_in_check(color_to_move):
+            if in_check:
                 # Checkmate: current side to move is mated
                 return -self.MATE_VALUE if is_maximizing else self.MATE_VALUE
             # Stalemate
             return 0
 
+        # Futility pruning: at frontier nodes whose static eval cannot reach the
+        # window, quiet moves that do not give check are skipped
+        futile = False
+        if self.use_futility and static is not None and depth <= self.futility_depth:
+            margin = self.futility_margin * depth
+            futile = static + margin <= alpha if is_maximizing else static - margin >= beta
+        # Late-move pruning: only the first few quiet moves at shallow depth
+        lmp_limit = None
+        if self.use_lmp and not pv_node and not in_check and depth <= self.lmp_depth:
+            lmp_limit = self.lmp_base + depth * depth
+        opponent = self.opponent_color if is_maximizing else self.color
+
         tt_move = entry[3] if entry else None
+        # While on the previous iteration's PV, its move here is tried first
+        if self._follow_pv:
+            if ply < len(self._prev_pv) and self._prev_pv[ply] in moves:
+                tt_move = self._prev_pv[ply]
+            else:
+                self._follow_pv = False
         a0, b0 = alpha, beta
         best_move = None
 
         if is_maximizing:
             best_value = float('-inf')
             first = True
-            ordered = self.order_moves(moves, board, tt_move=tt_move, depth=depth)
+            ordered = self.order_moves(moves, board, tt_move=tt_move, ply=ply)
             for idx, move in enumerate(ordered):
                 (sr, sc), (er, ec) = move
                 target = board.get_piece(er, ec)
+                quiet = not target and not (board.get_piece(sr, sc).name == 'pawn' and er in (0, 7))
                 board.make_move(sr, sc, er, ec, switch_turn=False, validate=False)
+                if not first and quiet and (futile or (lmp_limit is not None and idx >= lmp_limit)) \
+                        and not board.is_in_check(opponent):
+                    board.unmake_move(switch_turn=False)
+                    continue
                 try:
                     if first:
-                        value = self.alpha_beta(board, depth - 1, alpha, beta, False)
+                        value = self.alpha_beta(board, depth - 1, alpha, beta, False, ply + 1)
                         first = False
                     else:
                         # Late Move Reductions for late quiet moves
-                        reduced = 0
-                        if depth >= 3 and idx > 3 and not target:
-                            reduced = 1
+                        reduced = self.lmr_reduction(depth, idx) if quiet and not in_check else 0
                         # Principal Variation Search (zero-window)
-                        value = self.alpha_beta(board, depth - 1 - reduced, alpha, alpha + 1, False)
+                        value = self.alpha_beta(board, depth - 1 - reduced, alpha, alpha + 1, False, ply + 1)
                         if value > alpha and value < beta and reduced:
-                            value = self.alpha_beta(board, depth - 1, alpha, alpha + 1, False)
+                            value = self.alpha_beta(board, depth - 1, alpha, alpha + 1, False, ply + 1)
                         if value > alpha and value < beta:
-                            value = self.alpha_beta(board, depth - 1, alpha, beta, False)
+                            value = self.alpha_beta(board, depth - 1, alpha, beta, False, ply + 1)
                 finally:
                     board.unmake_move(switch_turn=False)
+                self._follow_pv = False
                 if value > best_value:
                     best_value = value
                     best_move = move
                 if value > alpha:
                     alpha = value
+                    self.update_pv(ply, move)
                     # History heuristic: reward quiet PV moves
                     if not target:
-                        self.history[(sr, sc, er, ec)] = self.history.get((sr, sc, er, ec), 0) + depth * depth
+                        self.update_history(color_to_move, sr, sc, er, ec, depth * depth)
                 if alpha >= beta:
-                    # Killer heuristic: record quiet beta-cutoff moves
+                    # Killer/countermove heuristics: record quiet beta-cutoff moves
                     if not target:
-                        km = self.killers.get(depth, [])
-                        if not km:
-                            self.killers[depth] = [move]
-                        elif move != km[0]:
-                            self.killers[depth] = [move, km[0]]
+                        self.store_quiet_cutoff(board, move, ply)
                     break
             flag = 'EXACT'
             if best_value <= a0:
@@ -270,40 +607,41 @@ class AI:
         else:
             best_value = float('inf')
             first = True
-            ordered = self.order_moves(moves, board, tt_move=tt_move, depth=depth)
+            ordered = self.order_moves(moves, board, tt_move=tt_move, ply=ply)
             for idx, move in enumerate(ordered):
                 (sr, sc), (er, ec) = move
                 target = board.get_piece(er, ec)
+                quiet = not target and not (board.get_piece(sr, sc).name == 'pawn' and er in (0, 7))
                 board.make_move(sr, sc, er, ec, switch_turn=False, validate=False)
+                if not first and quiet and (futile or (lmp_limit is not None and idx >= lmp_limit)) \
+                        and not board.is_in_check(opponent):
+                    board.unmake_move(switch_turn=False)
+                    continue
                 try:
                     if first:
-                        value = self.alpha_beta(board, depth - 1, alpha, beta, True)
+                        value = self.alpha_beta(board, depth - 1, alpha, beta, True, ply + 1)
                         first = False
                     else:
-                        reduced = 0
-                        if depth >= 3 and idx > 3 and not target:
-                            reduced = 1
-                        value = self.alpha_beta(board, depth - 1 - reduced, beta - 1, beta, True)
+                        reduced = self.lmr_reduction(depth, idx) if quiet and not in_check else 0
+                        value = self.alpha_beta(board, depth - 1 - reduced, beta - 1, beta, True, ply + 1)
                         if value < beta and value > alpha and reduced:
-                            value = self.alpha_beta(board, depth - 1, beta - 1, beta, True)
+                            value = self.alpha_beta(board, depth - 1, beta - 1, beta, True, ply + 1)
                         if value < beta and value > alpha:
-                            value = self.alpha_beta(board, depth - 1, alpha, beta, True)
+                            value = self.alpha_beta(board, depth - 1, alpha, beta, True, ply + 1)
                 finally:
                     board.unmake_move(switch_turn=False)
+                self._follow_pv = False
                 if value < best_value:
                     best_value = value
                     best_move = move
                 if value < beta:
                     beta = value
+                    self.update_pv(ply, move)
                     if not target:
-                        self.history[(sr, sc, er, ec)] = self.history.get((sr, sc, er, ec), 0) + depth * depth
+                        self.update_history(color_to_move, sr, sc, er, ec, depth * depth)
                 if alpha >= beta:
                     if not target:
-                        km = self.killers.get(depth, [])
-                        if not km:
-                            self.killers[depth] = [move]
-                        elif move != km[0]:
-                            self.killers[depth] = [move, km[0]]
+                        self.store_quiet_cutoff(board, move, ply)
                     break
             flag = 'EXACT'
             if best_value >= b0:
@@ -313,34 +651,44 @@ class AI:
             self.transposition_table[board_hash] = (depth, flag, best_value, best_move)
             return best_value
 
+    def lmr_reduction(self, depth, idx):
+        if depth < 3 or idx <= 3:
+            return 0
+        if not self.use_lmr_table:
+            return 1
+        # Always leave at least one ply for the reduced search
+        return max(0, min(LMR_TABLE[min(depth, 63)][min(idx, 63)], depth - 2))
+
+    def update_history(self, color, sr, sc, er, ec, bonus):
+        # History gravity: entries move towards +/-MAX_HISTORY and never overflow it
+        i = (COLOR_INDEX[color] * 64 + sr * 8 + sc) * 64 + er * 8 + ec
+        h = self.history[i]
+        self.history[i] = h + bonus - h * abs(bonus) // MAX_HISTORY
+
+    def store_quiet_cutoff(self, board, move, ply):
+        # Killers per ply (two slots) and the reply to the opponent's last move
+        if ply < MAX_PLY and move != self.killers[2 * ply]:
+            self.killers[2 * ply + 1] = self.killers[2 * ply]
+            self.killers[2 * ply] = move
+        if board.move_history:
+            last = board.move_history[-1]
+            (pr, pc), (qr, qc) = last['start_pos'], last['end_pos']
+            self.countermoves[(pr * 8 + pc) * 64 + qr * 8 + qc] = move
+
+    def has_non_pawn_material(self, board, color):
+        for row in board.board:
+            for piece in row:
+                if piece and piece.color == color and piece.name not in ('pawn', 'king'):
+                    return True
+        return False
+
     def hash_board(self, board):
-        h = 0
-        for row in range(8):
-            for col in range(8):
-                piece = board.get_piece(row, col)
-                if piece:
-                    square = row * 8 + col
-                    h ^= self.zobrist_keys.get((piece.name, piece.color, square), 0)
-        # Approximate castling rights from piece.has_moved flags at start squares
-        # White
-        wk = board.get_piece(7, 4)
-        wr_a = board.get_piece(7, 0)
-        wr_h = board.get_piece(7, 7)
-        if isinstance(wk, King) and not wk.has_moved:
-            if isinstance(wr_h, Rook) and not wr_h.has_moved:
-                h ^= self.zobrist_keys['castling_WK']
-            if isinstance(wr_a, Rook) and not wr_a.has_moved:
-                h ^= self.zobrist_keys['castling_WQ']
-        # Black
-        bk = board.get_piece(0, 4)
-        br_a = board.get_piece(0, 0)
-        br_h = board.get_piece(0, 7)
-        if isinstance(bk, King) and not bk.has_moved:
-            if isinstance(br_h, Rook) and not br_h.has_moved:
-                h ^= self.zobrist_keys['castling_BK']
-            if isinstance(br_a, Rook) and not br_a.has_moved:
-                h ^= self.zobrist_keys['castling_BQ']
-        return h
+        # Placement + castling rights, maintained incrementally by Board
+        return board.hash
+
+    def position_key(self, board, color_to_move):
+        # Transposition table key: board hash plus side to move
+        return board.hash ^ SIDE_KEY if color_to_move == 'white' else board.hash
 
     def get_all_moves(self, board, color):
         moves = []
@@ -350,15 +698,17 @@ class AI:
                 moves.append((start, end))
         return moves
 
-    def order_moves(self, moves, board, tt_move=None, depth=None):
-        piece_value = {
-            'pawn': 100,
-            'knight': 320,
-            'bishop': 330,
-            'rook': 500,
-            'queen': 900,
-            'king': 20000
-        }
+    def order_moves(self, moves, board, tt_move=None, ply=None):
+        # Quiet-move heuristics only apply inside the main search (ply given)
+        killer1 = killer2 = counter = None
+        history = self.history
+        if ply is not None and ply < MAX_PLY:
+            killer1 = self.killers[2 * ply]
+            killer2 = self.killers[2 * ply + 1]
+            if board.move_history:
+                last = board.move_history[-1]
+                (pr, pc), (qr, qc) = last['start_pos'], last['end_pos']
+                counter = self.countermoves[(pr * 8 + pc) * 64 + qr * 8 + qc]
 
         def mvv_lva_score(move):
             (sr, sc), (er, ec) = move
@@ -366,28 +716,21 @@ class AI:
             target = board.get_piece(er, ec)
             capture_bonus = 0
             if target:
-                capture_bonus = 10000 + piece_value.get(target.name, 0) - 0.1 * piece_value.get(attacker.name, 0)
+                capture_bonus = 10000 + ORDER_VALUE[target.index] - 0.1 * ORDER_VALUE[attacker.index]
             # Small preference by attacker mobility order (encourage forcing moves first)
-            attacker_bias = {
-                'queen': 6,
-                'rook': 5,
-                'bishop': 3,
-                'knight': 3,
-                'pawn': 1,
-                'king': 0,
-            }.get(attacker.name, 0)
+            attacker_bias = ATTACKER_BIAS[attacker.index]
             tt_bonus = 500000 if tt_move and move == tt_move else 0
-            # Killer/history for quiet moves
+            # Killer/countermove/history for quiet moves
             killer_bonus = 0
             hist_bonus = 0
-            if not target and depth is not None:
-                killers = self.killers.get(depth, [])
-                if killers:
-                    if move == killers[0]:
-                        killer_bonus = 30000
-                    elif len(killers) > 1 and move == killers[1]:
-                        killer_bonus = 20000
-                hist_bonus = self.history.get((sr, sc, er, ec), 0)
+            if not target and ply is not None:
+                if move == killer1:
+                    killer_bonus = 30000
+                elif move == killer2:
+                    killer_bonus = 20000
+                elif move == counter:
+                    killer_bonus = 9000
+                hist_bonus = history[(COLOR_INDEX[attacker.color] * 64 + sr * 8 + sc) * 64 + er * 8 + ec]
             return tt_bonus + capture_bonus + killer_bonus + hist_bonus + attacker_bias
 
         return sorted(moves, key=mvv_lva_score, reverse=True)
@@ -403,9 +746,8 @@ class AI:
         return captures
 
     def qsearch(self, board, alpha, beta, is_maximizing):
-        # Time check
-        if self._deadline and time.time() >= self._deadline:
-            raise TimeoutError()
+        # Node/time/stop limits
+        self.check_limits()
         # Static evaluation as stand-pat
         stand_pat = self.evaluate_board(board)
         if is_maximizing:
@@ -414,7 +756,7 @@ class AI:
             if alpha < stand_pat:
                 alpha = stand_pat
             moves = self.get_all_captures(board, self.color)
-            for move in self.order_moves(moves, board, depth=0):
+            for move in self.order_moves(moves, board):
                 board.make_move(*move[0], *move[1], switch_turn=False, validate=False)
                 try:
                     score = self.qsearch(board, alpha, beta, False)
@@ -431,7 +773,7 @@ class AI:
             if beta > stand_pat:
                 beta = stand_pat
             moves = self.get_all_captures(board, self.opponent_color)
-            for move in self.order_moves(moves, board, depth=0):
+            for move in self.order_moves(moves, board):
                 board.make_move(*move[0], *move[1], switch_turn=False, validate=False)
                 try:
                     score = self.qsearch(board, alpha, beta, True)
@@ -444,9 +786,10 @@ class AI:
             return beta
 
     def evaluate_board(self, board):
-        # Material values (centipawns)
-        PV = {'pawn': 100, 'knight': 320, 'bishop': 330, 'rook': 500, 'queen': 900, 'king': 0}
-
+        if self.nnue is not None:
+            return self.evaluate_nnue(board)
+        pst_mg = self.pst_mg
+        pst_eg = self.pst_eg
         mg_white = 0
         mg_black = 0
         eg_white = 0
@@ -457,6 +800,8 @@ class AI:
         bishop_count = {'white': 0, 'black': 0}
         rook_squares = {'white': [], 'black': []}
         king_pos = {'white': None, 'black': None}
+        # Game phase based on remaining non-pawn material (MAX_PHASE at the start)
+        phase = 0
 
         # Scan board once
         for r in range(8):
@@ -467,15 +812,13 @@ class AI:
                     continue
                 name = piece.name
                 color = piece.color
-                val = PV.get(name, 0)
+                val = PIECE_VALUE[piece.index]
+                phase += PHASE_WEIGHT[piece.index]
 
-                # PST: white uses table as-is, black mirrored vertically
-                if color == 'white':
-                    mg = val + self.pst_mg[name][r][c]
-                    eg = val + self.pst_eg[name][r][c]
-                else:
-                    mg = val + self.pst_mg[name][7 - r][c]
-                    eg = val + self.pst_eg[name][7 - r][c]
+                # Material + PST (black's tables are pre-mirrored)
+                sq = r * 8 + c
+                mg = val + pst_mg[piece.code][sq]
+                eg = val + pst_eg[piece.code][sq]
 
                 if color == 'white':
                     mg_white += mg
@@ -498,31 +841,31 @@ class AI:
 
         # Bishop pair bonus
         if bishop_count['white'] >= 2:
-            mg_white += 30
-            eg_white += 40
+            mg_white += BISHOP_PAIR[0]
+            eg_white += BISHOP_PAIR[1]
         if bishop_count['black'] >= 2:
-            mg_black += 30
-            eg_black += 40
+            mg_black += BISHOP_PAIR[0]
+            eg_black += BISHOP_PAIR[1]
 
         # Pawn structure: doubled and isolated
         for file in range(8):
             w_count = pawns_file_white[file]
             b_count = pawns_file_black[file]
             if w_count > 1:
-                mg_white -= 20 * (w_count - 1)
-                eg_white -= 10 * (w_count - 1)
+                mg_white -= DOUBLED_PAWN[0] * (w_count - 1)
+                eg_white -= DOUBLED_PAWN[1] * (w_count - 1)
             if b_count > 1:
-                mg_black -= 20 * (b_count - 1)
-                eg_black -= 10 * (b_count - 1)
+                mg_black -= DOUBLED_PAWN[0] * (b_count - 1)
+                eg_black -= DOUBLED_PAWN[1] * (b_count - 1)
             # Isolated: no friendly pawns on adjacent files
             w_adj = (pawns_file_white[file - 1] if file - 1 >= 0 else 0) + (pawns_file_white[file + 1] if file + 1 <= 7 else 0)
             b_adj = (pawns_file_black[file - 1] if file - 1 >= 0 else 0) + (pawns_file_black[file + 1] if file + 1 <= 7 else 0)
             if w_count > 0 and w_adj == 0:
-                mg_white -= 15
-                eg_white -= 10
+                mg_white -= ISOLATED_PAWN[0]
+                eg_white -= ISOLATED_PAWN[1]
             if b_count > 0 and b_adj == 0:
-                mg_black -= 15
-                eg_black -= 10
+                mg_black -= ISOLATED_PAWN[0]
+                eg_black -= ISOLATED_PAWN[1]
 
         # Passed pawns (simple): no enemy pawns on same/adjacent files ahead
         def passed_bonus(color, r, c):
@@ -555,14 +898,14 @@ class AI:
         # Rooks on open/semi-open files
         for (r, c) in rook_squares['white']:
             if pawns_file_white[c] == 0 and pawns_file_black[c] == 0:
-                mg_white += 20; eg_white += 15
+                mg_white += ROOK_OPEN_FILE[0]; eg_white += ROOK_OPEN_FILE[1]
             elif pawns_file_white[c] == 0:
-                mg_white += 10; eg_white += 8
+                mg_white += ROOK_SEMI_OPEN_FILE[0]; eg_white += ROOK_SEMI_OPEN_FILE[1]
         for (r, c) in rook_squares['black']:
             if pawns_file_black[c] == 0 and pawns_file_white[c] == 0:
-                mg_black += 20; eg_black += 15
+                mg_black += ROOK_OPEN_FILE[0]; eg_black += ROOK_OPEN_FILE[1]
             elif pawns_file_black[c] == 0:
-                mg_black += 10; eg_black += 8
+                mg_black += ROOK_SEMI_OPEN_FILE[0]; eg_black += ROOK_SEMI_OPEN_FILE[1]
 
         # King safety: pawn shield (home files)
         def pawn_shield(color, king_pos):
@@ -599,59 +942,67 @@ class AI:
                 else:
                     mg_black += 5
 
-        # Very light mobility (costly, so apply small weight)
-        def mobility(color):
-            total = 0
-            for row, col, pc in board.get_all_pieces(color):
-                if pc.name in ('bishop', 'rook', 'queen', 'knight'):
-                    total += len(board.generate_pseudolegal_moves_from_square(row, col))
-            return total
-
-        mob_w = mobility('white')
-        mob_b = mobility('black')
-        mg_white += mob_w // 2
-        mg_black += mob_b // 2
-
-        # Game phase based on remaining non-pawn material (roughly 24 at opening)
-        phase_weights = {'pawn': 0, 'knight': 1, 'bishop': 1, 'rook': 2, 'queen': 4, 'king': 0}
-        max_phase = 24
-        phase = 0
-        for r in range(8):
-            for c in range(8):
-                p = board.get_piece(r, c)
-                if p:
-                    phase += phase_weights.get(p.name, 0)
-        phase = max(0, min(max_phase, phase))
+        # Safe mobility and king-zone pressure from one attack scan
+        attack_info = AttackInfo(board)
+        mg_white += self.attack_score(attack_info, WHITE)
+        mg_black += self.attack_score(attack_info, BLACK)
+
+        phase = max(0, min(MAX_PHASE, phase))
 
         mg_score = mg_white - mg_black
         eg_score = eg_white - eg_black
-        score = (mg_score * phase + eg_score * (max_phase - phase)) // max_phase
+        score = (mg_score * phase + eg_score * (MAX_PHASE - phase)) // MAX_PHASE
 
         # Mild check adjustment
-        if board.is_in_check('white'):
+        if attack_info.in_check(WHITE):
             score -= 15
-        if board.is_in_check('black'):
+        if attack_info.in_check(BLACK):
             score += 15
 
         # Return from perspective of self.color
         return score if self.color == 'white' else -score
 
+    def evaluate_nnue(self, board):
+        # The accumulator stays attached to the board, so make/unmake keep it
+        # current for later evaluations
+        accumulator = board.accumulator
+        if accumulator is None or accumulator.network is not self.nnue:
+            accumulator = board.accumulator = self.nnue.accumulator(board)
+        score = accumulator.evaluate()
+        return score if self.color == 'white' else -score
+
+    def attack_score(self, attack_info, side):
+        # Midgame bonus for side (attacks.WHITE/BLACK): half a centipawn per
+        # square its pieces reach that no enemy pawn guards, plus weighted
+        # hits on the enemy king zone once two or more pieces join in
+        score = attack_info.safe_mobility(side) // 2
+        attackers, hits = attack_info.king_zone_attacks(side)
+        if attackers >= 2:
+            weight = sum(KING_ATTACK_WEIGHT[i] * hits[i] for i in range(6))
+            score += weight * KING_ATTACK_SCALE[min(attackers, 7)] // 100
+        return score
+
+    def attack_terms(self, board):
+        # (White-minus-Black attack_score, check adjustment): the parts of
+        # evaluate_board that batch_eval and tune.py add per position
+        info = AttackInfo(board)
+        mg = self.attack_score(info, WHITE) - self.attack_score(info, BLACK)
+        check = (15 if info.in_check(BLACK) else 0) - (15 if info.in_check(WHITE) else 0)
+        return mg, check
+
+    def mobility(self, board, color):
+        # Pseudo-legal move count of knights, bishops, rooks and queens
+        return AttackInfo(board).mobility(WHITE if color == 'white' else BLACK)
+
+    def evaluate_batch(self, positions, full=False):
+        # Vectorized evaluate_board over many positions (Boards or an
+        # N x 12 x 64 plane array); requires NumPy. See batch_eval.py.
+        import batch_eval
+        return batch_eval.evaluate_batch(positions, self, full)
+
     def evaluate_piece_position(self, piece, row, col):
         # Deprecated by the new tapered eval, kept for compatibility
-        table = self.pst_mg.get(piece.name)
-        if not table:
-            return 0
-        if piece.color == 'white':
-            return table[row][col]
-        return table[7 - row][col]
+        return self.pst_mg[piece.code][row * 8 + col]
 
     def evaluate_piece_value(self, piece):
-        piece_value = {
-            'pawn': 100,
-            'knight': 320,
-            'bishop': 330,
-            'rook': 500,
-            'queen': 900,
-            'king': 20000
-        }
-        return piece_value.get(piece.name, 0)
+        return 20000 if piece.name == 'king' else PIECE_VALUE[piece.index]
@@ -0,0 +1,169 @@
+# analysis_cache.py
+# Persistent analysis results shared across AI instances and sessions.
+#
+# One SQLite table keyed by the search's position key (AI.position_key: Zobrist
+# hash with side to move) holding the best move, score, depth and bound of a
+# completed search, plus when it was written and last used. Scores are stored
+# from White's point of view so engines of either color can share entries;
+# bounds use the transposition-table flags ('EXACT', 'LOWERBOUND', 'UPPERBOUND').
+#
+# AI.get_move answers from the cache when it holds an exact result at least
+# as deep as requested, otherwise seeds its transposition table from the root
+# and child entries, and writes the root and child results back afterwards.
+# Several processes may share a file (WAL mode); an entry is only replaced by
+# an equal or deeper one. When the table grows past max_entries the least
+# recently used rows are deleted.
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'chess-engine', 'analysis.sqlite')
+DEFAULT_MAX_ENTRIES = 1000000
+# Compaction trims the table to this fraction of max_entries
+COMPACT_TO = 0.9
+# Last-used times are written in batches of this many lookups
+TOUCH_BATCH = 256
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS analysis (
+    key INTEGER PRIMARY KEY,
+    move INTEGER NOT NULL,
+    score INTEGER NOT NULL,
+    depth INTEGER NOT NULL,
+    bound TEXT NOT NULL,
+    updated REAL NOT NULL,
+    used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS analysis_used ON analysis (used);
+"""
+
+
+def _db_key(key):
+    # Unsigned 64-bit position key -> SQLite's signed INTEGER
+    return key - (1 << 64) if key >= 1 << 63 else key
+
+
+def encode_move(move):
+    if move is None:
+        return -1
+    (sr, sc), (er, ec) = move
+    return (sr * 8 + sc) * 64 + er * 8 + ec
+
+
+def decode_move(raw):
+    if raw < 0:
+        return None
+    start, end = divmod(raw, 64)
+    return (divmod(start, 8), divmod(end, 8))
+
+
+class AnalysisCache:
+    def __init__(self, path=DEFAULT_PATH, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        # Shared by the GUI thread and analysis searches, hence the lock
+        self._db = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._db:
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('PRAGMA synchronous=NORMAL')
+            self._db.executescript(SCHEMA)
+        self._touched = {}
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def open_default(cls):
+        # The per-user cache, or None when it cannot be opened
+        try:
+            return cls()
+        except (OSError, sqlite3.Error):
+            return None
+
+    def close(self):
+        self.flush()
+        with self._lock:
+            self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute('SELECT COUNT(*) FROM analysis').fetchone()[0]
+
+    def get(self, key):
+        # (depth, bound, white score, move) or None
+        found = self.get_many([key])
+        return found.get(key)
+
+    def get_many(self, keys):
+        # {key: (depth, bound, white score, move)} for the keys that are cached
+        keys = list(keys)
+        if not keys:
+            return {}
+        by_db = {_db_key(k): k for k in keys}
+        with self._lock:
+            rows = self._db.execute(
+                f"SELECT key, depth, bound, score, move FROM analysis WHERE key IN ({','.join('?' * len(by_db))})",
+                list(by_db)).fetchall()
+        now = time.time()
+        found = {}
+        for db_key, depth, bound, score, move in rows:
+            found[by_db[db_key]] = (depth, bound, score, decode_move(move))
+            self._touched[db_key] = now
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        if len(self._touched) >= TOUCH_BATCH:
+            self.flush()
+        return found
+
+    def put(self, key, depth, bound, score, move):
+        self.put_many([(key, depth, bound, score, move)])
+
+    def put_many(self, entries):
+        # entries: (key, depth, bound, white score, move); an existing row is
+        # only replaced by an entry of at least the same depth
+        now = time.time()
+        rows = [(_db_key(key), encode_move(move), int(score), depth, bound, now, now)
+                for key, depth, bound, score, move in entries]
+        if not rows:
+            return
+        with self._lock, self._db:
+            self._db.executemany(
+                'INSERT INTO analysis (key, move, score, depth, bound, updated, used) VALUES (?, ?, ?, ?, ?, ?, ?) '
+                'ON CONFLICT(key) DO UPDATE SET move = excluded.move, score = excluded.score, '
+                'depth = excluded.depth, bound = excluded.bound, updated = excluded.updated, used = excluded.used '
+                'WHERE excluded.depth >= analysis.depth', rows)
+        self._writes += len(rows)
+        if self._writes >= max(1, self.max_entries // 20):
+            self._writes = 0
+            self.compact()
+
+    def flush(self):
+        # Writes pending last-used times
+        touched, self._touched = self._touched, {}
+        if touched:
+            with self._lock, self._db:
+                self._db.executemany('UPDATE analysis SET used = ? WHERE key = ?',
+                                     [(used, key) for key, used in touched.items()])
+
+    def compact(self):
+        # Deletes least recently used rows while the table exceeds max_entries;
+        # returns the number removed
+        self.flush()
+        with self._lock, self._db:
+            count = self._db.execute('SELECT COUNT(*) FROM analysis').fetchone()[0]
+            if count <= self.max_entries:
+                return 0
+            excess = count - int(self.max_entries * COMPACT_TO)
+            self._db.execute('DELETE FROM analysis WHERE key IN '
+                             '(SELECT key FROM analysis ORDER BY used LIMIT ?)', (excess,))
+        return excess
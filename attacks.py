@@ -0,0 +1,138 @@
+# attacks.py
+# Attack sets as 64-bit masks (Python ints, bit n = square n = row * 8 + col),
+# for evaluation terms that only need to know which squares a piece reaches
+# (mobility, king safety, checks) without building move lists.
+#
+# Knight, king and pawn attacks come from tables built at import; sliders walk
+# precomputed rays against an occupancy mask and stop at the first piece.
+
+KNIGHT_STEPS = ((-2, -1), (-2, 1), (-1, -2), (-1, 2), (1, -2), (1, 2), (2, -1), (2, 1))
+KING_STEPS = ((-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1))
+BISHOP_DIRECTIONS = ((-1, -1), (-1, 1), (1, -1), (1, 1))
+ROOK_DIRECTIONS = ((-1, 0), (1, 0), (0, -1), (0, 1))
+WHITE, BLACK = 0, 1
+
+
+def _step_masks(steps):
+    masks = []
+    for sq in range(64):
+        r, c = divmod(sq, 8)
+        mask = 0
+        for dr, dc in steps:
+            if 0 <= r + dr < 8 and 0 <= c + dc < 8:
+                mask |= 1 << ((r + dr) * 8 + c + dc)
+        masks.append(mask)
+    return tuple(masks)
+
+
+def _rays(directions):
+    # RAYS[sq] = tuple of rays, each a tuple of squares moving away from sq
+    rays = []
+    for sq in range(64):
+        r, c = divmod(sq, 8)
+        square_rays = []
+        for dr, dc in directions:
+            ray = []
+            rr, cc = r + dr, c + dc
+            while 0 <= rr < 8 and 0 <= cc < 8:
+                ray.append(rr * 8 + cc)
+                rr += dr
+                cc += dc
+            if ray:
+                square_rays.append(tuple(ray))
+        rays.append(tuple(square_rays))
+    return tuple(rays)
+
+
+KNIGHT_ATTACKS = _step_masks(KNIGHT_STEPS)
+KING_ATTACKS = _step_masks(KING_STEPS)
+# PAWN_ATTACKS[side][sq]: squares a pawn of that side on sq attacks
+PAWN_ATTACKS = (_step_masks(((-1, -1), (-1, 1))), _step_masks(((1, -1), (1, 1))))
+BISHOP_RAYS = _rays(BISHOP_DIRECTIONS)
+ROOK_RAYS = _rays(ROOK_DIRECTIONS)
+QUEEN_RAYS = tuple(b + r for b, r in zip(BISHOP_RAYS, ROOK_RAYS))
+# King zone: the king's square and its neighbours
+KING_ZONE = tuple(KING_ATTACKS[sq] | 1 << sq for sq in range(64))
+# Slider rays by piece index (bishop 2, rook 3, queen 4)
+SLIDER_RAYS = {2: BISHOP_RAYS, 3: ROOK_RAYS, 4: QUEEN_RAYS}
+
+
+def slider_attacks(rays, occupied):
+    mask = 0
+    for ray in rays:
+        for sq in ray:
+            mask |= 1 << sq
+            if occupied >> sq & 1:
+                break
+    return mask
+
+
+class AttackInfo:
+    # One board scan: per side (0 = White, 1 = Black) the occupancy, king
+    # square, pawn attacks, the attack mask of every knight, bishop, rook and
+    # queen as (piece index, mask), and the union of all attacks
+    def __init__(self, board):
+        occupied = [0, 0]
+        pawns = [0, 0]
+        kings = [None, None]
+        pieces = ([], [])
+        for row in range(8):
+            for col, piece in enumerate(board.board[row]):
+                if piece:
+                    sq = row * 8 + col
+                    side = piece.code // 6
+                    occupied[side] |= 1 << sq
+                    index = piece.index
+                    if index == 0:
+                        pawns[side] |= PAWN_ATTACKS[side][sq]
+                    elif index == 5:
+                        kings[side] = sq
+                    else:
+                        pieces[side].append((index, sq))
+        all_occupied = occupied[0] | occupied[1]
+        self.occupied = occupied
+        self.kings = kings
+        self.pawn_attacks = pawns
+        self.pieces = ([], [])
+        self.attacked = [pawns[0], pawns[1]]
+        for side in (WHITE, BLACK):
+            if kings[side] is not None:
+                self.attacked[side] |= KING_ATTACKS[kings[side]]
+            for index, sq in pieces[side]:
+                if index == 1:
+                    mask = KNIGHT_ATTACKS[sq]
+                else:
+                    mask = slider_attacks(SLIDER_RAYS[index][sq], all_occupied)
+                self.pieces[side].append((index, mask))
+                self.attacked[side] |= mask
+
+    def in_check(self, side):
+        # A missing king counts as in check, like Board.is_in_check
+        king = self.kings[side]
+        return king is None or bool(self.attacked[1 - side] >> king & 1)
+
+    def mobility(self, side):
+        # Squares reachable by the side's knights, bishops, rooks and queens
+        # (pseudo-legal move count, as generate_pseudolegal_moves_from_square)
+        own = self.occupied[side]
+        return sum((mask & ~own).bit_count() for _, mask in self.pieces[side])
+
+    def safe_mobility(self, side):
+        # Mobility over squares not attacked by enemy pawns
+        blocked = self.occupied[side] | self.pawn_attacks[1 - side]
+        return sum((mask & ~blocked).bit_count() for _, mask in self.pieces[side])
+
+    def king_zone_attacks(self, side):
+        # (number of pieces attacking the enemy king zone, [hits per piece index])
+        king = self.kings[1 - side]
+        hits = [0] * 6
+        attackers = 0
+        if king is None:
+            return attackers, hits
+        zone = KING_ZONE[king]
+        for index, mask in self.pieces[side]:
+            count = (mask & zone).bit_count()
+            if count:
+                attackers += 1
+                hits[index] += count
+        return attackers, hits
@@ -0,0 +1,188 @@
+# batch_eval.py
+# NumPy evaluation of many positions at once.
+#
+# Positions become an N x 12 x 64 uint8 piece-plane tensor (plane = Piece.code,
+# square = row * 8 + col). evaluate_planes() computes the board-only terms of
+# AI.evaluate_board as array operations: material + tapered PSTs, game phase,
+# bishop pair, doubled/isolated/passed pawns, rooks on open files, the king's
+# pawn shield and centre occupancy. Results are bit-for-bit identical to the
+# same terms in evaluate_board (integer arithmetic, same floor division).
+#
+# Mobility, king-zone attacks and the in-check adjustment need attack maps;
+# evaluate_batch adds them per position (AI.attack_terms) when full=True,
+# which then reproduces evaluate_board exactly.
+import numpy as np
+
+from tables import PIECE_VALUE, PHASE_WEIGHT, MAX_PHASE, PST_MG, PST_EG, TERM_NAMES
+from tables import BISHOP_PAIR, DOUBLED_PAWN, ISOLATED_PAWN, ROOK_OPEN_FILE, ROOK_SEMI_OPEN_FILE
+from board import POSITION_FORMAT
+
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(6)
+BLACK = 6
+
+# Positions evaluated per vectorized step (bounds temporary memory)
+CHUNK = 8192
+
+# Material + PST weights per (code, square), Black negated, as a 768 x 2
+# (mg, eg) matrix. The dot products run in float32 BLAS; every partial sum
+# is an integer far below 2**24, so the results are exact.
+_VALUES = np.array([PIECE_VALUE[code % 6] for code in range(12)], dtype=np.int64)[:, None]
+_SIGN = np.array([1] * 6 + [-1] * 6, dtype=np.int64)[:, None]
+W_MG = np.array(PST_MG, dtype=np.int64) + _VALUES
+W_EG = np.array(PST_EG, dtype=np.int64) + _VALUES
+W_PST = np.stack([(W_MG * _SIGN).ravel(), (W_EG * _SIGN).ravel()], axis=1).astype(np.float32)
+PHASE = np.array([PHASE_WEIGHT[code % 6] for code in range(12)], dtype=np.int64)
+# (mg, eg) weight per term_features() column, in tables.TERM_NAMES order
+TERMS = np.array([BISHOP_PAIR, DOUBLED_PAWN, ISOLATED_PAWN, ROOK_OPEN_FILE, ROOK_SEMI_OPEN_FILE], dtype=np.int64)
+
+# Passed-pawn bonus by row for pawns whose file neighbourhood is free of enemy pawns
+ROWS = np.arange(8, dtype=np.int64)
+PASSED_WHITE = (6 - ROWS) * 10
+PASSED_BLACK = (ROWS - 1) * 10
+
+
+def _shield_weights(color):
+    # SHIELD[king_sq, pawn_sq]: pawn-shield bonus of a friendly pawn for a
+    # king square. Files are [c-1, c, c+1] clamped, so an edge file counts twice.
+    weights = np.zeros((64, 64), dtype=np.int64)
+    rows = ((6, 6), (5, 3)) if color == 'white' else ((1, 6), (2, 3))
+    for ksq in range(64):
+        c = ksq & 7
+        for cc in (max(0, c - 1), c, min(7, c + 1)):
+            for rr, bonus in rows:
+                weights[ksq, rr * 8 + cc] += bonus
+    return weights
+
+
+SHIELD_WHITE = _shield_weights('white').astype(np.float32)
+SHIELD_BLACK = _shield_weights('black').astype(np.float32)
+CENTER_SQUARES = [27, 28, 35, 36]  # d5, e5, d4, e4
+
+
+def planes_from_boards(boards):
+    planes = np.zeros((len(boards), 12, 64), dtype=np.uint8)
+    for n, board in enumerate(boards):
+        for row in range(8):
+            for col, piece in enumerate(board.board[row]):
+                if piece:
+                    planes[n, piece.code, row * 8 + col] = 1
+    return planes
+
+
+def codes_from_encoded(encoded):
+    # (N, 64) array of Piece.code + 1 (0 = empty) from Board.to_bytes() strings
+    size = POSITION_FORMAT.size
+    raw = np.frombuffer(b''.join(encoded), dtype=np.uint8).reshape(len(encoded), size)[:, :32]
+    codes = np.empty((len(encoded), 64), dtype=np.uint8)
+    codes[:, 0::2] = raw & 15
+    codes[:, 1::2] = raw >> 4
+    return codes
+
+
+def planes_from_codes(codes):
+    planes = np.zeros((codes.shape[0], 12, 64), dtype=np.uint8)
+    n, sq = np.nonzero(codes)
+    planes[n, codes[n, sq].astype(np.intp) - 1, sq] = 1
+    return planes
+
+
+def planes_from_encoded(encoded):
+    return planes_from_codes(codes_from_encoded(encoded))
+
+
+def _neighbour_files(files):
+    # files[:, f-1] + files[:, f] + files[:, f+1], edges clamped without double counting
+    padded = np.pad(files, ((0, 0), (1, 1)))
+    return padded[:, :-2] + padded[:, 1:-1] + padded[:, 2:]
+
+
+def term_features(planes, counts=None):
+    # (N, len(TERM_NAMES)) White-minus-Black occurrence counts, signed so that
+    # term_features(planes) @ TERMS is the (mg, eg) contribution
+    if counts is None:
+        counts = planes.sum(axis=2, dtype=np.int64)
+    wf = planes[:, PAWN].reshape(-1, 8, 8).sum(axis=1, dtype=np.int64)
+    bf = planes[:, BLACK + PAWN].reshape(-1, 8, 8).sum(axis=1, dtype=np.int64)
+    features = np.empty((len(planes), len(TERM_NAMES)), dtype=np.int64)
+    features[:, 0] = (counts[:, BISHOP] >= 2).astype(np.int64) - (counts[:, BLACK + BISHOP] >= 2)
+    features[:, 1] = np.maximum(bf - 1, 0).sum(axis=1) - np.maximum(wf - 1, 0).sum(axis=1)
+    w_isolated = ((wf > 0) & (_neighbour_files(wf) - wf == 0)).sum(axis=1)
+    b_isolated = ((bf > 0) & (_neighbour_files(bf) - bf == 0)).sum(axis=1)
+    features[:, 2] = b_isolated - w_isolated
+    wr = planes[:, ROOK].reshape(-1, 8, 8).sum(axis=1, dtype=np.int64)
+    br = planes[:, BLACK + ROOK].reshape(-1, 8, 8).sum(axis=1, dtype=np.int64)
+    open_file = (wf == 0) & (bf == 0)
+    features[:, 3] = (wr * open_file).sum(axis=1) - (br * open_file).sum(axis=1)
+    features[:, 4] = (wr * ((wf == 0) & ~open_file)).sum(axis=1) - (br * ((bf == 0) & ~open_file)).sum(axis=1)
+    return features
+
+
+def evaluate_planes(planes):
+    # Returns (mg, eg, phase) int64 arrays, White minus Black, before tapering
+    if len(planes) > CHUNK:
+        parts = [evaluate_planes(planes[i:i + CHUNK]) for i in range(0, len(planes), CHUNK)]
+        return tuple(np.concatenate(arrays) for arrays in zip(*parts))
+    n = len(planes)
+    xf = planes.reshape(n, 12 * 64).astype(np.float32)
+    counts = planes.sum(axis=2, dtype=np.int64)
+
+    pst = np.rint(xf @ W_PST).astype(np.int64)
+    mg = pst[:, 0]
+    eg = pst[:, 1]
+    phase = np.clip(counts @ PHASE, 0, MAX_PHASE)
+
+    # Bishop pair, doubled/isolated pawns, rooks on (semi-)open files
+    terms = term_features(planes, counts) @ TERMS
+    mg += terms[:, 0]
+    eg += terms[:, 1]
+
+    wp = planes[:, PAWN].reshape(-1, 8, 8).astype(np.int64)
+    bp = planes[:, BLACK + PAWN].reshape(-1, 8, 8).astype(np.int64)
+    wf = wp.sum(axis=1)
+    bf = bp.sum(axis=1)
+
+    # Passed pawns (no enemy pawn on the same or adjacent files), plus the
+    # flat +10 endgame bonus evaluate_board gives every pawn
+    w_free = _neighbour_files(bf) == 0
+    b_free = _neighbour_files(wf) == 0
+    w_passed = ((wp * PASSED_WHITE[:, None]).sum(axis=1) * w_free).sum(axis=1)
+    b_passed = ((bp * PASSED_BLACK[:, None]).sum(axis=1) * b_free).sum(axis=1)
+    mg += w_passed - b_passed
+    eg += w_passed - b_passed + 10 * (counts[:, PAWN] - counts[:, BLACK + PAWN])
+
+    # King pawn shield (middlegame only)
+    xp = xf.reshape(n, 12, 64)
+    mg += np.rint(((xp[:, KING] @ SHIELD_WHITE) * xp[:, PAWN]).sum(axis=1)).astype(np.int64)
+    mg -= np.rint(((xp[:, BLACK + KING] @ SHIELD_BLACK) * xp[:, BLACK + PAWN]).sum(axis=1)).astype(np.int64)
+
+    # Centre occupancy
+    centre = planes[:, :, CENTER_SQUARES].sum(axis=2, dtype=np.int64)
+    mg += 5 * (centre[:, :6].sum(axis=1) - centre[:, 6:].sum(axis=1))
+    return mg, eg, phase
+
+
+def taper(mg, eg, phase):
+    return (mg * phase + eg * (MAX_PHASE - phase)) // MAX_PHASE
+
+
+def evaluate_batch(positions, ai, full=False):
+    # Scores from ai.color's perspective. `positions` is a list of Boards or a
+    # plane array; full=True (Boards only) adds the attack-map terms.
+    boards = None
+    if isinstance(positions, np.ndarray):
+        planes = positions
+    else:
+        boards = list(positions)
+        planes = planes_from_boards(boards)
+    mg, eg, phase = evaluate_planes(planes)
+    extra = None
+    if full:
+        if boards is None:
+            raise ValueError("full=True needs Board objects (attack terms are computed per board)")
+        terms = np.array([ai.attack_terms(b) for b in boards], dtype=np.int64).reshape(-1, 2)
+        mg = mg + terms[:, 0]
+        extra = terms[:, 1]
+    score = taper(mg, eg, phase)
+    if extra is not None:
+        score += extra
+    return score if ai.color == 'white' else -score
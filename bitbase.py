@@ -0,0 +1,322 @@
+# bitbase.py
+# Win/draw endgame bitbases for KQK, KRK and KPK.
+#
+# The generator does a retrograde-style fixed-point analysis over every
+# position of an ending, then stores one bit per position (1 = win for the
+# side with the extra piece). Files are loaded with mmap and probed in
+# constant time from AI.alpha_beta and at the root of AI.get_move.
+#
+# Squares are 0..63 with row 0 = rank 8 (same as Board). Tables are stored
+# from the point of view of the strong side playing "up" the board like
+# White; positions where Black is the strong side are mirrored vertically.
+# KQK/KRK use the strong king in the a8-d5 quadrant, KPK the pawn on files a-d.
+#
+# Regenerate the files with:
+#   python bitbase.py generate
+import mmap
+import os
+import sys
+import time
+
+BITBASE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bitbases')
+ENDINGS = ('kqk', 'krk', 'kpk')
+SIZES = {'kqk': 2 * 16 * 64 * 64, 'krk': 2 * 16 * 64 * 64, 'kpk': 2 * 24 * 64 * 64}
+
+# Search score for a bitbase win, well below AI.MATE_VALUE. The extra piece's
+# value is added so that promoting (KPK -> KQK) is always an improvement.
+WIN_SCORE = 5000
+PIECE_VALUE = {'pawn': 100, 'rook': 500, 'queen': 900}
+
+UNKNOWN, WIN, DRAW, INVALID = 0, 1, 2, 3
+STRONG, WEAK = 0, 1  # side to move
+
+KING_MOVES = []
+for _sq in range(64):
+    _r, _c = divmod(_sq, 8)
+    KING_MOVES.append(tuple((_r + dr) * 8 + _c + dc for dr in (-1, 0, 1) for dc in (-1, 0, 1)
+                            if (dr or dc) and 0 <= _r + dr < 8 and 0 <= _c + dc < 8))
+ADJACENT = [set(m) for m in KING_MOVES]
+
+ROOK_DIRS = ((-1, 0), (1, 0), (0, -1), (0, 1))
+BISHOP_DIRS = ((-1, -1), (-1, 1), (1, -1), (1, 1))
+RAYS = {}
+for _dirs, _name in ((ROOK_DIRS, 'rook'), (ROOK_DIRS + BISHOP_DIRS, 'queen')):
+    RAYS[_name] = []
+    for _sq in range(64):
+        _r, _c = divmod(_sq, 8)
+        rays = []
+        for dr, dc in _dirs:
+            ray, rr, cc = [], _r + dr, _c + dc
+            while 0 <= rr < 8 and 0 <= cc < 8:
+                ray.append(rr * 8 + cc)
+                rr += dr
+                cc += dc
+            if ray:
+                rays.append(tuple(ray))
+        RAYS[_name].append(tuple(rays))
+
+# BETWEEN[a][b]: squares strictly between a and b on a line, None if not aligned
+BETWEEN = [[None] * 64 for _ in range(64)]
+STRAIGHT = [[False] * 64 for _ in range(64)]
+for _a in range(64):
+    for _ray in RAYS['queen'][_a]:
+        for _i, _b in enumerate(_ray):
+            BETWEEN[_a][_b] = frozenset(_ray[:_i])
+            STRAIGHT[_a][_b] = (_a >> 3) == (_b >> 3) or (_a & 7) == (_b & 7)
+
+# White-style pawn (moving towards row 0) capture squares
+PAWN_ATTACKS = [frozenset((_sq - 8) + dc for dc in (-1, 1)
+                          if _sq >= 8 and 0 <= (_sq & 7) + dc < 8) for _sq in range(64)]
+
+
+def attacks(kind, frm, to, blocker):
+    # Does a `kind` piece on `frm` attack `to` when `blocker` is the only other piece?
+    if kind == 'pawn':
+        return to in PAWN_ATTACKS[frm]
+    line = BETWEEN[frm][to]
+    if line is None or (kind == 'rook' and not STRAIGHT[frm][to]):
+        return False
+    return blocker not in line
+
+
+def index(kind, stm, wk, wx, bk):
+    if kind == 'pawn':
+        if wx & 7 > 3:
+            wk, wx, bk = wk ^ 7, wx ^ 7, bk ^ 7
+        return ((stm * 24 + ((wx >> 3) - 1) * 4 + (wx & 7)) * 64 + wk) * 64 + bk
+    if wk & 7 > 3:
+        wk, wx, bk = wk ^ 7, wx ^ 7, bk ^ 7
+    if wk >> 3 > 3:
+        wk, wx, bk = wk ^ 56, wx ^ 56, bk ^ 56
+    return ((stm * 16 + (wk >> 3) * 4 + (wk & 7)) * 64 + wx) * 64 + bk
+
+
+# ---------- Generation ----------
+
+def _positions(kind):
+    # All legal canonical positions as (idx, stm, wk, wx, bk)
+    out = []
+    if kind == 'pawn':
+        x_squares = [r * 8 + c for r in range(1, 7) for c in range(4)]
+        k_squares = range(64)
+    else:
+        x_squares = range(64)
+        k_squares = [r * 8 + c for r in range(4) for c in range(4)]
+    for stm in (STRONG, WEAK):
+        for wk in k_squares:
+            for wx in x_squares:
+                if wx == wk:
+                    continue
+                for bk in range(64):
+                    if bk == wk or bk == wx or bk in ADJACENT[wk]:
+                        continue
+                    if stm == STRONG and attacks(kind, wx, bk, wk):
+                        continue
+                    out.append((index(kind, stm, wk, wx, bk), stm, wk, wx, bk))
+    return out
+
+
+def _classify(kind, stm, wk, wx, bk, res, promo):
+    if stm == STRONG:
+        seen_unknown = False
+        for s in KING_MOVES[wk]:
+            if s == wx or s in ADJACENT[bk]:
+                continue
+            r = res[index(kind, WEAK, s, wx, bk)]
+            if r == WIN:
+                return WIN
+            if r == UNKNOWN:
+                seen_unknown = True
+        if kind == 'pawn':
+            targets = []
+            if wx - 8 != wk and wx - 8 != bk:
+                targets.append(wx - 8)
+                if wx >> 3 == 6 and wx - 16 != wk and wx - 16 != bk:
+                    targets.append(wx - 16)
+            for s in targets:
+                if s < 8:
+                    # Promotion: the queen position with the weak side to move
+                    r = promo[index('queen', WEAK, wk, s, bk)]
+                else:
+                    r = res[index(kind, WEAK, wk, s, bk)]
+                if r == WIN:
+                    return WIN
+                if r == UNKNOWN:
+                    seen_unknown = True
+        else:
+            for ray in RAYS[kind][wx]:
+                for s in ray:
+                    if s == wk or s == bk:
+                        break
+                    r = res[index(kind, WEAK, wk, s, bk)]
+                    if r == WIN:
+                        return WIN
+                    if r == UNKNOWN:
+                        seen_unknown = True
+        return UNKNOWN if seen_unknown else DRAW
+
+    # Weak side to move: any escape to a draw wins the race for the defender
+    has_move = False
+    seen_unknown = False
+    for s in KING_MOVES[bk]:
+        if s in ADJACENT[wk]:
+            continue
+        if s == wx:
+            # Capturing the lone piece leaves K vs K
+            return DRAW
+        if attacks(kind, wx, s, wk):
+            continue
+        has_move = True
+        r = res[index(kind, STRONG, wk, wx, s)]
+        if r == DRAW:
+            return DRAW
+        if r == UNKNOWN:
+            seen_unknown = True
+    if not has_move:
+        return WIN if attacks(kind, wx, bk, wk) else DRAW
+    return UNKNOWN if seen_unknown else WIN
+
+
+def generate(ending, promo=None, verbose=False):
+    kind = {'kqk': 'queen', 'krk': 'rook', 'kpk': 'pawn'}[ending]
+    res = bytearray([INVALID]) * SIZES[ending]
+    todo = _positions(kind)
+    for pos in todo:
+        res[pos[0]] = UNKNOWN
+    passes = 0
+    while todo:
+        passes += 1
+        remaining = []
+        for pos in todo:
+            r = _classify(kind, pos[1], pos[2], pos[3], pos[4], res, promo)
+            if r == UNKNOWN:
+                remaining.append(pos)
+            else:
+                res[pos[0]] = r
+        if len(remaining) == len(todo):
+            # Nothing changed: remaining positions can never be forced to a win
+            for pos in remaining:
+                res[pos[0]] = DRAW
+            break
+        todo = remaining
+    if verbose:
+        wins = res.count(WIN)
+        print(f"{ending}: {wins} wins / {wins + res.count(DRAW)} legal positions, {passes} passes")
+    return res
+
+
+def pack(res):
+    bits = bytearray((len(res) + 7) // 8)
+    for i, r in enumerate(res):
+        if r == WIN:
+            bits[i >> 3] |= 1 << (i & 7)
+    return bytes(bits)
+
+
+def generate_all(directory=BITBASE_DIR, verbose=True):
+    os.makedirs(directory, exist_ok=True)
+    results = {}
+    for ending in ('kqk', 'krk', 'kpk'):
+        started = time.time()
+        results[ending] = generate(ending, promo=results.get('kqk'), verbose=verbose)
+        with open(os.path.join(directory, f"{ending}.bb"), 'wb') as f:
+            f.write(pack(results[ending]))
+        if verbose:
+            print(f"  written in {time.time() - started:.1f}s")
+
+
+# ---------- Probing ----------
+
+class Bitbases:
+    def __init__(self, directory=BITBASE_DIR):
+        self.tables = {}
+        self._files = []
+        for ending in ENDINGS:
+            path = os.path.join(directory, f"{ending}.bb")
+            if not os.path.exists(path) or os.path.getsize(path) != SIZES[ending] // 8:
+                continue
+            f = open(path, 'rb')
+            self._files.append(f)
+            self.tables[ending] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __bool__(self):
+        return bool(self.tables)
+
+    def probe(self, board, color_to_move):
+        # Returns (strong_color, is_win, wk, wx, bk, kind) in canonical squares,
+        # or None when the position is not covered
+        pieces = []
+        for r in range(8):
+            for c, p in enumerate(board.board[r]):
+                if p:
+                    if len(pieces) == 3:
+                        return None
+                    pieces.append((r * 8 + c, p))
+        if len(pieces) != 3:
+            return None
+        extra = [(sq, p) for sq, p in pieces if p.name != 'king']
+        if len(extra) != 1:
+            return None
+        xsq, xp = extra[0]
+        kind = xp.name
+        ending = {'queen': 'kqk', 'rook': 'krk', 'pawn': 'kpk'}.get(kind)
+        table = self.tables.get(ending)
+        if table is None:
+            return None
+        strong = xp.color
+        wk = bk = None
+        for sq, p in pieces:
+            if p.name == 'king':
+                if p.color == strong:
+                    wk = sq
+                else:
+                    bk = sq
+        if wk is None or bk is None:
+            return None
+        wx = xsq
+        if strong == 'black':
+            wk, wx, bk = wk ^ 56, wx ^ 56, bk ^ 56
+        stm = STRONG if color_to_move == strong else WEAK
+        idx = index(kind, stm, wk, wx, bk)
+        win = bool(table[idx >> 3] & (1 << (idx & 7)))
+        return strong, win, wk, wx, bk, kind
+
+    def score(self, board, color_to_move):
+        # Static score from White's perspective, or None if not covered.
+        # Wins add a mop-up term so the search keeps making progress.
+        hit = self.probe(board, color_to_move)
+        if hit is None:
+            return None
+        strong, win, wk, wx, bk, kind = hit
+        if not win:
+            return 0
+        if kind == 'pawn':
+            bonus = 50 * (6 - (wx >> 3)) - 5 * _distance(wk, wx)
+        else:
+            br, bc = divmod(bk, 8)
+            edge = max(3 - br, br - 4) + max(3 - bc, bc - 4)
+            bonus = 20 * edge + 10 * (7 - _distance(wk, bk))
+        value = WIN_SCORE + PIECE_VALUE[kind] + bonus
+        return value if strong == 'white' else -value
+
+
+def _distance(a, b):
+    return max(abs((a >> 3) - (b >> 3)), abs((a & 7) - (b & 7)))
+
+
+_DEFAULT = None
+
+
+def default_bitbases():
+    # One shared, lazily opened instance per process
+    global _DEFAULT
+    if _DEFAULT is None:
+        _DEFAULT = Bitbases()
+    return _DEFAULT
+
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['generate']:
+        generate_all(sys.argv[2] if len(sys.argv) > 2 else BITBASE_DIR)
+    else:
+        print('usage: python bitbase.py generate [directory]')
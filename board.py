@@ -1,17 +1,45 @@
-import pygame
-import copy
+# board.py
+# Board state and move generation. Rendering lives in board_view.py so this
+# module (and the engine built on it) does not need pygame.
+import struct
 from pieces import *
-import os
+from zobrist import PIECE_KEYS, CASTLING_KEYS
+
+# Positions remembered by Board.status() before the cache is reset
+STATUS_CACHE_SIZE = 4096
+
+# Compact position encoding (Board.to_bytes), 54 bytes:
+#   32 bytes  placement, one nibble per square (0 = empty, Piece.code + 1),
+#             square 0 (a8) in the low nibble of byte 0
+#   1 byte    bit 0 = white to move, bits 1-4 = castling rights (K, Q, k, q)
+#   1 byte    en passant file (0xFF = none; en passant is not implemented)
+#   2 bytes   halfmove clock
+#   2 bytes   game ply (number of half-moves played from the initial position)
+#   8 bytes   position key (Board.hash)
+#   8 bytes   has_moved mask, bit n set = the piece on square n has moved
+#             (kept exactly so unmake_move across a restore stays consistent)
+POSITION_FORMAT = struct.Struct('<32sBBHHQQ')
+PIECE_CLASSES = (Pawn, Knight, Bishop, Rook, Queen, King)
 
 class Board:
-    images = {}
-
-    def __init__(self):
-        self.board = self.create_board()
+    def __init__(self, setup=True):
+        # setup=False gives an empty board, e.g. for clone() or custom positions
+        self.board = self.create_board() if setup else [[None] * 8 for _ in range(8)]
         self.move_history = []
         self.current_turn = 'white'  # Instance variable, not class variable
-        if not Board.images:
-            self.load_images()
+        # Position key (placement + castling rights) before each move in
+        # move_history, and plies since the last capture or pawn move
+        self.key_history = []
+        self.halfmove_clock = 0
+        # Half-moves played before move_history starts (boards built by
+        # clone() or from_bytes() carry no move records)
+        self.ply_offset = 0
+        self.hash = self.compute_hash()
+        # (position key, color) -> 'ongoing' / 'checkmate' / 'stalemate'
+        self._status_cache = {}
+        # nnue.Accumulator kept up to date by make/unmake when the NNUE
+        # evaluation is in use (attached by AI.evaluate_nnue)
+        self.accumulator = None
 
     def create_board(self):
         board = [[None for _ in range(8)] for _ in range(8)]
@@ -42,28 +70,6 @@ class Board:
 
         return board
 
-    def load_images(self):
-        pieces = ['pawn', 'rook', 'knight', 'bishop', 'queen', 'king']
-        colors = ['white', 'black']
-        for color in colors:
-            for piece in pieces:
-                image_path = os.path.join('assets', f"{color}_{piece}.png")
-                if os.path.exists(image_path):
-                    image = pygame.image.load(image_path)
-                    Board.images[f"{color}_{piece}"] = pygame.transform.scale(image, (100, 100))
-
-    def draw(self, screen):
-        colors = [(255, 206, 158), (209, 139, 71)]
-        for row in range(8):
-            for col in range(8):
-                color = colors[(row + col) % 2]
-                pygame.draw.rect(screen, color, pygame.Rect(col * 100, row * 100, 100, 100))
-                piece = self.board[row][col]
-                if piece:
-                    image = Board.images.get(f"{piece.color}_{piece.name}")
-                    if image:
-                        screen.blit(image, (col * 100, row * 100))
-
     def get_piece(self, row, col):
         if 0 <= row < 8 and 0 <= col < 8:
             return self.board[row][col]
@@ -100,6 +106,10 @@ class Board:
 
         piece = self.board[start_row][start_col]
         target_piece = self.board[end_row][end_col]
+        # Castling rights can only change when a king or rook moves or a rook is captured
+        rights_before = None
+        if piece.name in ('king', 'rook') or (target_piece and target_piece.name == 'rook'):
+            rights_before = self.castling_rights()
 
         move_details = {
             'piece': piece,
@@ -110,7 +120,9 @@ class Board:
             'rook_move': None,
             'start_pos': (start_row, start_col),
             'end_pos': (end_row, end_col),
-            'piece_has_moved_before_move': getattr(piece, 'has_moved', False)
+            'piece_has_moved_before_move': getattr(piece, 'has_moved', False),
+            'hash_before': self.hash,
+            'halfmove_clock_before': self.halfmove_clock
         }
 
         if isinstance(piece, King) and abs(end_col - start_col) == 2:
@@ -149,6 +161,35 @@ class Board:
                 self.promote_pawn(piece, end_row, end_col)
                 move_details['promotion'] = True
 
+        # Incremental position key
+        end_sq = end_row * 8 + end_col
+        h = self.hash ^ PIECE_KEYS[piece.code * 64 + start_row * 8 + start_col]
+        h ^= PIECE_KEYS[self.board[end_row][end_col].code * 64 + end_sq]
+        if target_piece:
+            h ^= PIECE_KEYS[target_piece.code * 64 + end_sq]
+        rook_move = move_details['rook_move']
+        if rook_move:
+            base = rook_move['rook'].code * 64
+            h ^= PIECE_KEYS[base + rook_move['start_pos'][0] * 8 + rook_move['start_pos'][1]]
+            h ^= PIECE_KEYS[base + rook_move['end_pos'][0] * 8 + rook_move['end_pos'][1]]
+        if rights_before is not None:
+            h ^= CASTLING_KEYS[rights_before] ^ CASTLING_KEYS[self.castling_rights()]
+        self.key_history.append(self.hash)
+        self.hash = h
+        if self.accumulator is not None:
+            removed = [(piece.code, start_row * 8 + start_col)]
+            added = [(self.board[end_row][end_col].code, end_sq)]
+            if target_piece:
+                removed.append((target_piece.code, end_sq))
+            if rook_move:
+                removed.append((rook_move['rook'].code, rook_move['start_pos'][0] * 8 + rook_move['start_pos'][1]))
+                added.append((rook_move['rook'].code, rook_move['end_pos'][0] * 8 + rook_move['end_pos'][1]))
+            self.accumulator.push(removed, added)
+        if target_piece or isinstance(piece, Pawn):
+            self.halfmove_clock = 0
+        else:
+            self.halfmove_clock += 1
+
         self.move_history.append(move_details)
 
         if switch_turn:
@@ -183,6 +224,12 @@ class Board:
         if last_move['promotion']:
             self.board[start_row][start_col] = Pawn(piece.color)
 
+        self.hash = last_move['hash_before']
+        self.halfmove_clock = last_move['halfmove_clock_before']
+        self.key_history.pop()
+        if self.accumulator is not None:
+            self.accumulator.pop()
+
         if switch_turn:
             self.current_turn = 'black' if self.current_turn == 'white' else 'white'
 
@@ -191,6 +238,63 @@ class Board:
     def promote_pawn(self, pawn, row, col):
         self.board[row][col] = Queen(pawn.color)
 
+    def castling_rights(self):
+        # 4-bit mask (1 = K, 2 = Q, 4 = k, 8 = q) inferred from has_moved flags
+        mask = 0
+        for row, shift in ((7, 0), (0, 2)):
+            king = self.board[row][4]
+            if isinstance(king, King) and not king.has_moved:
+                rook = self.board[row][7]
+                if isinstance(rook, Rook) and not rook.has_moved and rook.color == king.color:
+                    mask |= 1 << shift
+                rook = self.board[row][0]
+                if isinstance(rook, Rook) and not rook.has_moved and rook.color == king.color:
+                    mask |= 2 << shift
+        return mask
+
+    def compute_hash(self):
+        # Full position key; make_move/unmake_move keep self.hash up to date.
+        # Call this after editing self.board directly.
+        h = CASTLING_KEYS[self.castling_rights()]
+        for row in range(8):
+            for col in range(8):
+                piece = self.board[row][col]
+                if piece:
+                    h ^= PIECE_KEYS[piece.code * 64 + row * 8 + col]
+        return h
+
+    def is_repetition(self, count=1):
+        # True if the current position already occurred `count` times. Only
+        # positions since the last capture or pawn move can match, and only
+        # every second one has the same side to move.
+        keys = self.key_history
+        n = len(keys)
+        stop = max(0, n - self.halfmove_clock)
+        seen = 0
+        for i in range(n - 2, stop - 1, -2):
+            if keys[i] == self.hash:
+                seen += 1
+                if seen >= count:
+                    return True
+        return False
+
+    def is_fifty_move_draw(self):
+        return self.halfmove_clock >= 100
+
+    def is_insufficient_material(self):
+        # Bare kings, or a single minor piece against a bare king
+        minors = 0
+        for row in self.board:
+            for piece in row:
+                if piece:
+                    if piece.name in ('pawn', 'rook', 'queen'):
+                        return False
+                    if piece.name in ('knight', 'bishop'):
+                        minors += 1
+                        if minors > 1:
+                            return False
+        return True
+
     def is_in_check(self, color):
         king_position = None
         for row in range(8):
@@ -238,8 +342,45 @@ class Board:
         return True
 
     def is_game_over(self):
-        return (self.is_checkmate('white') or self.is_checkmate('black') or
-                self.is_stalemate('white') or self.is_stalemate('black'))
+        return self.status() != 'ongoing'
+
+    def has_legal_move(self, color):
+        # Stops at the first legal move instead of generating them all
+        for row, col, piece in self.get_all_pieces(color):
+            for end_row, end_col in self.generate_pseudolegal_moves_from_square(row, col):
+                if not self.would_be_in_check(color, row, col, end_row, end_col):
+                    return True
+        return False
+
+    def draw_reason(self):
+        if self.is_repetition(2):
+            return 'threefold repetition'
+        if self.is_fifty_move_draw():
+            return 'fifty-move rule'
+        if self.is_insufficient_material():
+            return 'insufficient material'
+        return None
+
+    def status(self, color=None):
+        # 'ongoing', 'checkmate', 'stalemate' or 'draw' for the side to move.
+        # Mate/stalemate is cached per position key; draw rules depend on the
+        # history and are cheap, so they are checked every time.
+        color = color or self.current_turn
+        key = (self.hash, color)
+        result = self._status_cache.get(key)
+        if result is None:
+            if self.has_legal_move(color):
+                result = 'ongoing'
+            elif self.is_in_check(color):
+                result = 'checkmate'
+            else:
+                result = 'stalemate'
+            if len(self._status_cache) >= STATUS_CACHE_SIZE:
+                self._status_cache.clear()
+            self._status_cache[key] = result
+        if result == 'ongoing' and self.draw_reason():
+            return 'draw'
+        return result
 
     def get_all_pieces(self, color=None):
         pieces = []
@@ -264,13 +405,66 @@ class Board:
         return moves
 
     def clone(self):
-        # Create a deep copy suitable for search, without reusing move history
-        new_board = Board()
-        new_board.board = [[copy.deepcopy(self.board[r][c]) for c in range(8)] for r in range(8)]
-        new_board.current_turn = self.current_turn
-        new_board.move_history = []
+        # Independent copy suitable for search, without reusing move history
+        new_board = Board.from_bytes(self.to_bytes())
+        # Keep the key history so repetitions across the clone are still seen
+        new_board.key_history = list(self.key_history)
         return new_board
 
+    def to_bytes(self):
+        cells = bytearray(32)
+        moved = 0
+        for row in range(8):
+            for col, piece in enumerate(self.board[row]):
+                if piece:
+                    sq = row * 8 + col
+                    cells[sq >> 1] |= (piece.code + 1) << ((sq & 1) * 4)
+                    if piece.has_moved:
+                        moved |= 1 << sq
+        flags = (1 if self.current_turn == 'white' else 0) | self.castling_rights() << 1
+        return POSITION_FORMAT.pack(bytes(cells), flags, 0xFF, self.halfmove_clock,
+                                    self.ply_offset + len(self.move_history), self.hash, moved)
+
+    @classmethod
+    def from_bytes(cls, data):
+        board = cls(setup=False)
+        board.load_bytes(data)
+        return board
+
+    def load_bytes(self, data):
+        # Replaces the position with a to_bytes() encoding; move and key
+        # history are cleared
+        cells, flags, _, self.halfmove_clock, self.ply_offset, self.hash, moved = POSITION_FORMAT.unpack(data)
+        self.current_turn = 'white' if flags & 1 else 'black'
+        for row in range(8):
+            board_row = self.board[row]
+            for col in range(8):
+                sq = row * 8 + col
+                nibble = (cells[sq >> 1] >> ((sq & 1) * 4)) & 15
+                if not nibble:
+                    board_row[col] = None
+                    continue
+                code = nibble - 1
+                piece = PIECE_CLASSES[code % 6]('black' if code >= 6 else 'white')
+                piece.has_moved = bool(moved >> sq & 1)
+                board_row[col] = piece
+        self.move_history = []
+        self.key_history = []
+        if self.accumulator is not None:
+            self.accumulator.reset()
+
+    def snapshot(self):
+        # Immutable copy of the position (no move history) for restore()
+        return self.to_bytes()
+
+    def restore(self, snapshot, history=()):
+        # Resets the board to a snapshot(); `history` is the list of move
+        # records that led to it, so unmake_move and repetition checks keep working
+        self.load_bytes(snapshot)
+        self.move_history = list(history)
+        self.key_history = [mv['hash_before'] for mv in self.move_history]
+        self.ply_offset -= len(self.move_history)
+
     def to_fen(self):
         # Piece placement
         rows = []
@@ -325,12 +519,64 @@ class Board:
         # En passant target square: not tracked (no en passant), use '-'
         ep = '-'
 
-        # Halfmove clock and fullmove number: minimal viable values
-        halfmove = '0'
-        fullmove = str(1 + len(self.move_history) // 2)
+        halfmove = str(self.halfmove_clock)
+        fullmove = str(1 + (self.ply_offset + len(self.move_history)) // 2)
 
         return f"{placement} {active} {rights} {ep} {halfmove} {fullmove}"
 
+    @classmethod
+    def from_fen(cls, fen):
+        board = cls(setup=False)
+        board.load_fen(fen)
+        return board
+
+    def load_fen(self, fen):
+        # Inverse of to_fen. has_moved is derived: kings and rooks have moved
+        # unless a castling right needs them, pawns unless on their start rank.
+        # The en passant field is ignored (en passant is not implemented).
+        fields = fen.split()
+        if len(fields) < 2:
+            raise ValueError(f"Invalid FEN: {fen!r}")
+        rows = fields[0].split('/')
+        rights = fields[2] if len(fields) > 2 else '-'
+        if len(rows) != 8:
+            raise ValueError(f"Invalid FEN placement: {fields[0]!r}")
+        unmoved = set()
+        for flag, squares in (('K', ((7, 4), (7, 7))), ('Q', ((7, 4), (7, 0))),
+                              ('k', ((0, 4), (0, 7))), ('q', ((0, 4), (0, 0)))):
+            if flag in rights:
+                unmoved.update(squares)
+        for r, fen_row in enumerate(rows):
+            board_row = [None] * 8
+            c = 0
+            for ch in fen_row:
+                if ch.isdigit():
+                    c += int(ch)
+                    continue
+                index = 'pnbrqk'.find(ch.lower())
+                if index < 0 or c > 7:
+                    raise ValueError(f"Invalid FEN placement: {fields[0]!r}")
+                color = 'white' if ch.isupper() else 'black'
+                piece = PIECE_CLASSES[index](color)
+                if index == 0:
+                    piece.has_moved = r != (6 if color == 'white' else 1)
+                elif index in (3, 5):
+                    piece.has_moved = (r, c) not in unmoved
+                board_row[c] = piece
+                c += 1
+            if c != 8:
+                raise ValueError(f"Invalid FEN placement: {fields[0]!r}")
+            self.board[r] = board_row
+        self.current_turn = 'white' if fields[1] == 'w' else 'black'
+        self.halfmove_clock = int(fields[4]) if len(fields) > 4 else 0
+        fullmove = int(fields[5]) if len(fields) > 5 else 1
+        self.ply_offset = 2 * (fullmove - 1) + (self.current_turn == 'black')
+        self.move_history = []
+        self.key_history = []
+        self.hash = self.compute_hash()
+        if self.accumulator is not None:
+            self.accumulator.reset()
+
     def generate_pseudolegal_moves(self, color):
         moves = []
         for row in range(8):
@@ -0,0 +1,58 @@
+# board_view.py
+# pygame rendering for Board. The engine core (board.py, pieces.py, ai.py)
+# never imports pygame, so headless tools and worker processes start fast.
+import os
+import pygame
+
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'assets')
+SQUARE_SIZE = 100
+SQUARE_COLORS = [(255, 206, 158), (209, 139, 71)]
+
+
+class BoardView:
+    # Piece images and the checkerboard are loaded/rendered once per process
+    images = {}
+    _background = None
+
+    def __init__(self):
+        if not BoardView.images:
+            self.load_images()
+
+    def load_images(self):
+        pieces = ['pawn', 'rook', 'knight', 'bishop', 'queen', 'king']
+        colors = ['white', 'black']
+        for color in colors:
+            for piece in pieces:
+                image_path = os.path.join(ASSETS_DIR, f"{color}_{piece}.png")
+                if os.path.exists(image_path):
+                    image = pygame.image.load(image_path)
+                    BoardView.images[f"{color}_{piece}"] = pygame.transform.scale(image, (SQUARE_SIZE, SQUARE_SIZE))
+
+    @classmethod
+    def background(cls):
+        if cls._background is None:
+            surface = pygame.Surface((8 * SQUARE_SIZE, 8 * SQUARE_SIZE))
+            for row in range(8):
+                for col in range(8):
+                    surface.fill(SQUARE_COLORS[(row + col) % 2], cls.square_rect(row, col))
+            cls._background = surface
+        return cls._background
+
+    @staticmethod
+    def square_rect(row, col):
+        return pygame.Rect(col * SQUARE_SIZE, row * SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE)
+
+    def draw_square(self, screen, board, row, col):
+        rect = self.square_rect(row, col)
+        screen.blit(self.background(), rect.topleft, rect)
+        piece = board.board[row][col]
+        if piece:
+            image = BoardView.images.get(f"{piece.color}_{piece.name}")
+            if image:
+                screen.blit(image, rect.topleft)
+        return rect
+
+    def draw(self, screen, board):
+        for row in range(8):
+            for col in range(8):
+                self.draw_square(screen, board, row, col)
@@ -0,0 +1,302 @@
+# book.py
+# Polyglot opening book support.
+#
+# A Polyglot .bin file is a sorted array of 16-byte big-endian entries
+# (key u64, move u16, weight u16, learn u32). The file is memory-mapped and
+# probed with a binary search on the Polyglot Zobrist key, so a lookup costs
+# a handful of page reads instead of a search.
+#
+# Build a book from a PGN corpus:
+#   python book.py build games.pgn book.bin --max-ply 24
+# Probe a position reached by UCI moves:
+#   python book.py probe book.bin e2e4 e7e5
+import argparse
+import mmap
+import os
+import random
+import re
+import struct
+import sys
+from collections import defaultdict
+
+from pieces import King, Rook, Pawn
+from polyglot_random import RANDOM64
+
+ENTRY = struct.Struct('>QHHI')
+KEY = struct.Struct('>Q')
+
+# Polyglot piece kinds: black pawn = 0, white pawn = 1, black knight = 2, ...
+POLYGLOT_KIND = {
+    ('pawn', 'black'): 0, ('pawn', 'white'): 1,
+    ('knight', 'black'): 2, ('knight', 'white'): 3,
+    ('bishop', 'black'): 4, ('bishop', 'white'): 5,
+    ('rook', 'black'): 6, ('rook', 'white'): 7,
+    ('queen', 'black'): 8, ('queen', 'white'): 9,
+    ('king', 'black'): 10, ('king', 'white'): 11,
+}
+CASTLE_OFFSET = 768
+EP_OFFSET = 772
+TURN_OFFSET = 780
+
+
+def polyglot_key(board, color=None):
+    # Polyglot hash for `board` with `color` to move (defaults to board.current_turn).
+    # Polyglot ranks count from White's side, so our row r is Polyglot row 7 - r.
+    color = color or board.current_turn
+    h = 0
+    for r in range(8):
+        for c in range(8):
+            piece = board.board[r][c]
+            if piece:
+                h ^= RANDOM64[64 * POLYGLOT_KIND[(piece.name, piece.color)] + 8 * (7 - r) + c]
+
+    # Castling rights inferred from has_moved flags, as in Board.to_fen
+    for offset, row, rook_col in ((0, 7, 7), (1, 7, 0), (2, 0, 7), (3, 0, 0)):
+        king = board.get_piece(row, 4)
+        rook = board.get_piece(row, rook_col)
+        if isinstance(king, King) and not king.has_moved and isinstance(rook, Rook) and not rook.has_moved:
+            h ^= RANDOM64[CASTLE_OFFSET + offset]
+
+    # En passant file only counts when a pawn of the side to move could capture
+    if board.move_history:
+        last = board.move_history[-1]
+        sr, _ = last['start_pos']
+        er, ec = last['end_pos']
+        if isinstance(last['piece'], Pawn) and abs(er - sr) == 2:
+            for dc in (-1, 1):
+                p = board.get_piece(er, ec + dc)
+                if isinstance(p, Pawn) and p.color == color:
+                    h ^= RANDOM64[EP_OFFSET + ec]
+                    break
+
+    if color == 'white':
+        h ^= RANDOM64[TURN_OFFSET]
+    return h
+
+
+def decode_move(raw):
+    # Polyglot move -> ((sr, sc), (er, ec)) in board coordinates
+    to_col = raw & 7
+    to_row = 7 - ((raw >> 3) & 7)
+    from_col = (raw >> 6) & 7
+    from_row = 7 - ((raw >> 9) & 7)
+    # Castling is stored as "king takes own rook"
+    if from_col == 4 and from_row in (0, 7) and to_row == from_row and to_col in (0, 7):
+        to_col = 6 if to_col == 7 else 2
+    return (from_row, from_col), (to_row, to_col)
+
+
+def encode_move(board, move):
+    (sr, sc), (er, ec) = move
+    piece = board.get_piece(sr, sc)
+    if isinstance(piece, King) and abs(ec - sc) == 2:
+        ec = 7 if ec == 6 else 0
+    raw = ec | ((7 - er) << 3) | (sc << 6) | ((7 - sr) << 9)
+    if isinstance(piece, Pawn) and er in (0, 7):
+        raw |= 4 << 12  # queen
+    return raw
+
+
+class PolyglotBook:
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        self._count = size // ENTRY.size
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self._count
+
+    def _first_index(self, key):
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if KEY.unpack_from(self._mm, mid * ENTRY.size)[0] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def entries(self, key):
+        # [(move, weight, learn), ...] for a Polyglot key
+        if not self._count:
+            return []
+        out = []
+        i = self._first_index(key)
+        while i < self._count:
+            k, raw, weight, learn = ENTRY.unpack_from(self._mm, i * ENTRY.size)
+            if k != key:
+                break
+            out.append((decode_move(raw), weight, learn))
+            i += 1
+        return out
+
+    def find_move(self, board, color=None, mode='weighted', rng=None):
+        # Pick a book move that is legal on `board`; None when out of book
+        color = color or board.current_turn
+        candidates = []
+        for move, weight, _ in self.entries(polyglot_key(board, color)):
+            piece = board.get_piece(*move[0])
+            if not piece or piece.color != color:
+                continue
+            if move[1] not in board.generate_pseudolegal_moves_from_square(*move[0]):
+                continue
+            if board.would_be_in_check(color, *move[0], *move[1]):
+                continue
+            candidates.append((move, weight))
+        if not candidates:
+            return None
+        if mode == 'best':
+            return max(candidates, key=lambda mw: mw[1])[0]
+        total = sum(w for _, w in candidates)
+        if total == 0:
+            return candidates[0][0]
+        pick = (rng or random).randrange(total)
+        for move, weight in candidates:
+            pick -= weight
+            if pick < 0:
+                return move
+        return candidates[-1][0]
+
+
+# ---------- PGN corpus -> book ----------
+
+_COMMENT = re.compile(r'\{[^}]*\}|;[^\n]*')
+_NAG = re.compile(r'\$\d+')
+_MOVE_NO = re.compile(r'^\d+\.+')
+RESULTS = ('1-0', '0-1', '1/2-1/2', '*')
+
+
+def _strip_variations(text):
+    out, depth = [], 0
+    for ch in text:
+        if ch == '(':
+            depth += 1
+        elif ch == ')':
+            depth = max(0, depth - 1)
+        elif depth == 0:
+            out.append(ch)
+    return ''.join(out)
+
+
+def read_pgn_games(path):
+    # Yields (headers, [san, ...]) for each game in a PGN file
+    headers, movetext = {}, []
+
+    def flush():
+        text = _strip_variations(_COMMENT.sub(' ', ' '.join(movetext)))
+        sans = []
+        for tok in _NAG.sub(' ', text).split():
+            tok = _MOVE_NO.sub('', tok)
+            if tok and tok not in RESULTS:
+                sans.append(tok)
+        return headers, sans
+
+    with open(path, encoding='utf-8', errors='replace') as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith('['):
+                if movetext:
+                    yield flush()
+                    headers, movetext = {}, []
+                m = re.match(r'\[(\w+)\s+"(.*)"\]', line)
+                if m:
+                    headers[m.group(1)] = m.group(2)
+            elif line:
+                movetext.append(line)
+    if movetext:
+        yield flush()
+
+
+def build_book(pgn_paths, out_path, max_ply=24, min_games=1, weighting='results'):
+    # Counts every (position, move) seen in the first `max_ply` plies of the corpus.
+    # With 'results' weighting a win scores 2, a draw 1 and a loss 0 for the mover.
+    from board import Board
+    from notation import san_to_move
+
+    stats = defaultdict(lambda: [0, 0])  # (key, raw) -> [games, score]
+    games = 0
+    for path in pgn_paths:
+        for headers, sans in read_pgn_games(path):
+            if headers.get('FEN') or headers.get('SetUp') == '1':
+                continue
+            result = headers.get('Result', '*')
+            games += 1
+            board = Board()
+            for ply, san in enumerate(sans[:max_ply]):
+                color = board.current_turn
+                move = san_to_move(board, san, color)
+                if move is None:
+                    break
+                key = polyglot_key(board, color)
+                rec = stats[(key, encode_move(board, move))]
+                rec[0] += 1
+                if result == '1/2-1/2':
+                    rec[1] += 1
+                elif result == ('1-0' if color == 'white' else '0-1'):
+                    rec[1] += 2
+                board.make_move(*move[0], *move[1], validate=False)
+
+    entries = []
+    for (key, raw), (count, score) in stats.items():
+        if count < min_games:
+            continue
+        weight = count if weighting == 'frequency' else score
+        if weight > 0:
+            entries.append((key, raw, weight))
+    top = max((w for _, _, w in entries), default=1)
+    scale = 65535 / top if top > 65535 else 1
+    entries.sort(key=lambda e: (e[0], -e[2]))
+    with open(out_path, 'wb') as f:
+        for key, raw, weight in entries:
+            f.write(ENTRY.pack(key, raw, max(1, int(weight * scale)), 0))
+    return games, len(entries)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Polyglot opening book tools')
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    b = sub.add_parser('build', help='build a .bin book from PGN files')
+    b.add_argument('pgn', nargs='+')
+    b.add_argument('out')
+    b.add_argument('--max-ply', type=int, default=24)
+    b.add_argument('--min-games', type=int, default=1)
+    b.add_argument('--weighting', choices=['results', 'frequency'], default='results')
+    p = sub.add_parser('probe', help='list book moves after a UCI move sequence')
+    p.add_argument('book')
+    p.add_argument('moves', nargs='*')
+    args = parser.parse_args(argv)
+
+    if args.cmd == 'build':
+        games, n = build_book(args.pgn, args.out, args.max_ply, args.min_games, args.weighting)
+        print(f"{games} games -> {n} entries written to {args.out}")
+    else:
+        from board import Board
+        from notation import uci_to_move, move_to_uci
+        board = Board()
+        for uci in args.moves:
+            (sr, sc), (er, ec) = uci_to_move(uci)
+            board.make_move(sr, sc, er, ec)
+        with PolyglotBook(args.book) as book:
+            key = polyglot_key(board)
+            print(f"key {key:016x}")
+            for move, weight, _ in sorted(book.entries(key), key=lambda e: -e[1]):
+                print(f"{move_to_uci(move)} {weight}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
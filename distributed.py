@@ -0,0 +1,483 @@
+# distributed.py
+# Root-split analysis of one position across worker agents on several hosts.
+#
+#   python distributed.py worker --host 0.0.0.0 --port 9100      # on each machine
+#   python distributed.py analyse --fen "<FEN>" --workers a:9100,b:9100 --movetime 600000
+#   python distributed.py analyse --local 4 --depth 7            # agents on localhost
+#
+# The coordinator orders the root moves and deals them round-robin to the
+# agents, each of which runs iterative deepening on its share
+# (SearchLimits.searchmoves). A depth is reported once every agent has
+# completed it; the best score over all shares is the result. Every
+# exchange_ms the coordinator collects each agent's deepest transposition
+# entries it has not shared yet and forwards them to the other agents, which
+# keep an entry only if it is deeper than their own.
+#
+# Messages are length-prefixed binary frames: positions as Board.to_bytes()
+# plus the repetition key history, moves as from * 64 + to in 16 bits and
+# transposition entries in 16 bytes. Agents do not authenticate the
+# coordinator; only expose them on trusted networks.
+import argparse
+import itertools
+import math
+import multiprocessing
+import queue
+import socket
+import struct
+import sys
+import threading
+import time
+
+from ai import AI, SearchInfo
+from analysis_cache import encode_move, decode_move
+from board import Board
+from limits import SearchLimits
+from notation import legal_moves, move_to_uci
+from search_worker import WORKER_TT_LIMIT
+
+DEFAULT_PORT = 9100
+EXCHANGE_MS = 1000
+# Entries per agent and exchange, and the shallowest depth worth sending
+SHARE_ENTRIES = 4096
+SHARE_DEPTH = 2
+
+# Frame: payload length, message kind
+HEADER = struct.Struct('!IB')
+ANALYSE, STOP, INFO, RESULT, TT_REQUEST, TT_ENTRIES, ERROR = range(1, 8)
+# job id, depth, movetime ms, nodes (0 = none), root moves, history keys
+ANALYSE_FORMAT = struct.Struct('!IBIIHH')
+POSITION_SIZE = len(Board().to_bytes())
+# job id, depth, bound, score, move, nodes, time ms, pv length
+INFO_FORMAT = struct.Struct('!IBBiHIIH')
+# color, entry count
+ENTRIES_FORMAT = struct.Struct('!BI')
+# key, depth, flag, value, move
+ENTRY_FORMAT = struct.Struct('!QBBiH')
+REQUEST_FORMAT = struct.Struct('!IB')
+NO_MOVE = 0xFFFF
+NO_SCORE = -(1 << 31)
+BOUNDS = ('exact', 'lower', 'upper', 'none', 'book')
+FLAGS = ('EXACT', 'LOWERBOUND', 'UPPERBOUND')
+COLORS = ('white', 'black')
+
+
+def _move_code(move):
+    return NO_MOVE if move is None else encode_move(move)
+
+
+def _code_move(code):
+    return None if code == NO_MOVE else decode_move(code)
+
+
+def send_frame(sock, kind, payload=b''):
+    sock.sendall(HEADER.pack(len(payload), kind) + payload)
+
+
+def _recv_exact(sock, size):
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError('connection closed')
+        data += chunk
+    return bytes(data)
+
+
+def recv_frame(sock):
+    size, kind = HEADER.unpack(_recv_exact(sock, HEADER.size))
+    return kind, _recv_exact(sock, size)
+
+
+def pack_analyse(job_id, board, moves, depth=None, movetime_ms=None, nodes=None):
+    history = board.key_history[len(board.key_history) - board.halfmove_clock:]
+    return b''.join([
+        ANALYSE_FORMAT.pack(job_id, depth or 0, movetime_ms or 0, nodes or 0, len(moves), len(history)),
+        struct.pack(f'!{len(moves)}H', *map(encode_move, moves)),
+        board.to_bytes(),
+        struct.pack(f'!{len(history)}Q', *history),
+    ])
+
+
+def unpack_analyse(data):
+    # -> job id, board, root moves, SearchLimits fields
+    job_id, depth, movetime_ms, nodes, n_moves, n_history = ANALYSE_FORMAT.unpack_from(data)
+    offset = ANALYSE_FORMAT.size
+    moves = [decode_move(code) for code in struct.unpack_from(f'!{n_moves}H', data, offset)]
+    offset += 2 * n_moves
+    board = Board.from_bytes(data[offset:offset + POSITION_SIZE])
+    board.key_history = list(struct.unpack_from(f'!{n_history}Q', data, offset + POSITION_SIZE))
+    limits = {'depth': depth or None, 'movetime_ms': movetime_ms or None, 'nodes': nodes or None}
+    return job_id, board, moves, limits
+
+
+def pack_info(job_id, info):
+    score = NO_SCORE if info.score is None or abs(info.score) == float('inf') else int(info.score)
+    return (INFO_FORMAT.pack(job_id, info.depth, BOUNDS.index(info.bound), score, _move_code(info.move),
+                             info.nodes, info.time_ms, len(info.pv))
+            + struct.pack(f'!{len(info.pv)}H', *map(encode_move, info.pv)))
+
+
+def unpack_info(data):
+    job_id, depth, bound, score, move, nodes, time_ms, n_pv = INFO_FORMAT.unpack_from(data)
+    pv = [decode_move(code) for code in struct.unpack_from(f'!{n_pv}H', data, INFO_FORMAT.size)]
+    return job_id, SearchInfo(depth, None if score == NO_SCORE else score, BOUNDS[bound],
+                              _code_move(move), nodes, time_ms, pv)
+
+
+def pack_entries(color, entries):
+    # entries: (key, (depth, flag, value, move)); aspiration windows can leave
+    # fractional bounds, rounded so they stay valid bounds
+    return ENTRIES_FORMAT.pack(COLORS.index(color), len(entries)) + b''.join(
+        ENTRY_FORMAT.pack(key, depth, FLAGS.index(flag),
+                          math.ceil(value) if flag == 'UPPERBOUND' else math.floor(value), _move_code(move))
+        for key, (depth, flag, value, move) in entries)
+
+
+def unpack_entries(data):
+    color, count = ENTRIES_FORMAT.unpack_from(data)
+    entries = []
+    for i in range(count):
+        key, depth, flag, value, move = ENTRY_FORMAT.unpack_from(data, ENTRIES_FORMAT.size + i * ENTRY_FORMAT.size)
+        entries.append((key, (depth, FLAGS[flag], value, _code_move(move))))
+    return COLORS[color], entries
+
+
+def merge_entries(table, entries):
+    # Keeps an incoming entry only where it is deeper than the local one
+    for key, entry in entries:
+        current = table.get(key)
+        if current is None or current[0] < entry[0]:
+            table[key] = entry
+
+
+# ---------- worker agent ----------
+
+class _Session:
+    # One coordinator connection: searches run in a thread so stop and
+    # transposition requests are handled while searching
+    def __init__(self, sock, engines):
+        self.sock = sock
+        self.engines = engines
+        self.send_lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.search = None
+        self.shared = {}    # color -> {key: depth} already sent
+
+    def send(self, kind, payload=b''):
+        with self.send_lock:
+            send_frame(self.sock, kind, payload)
+
+    def engine(self, color):
+        ai = self.engines.get(color)
+        if ai is None:
+            ai = self.engines[color] = AI(color)
+            ai.time_ms = None
+        return ai
+
+    def run(self):
+        try:
+            while True:
+                kind, data = recv_frame(self.sock)
+                if kind == ANALYSE:
+                    self.start(data)
+                elif kind == STOP:
+                    self.stop_event.set()
+                elif kind == TT_REQUEST:
+                    self.send_entries(*REQUEST_FORMAT.unpack(data))
+                elif kind == TT_ENTRIES:
+                    color, entries = unpack_entries(data)
+                    merge_entries(self.engine(color).transposition_table, entries)
+                    self.shared.setdefault(color, {}).update((key, entry[0]) for key, entry in entries)
+        except (ConnectionError, OSError, struct.error):
+            pass
+        finally:
+            self.stop_event.set()
+            self.sock.close()
+
+    def start(self, data):
+        if self.search is not None:
+            self.stop_event.set()
+            self.search.join()
+        self.stop_event = threading.Event()
+        self.search = threading.Thread(target=self.analyse, args=(data, self.stop_event), daemon=True)
+        self.search.start()
+
+    def analyse(self, data, stop_event):
+        job_id = 0
+        try:
+            job_id, board, moves, limits = unpack_analyse(data)
+            ai = self.engine(board.current_turn)
+            if len(ai.transposition_table) > WORKER_TT_LIMIT:
+                ai.transposition_table.clear()
+                self.shared.pop(ai.color, None)
+            last = None
+            for info in ai.iter_search(board, SearchLimits(**limits, stop_event=stop_event, searchmoves=moves)):
+                last = info
+                self.send(INFO, pack_info(job_id, info))
+            if last is None:
+                last = SearchInfo(0, None, 'none', None, ai.nodes, 0)
+            self.send(RESULT, pack_info(job_id, last))
+        except (ConnectionError, OSError):
+            pass
+        except Exception as exc:
+            self.send(ERROR, struct.pack('!I', job_id) + f"{type(exc).__name__}: {exc}".encode())
+
+    def send_entries(self, limit, min_depth):
+        # The deepest entries of every engine not sent (at that depth) before;
+        # list() copies the table in one step while the search thread writes to it
+        for color, ai in list(self.engines.items()):
+            shared = self.shared.setdefault(color, {})
+            candidates = [(key, entry) for key, entry in list(ai.transposition_table.items())
+                          if entry[0] >= min_depth and shared.get(key, -1) < entry[0]
+                          and abs(entry[2]) != float('inf')]
+            candidates.sort(key=lambda item: item[1][0], reverse=True)
+            chosen = candidates[:limit]
+            shared.update((key, entry[0]) for key, entry in chosen)
+            self.send(TT_ENTRIES, pack_entries(color, chosen))
+
+
+def serve(host='127.0.0.1', port=DEFAULT_PORT, ready=None):
+    # Worker agent: serves coordinators one connection at a time, keeping its
+    # engines (and transposition tables) between analyses
+    engines = {}
+    with socket.create_server((host, port)) as listener:
+        if ready is not None:
+            ready.put(listener.getsockname()[1])
+        while True:
+            sock, _ = listener.accept()
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            _Session(sock, engines).run()
+
+
+def start_local_workers(count):
+    # Agent processes on localhost ephemeral ports -> (processes, addresses)
+    ready = multiprocessing.Queue()
+    processes = []
+    for _ in range(count):
+        process = multiprocessing.Process(target=serve, args=('127.0.0.1', 0, ready), daemon=True)
+        process.start()
+        processes.append(process)
+    return processes, [('127.0.0.1', ready.get(timeout=30)) for _ in processes]
+
+
+# ---------- coordinator ----------
+
+class Coordinator:
+    def __init__(self, addresses, exchange_ms=EXCHANGE_MS, share_entries=SHARE_ENTRIES, share_depth=SHARE_DEPTH):
+        self.addresses = list(addresses)
+        self.exchange_ms = exchange_ms
+        self.share_entries = share_entries
+        self.share_depth = share_depth
+        self.sockets = []
+        self.inbox = queue.Queue()
+        self._ids = itertools.count(1)
+        self._orderers = {}
+        # key -> depth of entries forwarded to every agent, per color
+        self.shared = {color: {} for color in COLORS}
+        self.entries_shared = 0
+
+    def connect(self):
+        for index, (host, port) in enumerate(self.addresses):
+            sock = socket.create_connection((host, port), timeout=30)
+            sock.settimeout(None)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self.sockets.append(sock)
+            threading.Thread(target=self._read, args=(index, sock), daemon=True).start()
+        return self
+
+    def close(self):
+        for sock in self.sockets:
+            sock.close()
+        self.sockets = []
+
+    def __enter__(self):
+        return self.connect()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _read(self, index, sock):
+        try:
+            while True:
+                kind, data = recv_frame(sock)
+                self.inbox.put((index, kind, data))
+        except (ConnectionError, OSError, struct.error):
+            self.inbox.put((index, None, b''))
+
+    def split(self, board, moves):
+        # Root moves in search order, dealt round-robin so every agent gets
+        # a mix of likely best and unlikely moves
+        color = board.current_turn
+        orderer = self._orderers.get(color)
+        if orderer is None:
+            orderer = self._orderers[color] = AI(color)
+        ordered = orderer.order_moves(moves, board)
+        parts = [ordered[i::len(self.sockets)] for i in range(len(self.sockets))]
+        return [(index, part) for index, part in enumerate(parts) if part]
+
+    def get_move(self, board, limits=None):
+        best = None
+        for info in self.iter_search(board, limits):
+            best = info
+        return best.move if best else None
+
+    def iter_search(self, board, limits=None):
+        # Yields a SearchInfo (score from the side to move) whenever every
+        # agent has completed another depth, then the final result
+        limits = limits or SearchLimits(depth=8)
+        if not self.sockets:
+            self.connect()
+        moves = legal_moves(board, board.current_turn)
+        if not moves:
+            return
+        start = time.monotonic()
+        job_id = next(self._ids)
+        parts = self.split(board, moves)
+        nodes = limits.nodes // len(parts) if limits.nodes else None
+        for index, part in parts:
+            send_frame(self.sockets[index], ANALYSE,
+                       pack_analyse(job_id, board, part, limits.max_depth(), limits.movetime_ms, nodes))
+        exact = {index: {} for index, _ in parts}    # agent -> depth -> SearchInfo
+        final = {}
+        latest_nodes = dict.fromkeys(exact, 0)
+        reported = 0
+        last = None
+        stopped = False
+        next_exchange = time.monotonic() + self.exchange_ms / 1000
+        try:
+            while len(final) < len(parts):
+                if not stopped and limits.stop_event is not None and limits.stop_event.is_set():
+                    stopped = True
+                    self.stop(job_id, exact)
+                if time.monotonic() >= next_exchange:
+                    next_exchange = time.monotonic() + self.exchange_ms / 1000
+                    request = REQUEST_FORMAT.pack(self.share_entries, self.share_depth)
+                    for index in exact:
+                        send_frame(self.sockets[index], TT_REQUEST, request)
+                try:
+                    index, kind, data = self.inbox.get(timeout=0.05)
+                except queue.Empty:
+                    continue
+                if kind is None:
+                    raise ConnectionError(f"worker {self.addresses[index]} disconnected")
+                if kind == TT_ENTRIES:
+                    self.exchange(index, data)
+                    continue
+                if kind == ERROR:
+                    raise RuntimeError(f"worker {self.addresses[index]}: {data[4:].decode()}")
+                info_job, info = unpack_info(data)
+                if info_job != job_id or index not in exact:
+                    continue
+                latest_nodes[index] = info.nodes
+                if kind == RESULT:
+                    final[index] = info
+                elif info.bound == 'exact':
+                    exact[index][info.depth] = info
+                    common = min(max(found, default=0) for found in exact.values())
+                    if common > reported:
+                        reported = common
+                        last = self.combine([found[common] for found in exact.values()], latest_nodes, start)
+                        yield last
+        finally:
+            # Abandoned by the caller or failed (an agent disconnected or
+            # reported an error): stop the agents still searching
+            self.stop(job_id, [index for index in exact if index not in final])
+        result = self.result(exact, final, latest_nodes, start)
+        if last is None or (result.depth, result.move) != (last.depth, last.move):
+            yield result
+
+    def stop(self, job_id, indexes):
+        for index in indexes:
+            try:
+                send_frame(self.sockets[index], STOP, struct.pack('!I', job_id))
+            except OSError:
+                pass
+
+    def combine(self, infos, latest_nodes, start):
+        best = max(infos, key=lambda info: info.score)
+        return SearchInfo(best.depth, best.score, 'exact', best.move, sum(latest_nodes.values()),
+                          int((time.monotonic() - start) * 1000), best.pv)
+
+    def result(self, exact, final, latest_nodes, start):
+        # Deepest depth completed by every agent; if one stopped before its
+        # first iteration, the best score any agent reported
+        common = min(max(found, default=0) for found in exact.values())
+        if common:
+            return self.combine([found[common] for found in exact.values()], latest_nodes, start)
+        scored = [info for info in final.values() if info.score is not None and info.move]
+        if scored:
+            return self.combine(scored, latest_nodes, start)
+        move = next(info.move for info in final.values() if info.move)
+        return SearchInfo(0, None, 'none', move, sum(latest_nodes.values()), int((time.monotonic() - start) * 1000))
+
+    def exchange(self, source, data):
+        # Forwards an agent's new entries to the other agents
+        color, entries = unpack_entries(data)
+        shared = self.shared[color]
+        fresh = [(key, entry) for key, entry in entries if shared.get(key, -1) < entry[0]]
+        if not fresh:
+            return
+        shared.update((key, entry[0]) for key, entry in fresh)
+        self.entries_shared += len(fresh)
+        payload = pack_entries(color, fresh)
+        for index, sock in enumerate(self.sockets):
+            if index != source:
+                send_frame(sock, TT_ENTRIES, payload)
+
+
+def parse_address(text):
+    host, _, port = text.rpartition(':')
+    return (host or '127.0.0.1', int(port or DEFAULT_PORT))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Distributed root-split analysis')
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    wk = sub.add_parser('worker', help='run a worker agent')
+    wk.add_argument('--host', default='127.0.0.1')
+    wk.add_argument('--port', type=int, default=DEFAULT_PORT)
+    an = sub.add_parser('analyse', help='analyse a position on worker agents')
+    an.add_argument('--fen', default=None, help='position (default: start position)')
+    an.add_argument('--workers', default='', help='comma-separated host:port agents')
+    an.add_argument('--local', type=int, default=0, help='start this many agents on localhost')
+    an.add_argument('--depth', type=int, default=None)
+    an.add_argument('--movetime', type=int, default=None, help='ms')
+    an.add_argument('--exchange', type=int, default=EXCHANGE_MS, help='ms between TT exchanges')
+    args = parser.parse_args(argv)
+
+    if args.cmd == 'worker':
+        print(f"worker agent on {args.host}:{args.port}", flush=True)
+        try:
+            serve(args.host, args.port)
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    addresses = [parse_address(a) for a in args.workers.split(',') if a]
+    processes = []
+    if args.local:
+        processes, local = start_local_workers(args.local)
+        addresses += local
+    if not addresses:
+        parser.error('give --workers and/or --local')
+    board = Board.from_fen(args.fen) if args.fen else Board()
+    limits = SearchLimits(depth=args.depth, movetime_ms=args.movetime)
+    if limits.depth is None and limits.movetime_ms is None:
+        limits.depth = 6
+    with Coordinator(addresses, exchange_ms=args.exchange) as coordinator:
+        info = None
+        for info in coordinator.iter_search(board, limits):
+            score = 'none' if info.score is None else info.score
+            print(f"depth {info.depth} score {score} nodes {info.nodes} time {info.time_ms} "
+                  f"pv {' '.join(move_to_uci(m) for m in info.pv)}", flush=True)
+        if info is None:
+            print(f"no legal moves: {board.status()}")
+        else:
+            print(f"bestmove {move_to_uci(info.move)} ({coordinator.entries_shared} TT entries shared)")
+    for process in processes:
+        process.terminate()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,20 +1,37 @@
 # game.py
 import pygame
 from board import Board
+from board_view import BoardView
 from ai import AI
+from limits import SearchLimits
+from notation import move_to_san
+from uicache import LRUCache
+from analysis_cache import AnalysisCache
 
 DEBUG = False
+# Review mode keeps a board snapshot every this many plies
+SNAPSHOT_INTERVAL = 16
 
 class Game:
-    def __init__(self, screen):
+    def __init__(self, screen, scheduler=None):
         self.screen = screen
         self.board = Board()
+        self.view = BoardView()
         self.selected_piece = None
         # Typography
         self.font = pygame.font.SysFont(None, 36)
         self.small_font = pygame.font.SysFont(None, 22)
         self.tiny_font = pygame.font.SysFont(None, 16)
         self.ai = AI('black')  # AI always plays as black with hard difficulty
+        # On-disk analysis results shared by the game AI, the sidebar analysis
+        # and later sessions (None if the cache file cannot be opened)
+        self.analysis_cache = AnalysisCache.open_default()
+        self.ai.analysis_cache = self.analysis_cache
+        # Optional scheduler.SearchScheduler shared by many games: the AI's
+        # moves are then searched in its worker pool and polled each frame
+        self.scheduler = scheduler
+        self.ai_job = None
+        self.ai_job_key = None  # (ply, position hash) the pending search is for
         self.game_over = False
         self.winner = None
         # Sidebar and review/analysis state
@@ -24,15 +41,31 @@ class Game:
         self.in_review = False
         self.analysis_enabled = False
         self.analysis_depth = 2
-        self.analysis_result = None  # (best_move, score)
+        self.analysis_result = None  # (principal variation text, score)
         self.last_analyzed_ply = -1
         self.move_scroll = 0  # for scrolling move list
+        self.move_cells = []  # (rect, ply after the move) for click-to-jump
+        self.snapshots = {0: self.board.snapshot()}  # ply -> Board.snapshot()
         self.live_chip_rect = None
         # Built-in engine analysis only
         self.last_move_color = None
         self.waiting_for_white = False
         self.last_ai_move_count = -1  # Track AI moves to prevent duplicates
         self.ai_moved_this_turn = False  # Flag to prevent AI from moving multiple times per turn
+        # Rendering: frame cap, redraw flags and what is currently on screen
+        self.max_fps = 60
+        self.dirty = True          # board squares may have changed
+        self.sidebar_dirty = True  # sidebar contents changed
+        self.full_redraw = True    # repaint and flip the whole window
+        self.hover_rect = None
+        self.drawn_squares = [[None] * 8 for _ in range(8)]
+        self.banner_rect = None
+        self.sidebar_chrome = None
+        # Position-keyed caches for derived UI data (see uicache.py)
+        self.eval_cache = LRUCache(512)
+        self.targets_cache = LRUCache(64)
+        self.line_cache = LRUCache(1024)
+        self.text_cache = LRUCache(512)
 
         # UI palette
         self.UI_BG = (30, 34, 40)
@@ -80,9 +113,27 @@ class Game:
     def handle_events(self):
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
+                self.cancel_ai_job()
+                if self.analysis_cache is not None:
+                    self.analysis_cache.close()
                 pygame.quit()
                 exit()
 
+            if event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED, pygame.WINDOWRESTORED):
+                self.full_redraw = True
+            if event.type == pygame.MOUSEMOTION:
+                # Sidebar buttons have a hover state; redraw only when it changes
+                hover = None
+                for rect in (self.btn_to_start, self.btn_back, self.btn_forward, self.btn_to_end, self.btn_analyze):
+                    if rect.collidepoint(event.pos):
+                        hover = rect
+                if hover != self.hover_rect:
+                    self.hover_rect = hover
+                    self.sidebar_dirty = True
+            if event.type in (pygame.MOUSEBUTTONDOWN, pygame.KEYDOWN, pygame.MOUSEWHEEL):
+                self.dirty = True
+                self.sidebar_dirty = True
+
             if event.type == pygame.MOUSEBUTTONDOWN:
                 pos = pygame.mouse.get_pos()
                 # Sidebar click handling always active
@@ -94,7 +145,7 @@ class Game:
             if event.type == pygame.MOUSEWHEEL:
                 # Scroll move list
                 self.move_scroll -= event.y * 2  # smooth-ish scrolling
-                self.move_scroll = max(0, min(self.move_scroll, max(0, len(self.board.move_history) - 1)))
+                self.move_scroll = max(0, min(self.move_scroll, max(0, (len(self.full_line()) + 1) // 2 - 1)))
             if event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_LEFT:
                     self.step_back()
@@ -148,11 +199,29 @@ class Game:
     def update(self):
         # Keep last-move cache synced with current history
         self._refresh_last_move_color()
+        self.record_snapshot()
+        # A pending scheduler search for a position left behind (review,
+        # undo) is cancelled so its worker moves on
+        if self.ai_job is not None and self.ai_job_key != (len(self.board.move_history), self.board.hash):
+            self.cancel_ai_job()
+            self.ai_moved_this_turn = False
         
         # Only allow AI to move if it's actually AI's turn and no recent AI move
         if not self.game_over and self.board.current_turn == 'black' and not self.in_review:
             if DEBUG:
                 print("AI's turn.")
+
+            # Pending scheduler search (still for this position): play its
+            # move once done
+            if self.ai_job is not None:
+                if self.ai_job.done():
+                    job, self.ai_job = self.ai_job, None
+                    move = job.move
+                    if move is None and self.board.has_legal_move('black'):
+                        # The worker failed; search locally instead
+                        move = self.ai.get_move(self.board)
+                    self.play_ai_move(move)
+                return
             
             # Check if AI already moved this turn
             if self.ai_moved_this_turn:
@@ -188,76 +257,132 @@ class Game:
                 
             # Mark that AI is attempting to move this turn
             self.ai_moved_this_turn = True
-            
-            move = self.ai.get_move(self.board)
-            if move:
-                start_pos, end_pos = move
+
+            if self.scheduler is not None:
+                self.ai_job = self.scheduler.submit(self.board, 'interactive', self.ai.time_ms, self.ai.depth)
+                self.ai_job_key = (len(self.board.move_history), self.board.hash)
+                return
+            self.play_ai_move(self.ai.get_move(self.board))
+
+    def cancel_ai_job(self):
+        if self.ai_job is not None:
+            self.scheduler.cancel(self.ai_job)
+            self.ai_job = None
+
+    def play_ai_move(self, move):
+        if move:
+            start_pos, end_pos = move
+            if DEBUG:
+                print(f"AI attempting to move from {start_pos} to {end_pos}")
+            if self.board.make_move(*start_pos, *end_pos):
                 if DEBUG:
-                    print(f"AI attempting to move from {start_pos} to {end_pos}")
-                if self.board.make_move(*start_pos, *end_pos):
-                    if DEBUG:
-                        print(f"AI moved from {start_pos} to {end_pos}")
-                    self.last_move_color = 'black'
-                    self.waiting_for_white = True
-                    self.last_ai_move_count = len(self.board.move_history)  # Track this move
-                    self.check_game_over()
-                else:
-                    if DEBUG:
-                        print("AI attempted an invalid move.")
-                    # Reset the flag if move failed
-                    self.ai_moved_this_turn = False
+                    print(f"AI moved from {start_pos} to {end_pos}")
+                self.last_move_color = 'black'
+                self.waiting_for_white = True
+                self.last_ai_move_count = len(self.board.move_history)  # Track this move
+                self.check_game_over()
+                self.dirty = True
+                self.sidebar_dirty = True
             else:
                 if DEBUG:
-                    print("AI has no valid moves. Game over.")
-                self.game_over = True
-                self.winner = 'White'
-                # Reset the flag if no moves available
+                    print("AI attempted an invalid move.")
+                # Reset the flag if move failed
                 self.ai_moved_this_turn = False
+        else:
+            if DEBUG:
+                print("AI has no valid moves. Game over.")
+            self.game_over = True
+            self.winner = 'White'
+            self.dirty = True
+            # Reset the flag if no moves available
+            self.ai_moved_this_turn = False
 
     def draw(self):
-        # Fill sidebar background first
-        pygame.draw.rect(self.screen, self.UI_BG, (self.board_pixels, 0, self.sidebar_width, 800))
-
-        # Draw chessboard area
-        self.board.draw(self.screen)
-        if self.selected_piece:
-            row, col, _ = self.selected_piece
-            pygame.draw.rect(self.screen, (255, 255, 0), (col * 100, row * 100, 100, 100), 5)
+        # Repaints only squares whose piece or highlight changed and the sidebar
+        # when flagged, then pushes just those rects to the display
+        full = self.full_redraw
+        rects = []
+        selected = self.selected_piece[:2] if self.selected_piece else None
+        targets = self.legal_targets(*selected) if selected else ()
+        changed = []
+        for row in range(8):
+            for col in range(8):
+                piece = self.board.board[row][col]
+                state = (f"{piece.color}_{piece.name}" if piece else None, (row, col) == selected,
+                         (row, col) in targets)
+                if full or state != self.drawn_squares[row][col]:
+                    self.drawn_squares[row][col] = state
+                    changed.append((row, col))
+
+        # Game-over banner sits on top of the squares below it
+        banner = None
         if self.game_over:
             if self.winner == 'Draw':
-                text = self.font.render("Game is a Draw!", True, (255, 255, 0))
+                banner = self.font.render("Game is a Draw!", True, (255, 255, 0))
             else:
-                text = self.font.render(f"{self.winner} wins!", True, (255, 0, 0))
-            self.screen.blit(text, (350, 375))
-        # Sidebar UI
-        self.update_sidebar_layout_geometry()
-        self.draw_sidebar()
-        pygame.display.flip()
+                banner = self.font.render(f"{self.winner} wins!", True, (255, 0, 0))
+        banner_rect = banner.get_rect(topleft=(350, 375)) if banner else None
+        if banner_rect != self.banner_rect:
+            for rect in (self.banner_rect, banner_rect):
+                if rect:
+                    for row in range(rect.top // 100, (rect.bottom - 1) // 100 + 1):
+                        for col in range(rect.left // 100, (rect.right - 1) // 100 + 1):
+                            if (row, col) not in changed:
+                                changed.append((row, col))
+            self.banner_rect = banner_rect
+
+        for row, col in changed:
+            rect = self.view.draw_square(self.screen, self.board, row, col)
+            if (row, col) == selected:
+                pygame.draw.rect(self.screen, (255, 255, 0), rect, 5)
+            elif (row, col) in targets:
+                # Dot for quiet moves, ring around capturable pieces
+                if self.board.board[row][col]:
+                    pygame.draw.circle(self.screen, (90, 110, 70), rect.center, 46, 5)
+                else:
+                    pygame.draw.circle(self.screen, (90, 110, 70), rect.center, 14)
+            rects.append(rect)
+        if banner and changed and banner_rect.collidelist(rects) != -1:
+            self.screen.blit(banner, banner_rect)
+
+        if full or self.sidebar_dirty:
+            self.update_sidebar_layout_geometry()
+            self.draw_sidebar()
+            rects.append(pygame.Rect(self.board_pixels, 0, self.sidebar_width, 800))
+
+        if full:
+            pygame.display.flip()
+        elif rects:
+            pygame.display.update(rects)
+        self.dirty = self.sidebar_dirty = self.full_redraw = False
 
     def check_game_over(self):
         if DEBUG:
             print("Checking if the game is over...")
-        if self.board.is_checkmate('black'):
-            self.game_over = True
-            self.winner = 'White'
-            if DEBUG:
-                print("Checkmate detected. White wins!")
-        elif self.board.is_checkmate('white'):
-            self.game_over = True
-            self.winner = 'Black'
+        status = self.board.status()
+        if status == 'ongoing':
+            return
+        self.game_over = True
+        if status == 'checkmate':
+            self.winner = 'White' if self.board.current_turn == 'black' else 'Black'
             if DEBUG:
-                print("Checkmate detected. Black wins!")
-        elif self.board.is_stalemate('black') or self.board.is_stalemate('white'):
-            self.game_over = True
+                print(f"Checkmate detected. {self.winner} wins!")
+        else:
             self.winner = 'Draw'
             if DEBUG:
-                print("Stalemate detected. The game is a draw.")
+                reason = 'stalemate' if status == 'stalemate' else self.board.draw_reason()
+                print(f"Draw by {reason}.")
 
     def run(self):
+        # Frame-capped loop that only draws when something changed. Drawing
+        # before update() shows the human move before the engine starts thinking.
+        clock = pygame.time.Clock()
         while True:
             self.handle_events()
+            if self.dirty or self.sidebar_dirty or self.full_redraw:
+                self.draw()
             self.update()
-            self.draw()
+            clock.tick(self.max_fps)
 
     # ---------- Sidebar, review, and analysis helpers ----------
     def handle_sidebar_click(self, pos):
@@ -273,6 +398,11 @@ class Game:
             self.analysis_enabled = not self.analysis_enabled
             self.analysis_result = None
             self.last_analyzed_ply = -1
+        else:
+            for rect, ply in self.move_cells:
+                if rect.collidepoint(pos):
+                    self.go_to_ply(ply)
+                    break
 
     def step_back(self):
         mv = self.board.unmake_move(switch_turn=True)
@@ -299,30 +429,76 @@ class Game:
         self._refresh_last_move_color()
 
     def go_to_start(self):
-        while True:
-            mv = self.board.unmake_move(switch_turn=True)
-            if not mv:
-                break
-            self.redo_stack.append(mv)
-        self.in_review = True
-        # Reset AI tracking when going to start
-        self.last_ai_move_count = -1
-        self.ai_moved_this_turn = False
-        self._refresh_last_move_color()
+        self.go_to_ply(0)
 
     def go_to_end(self):
-        while self.redo_stack:
-            self.step_forward()
-        self.in_review = False
-        # Reset AI tracking when going to end
+        self.go_to_ply(len(self.full_line()))
+
+    def full_line(self):
+        # Every move of the game: the played-through history plus the redo stack
+        return self.board.move_history + self.redo_stack[::-1]
+
+    def record_snapshot(self):
+        ply = len(self.board.move_history)
+        if ply % SNAPSHOT_INTERVAL == 0 and ply not in self.snapshots:
+            self.snapshots[ply] = self.board.snapshot()
+
+    def go_to_ply(self, ply):
+        # Jump to the position after `ply` moves of the game line: restore the
+        # nearest snapshot at or before it and replay fewer than
+        # SNAPSHOT_INTERVAL moves, unless walking from the current ply is shorter
+        line = self.full_line()
+        ply = max(0, min(ply, len(line)))
+        current = len(self.board.move_history)
+        base = ply - ply % SNAPSHOT_INTERVAL
+        while base not in self.snapshots:
+            base -= SNAPSHOT_INTERVAL
+        if abs(ply - current) > ply - base:
+            self.board.restore(self.snapshots[base], line[:base])
+            current = base
+        while current > ply:
+            self.board.unmake_move(switch_turn=True)
+            current -= 1
+        while current < ply:
+            mv = line[current]
+            self.board.make_move(*mv['start_pos'], *mv['end_pos'], switch_turn=True, validate=False)
+            current += 1
+        self.redo_stack = line[ply:][::-1]
+        self.in_review = bool(self.redo_stack)
+        self.selected_piece = None
+        # Reset AI tracking when jumping around the game
         self.last_ai_move_count = -1
         self.ai_moved_this_turn = False
         self._refresh_last_move_color()
+        self.record_snapshot()
 
     def coords_to_square(self, r, c):
         files = 'abcdefgh'
         return f"{files[c]}{8 - r}"
 
+    def position_key(self):
+        return (self.board.hash, self.board.current_turn)
+
+    def cached_eval(self):
+        # White-perspective static eval of the displayed position
+        return self.eval_cache.get(self.position_key(), lambda: -self.ai.evaluate_board(self.board))
+
+    def legal_targets(self, row, col):
+        piece = self.board.get_piece(row, col)
+        if not piece:
+            return ()
+        return self.targets_cache.get(self.position_key() + (row, col),
+                                      lambda: frozenset(self.board.get_valid_moves(piece, row, col)))
+
+    def render_text(self, font, text, color):
+        return self.text_cache.get((id(font), text, color), lambda: font.render(text, True, color))
+
+    def move_text(self, mv):
+        # Keyed by the position before the move plus the move itself, so it
+        # stays valid across undo/redo and jumps
+        key = (mv['hash_before'], mv['start_pos'], mv['end_pos'])
+        return self.line_cache.get(key, lambda: self.format_move(mv))
+
     def format_move(self, mv):
         piece = mv['piece']
         sr, sc = mv['start_pos']
@@ -382,24 +558,44 @@ class Game:
             fill = tuple(min(255, int(c * 1.08)) for c in fill)
         pygame.draw.rect(self.screen, fill, rect, border_radius=20)
         pygame.draw.rect(self.screen, self.UI_PANEL_BORDER, rect, 1, border_radius=20)
-        text = self.small_font.render(label, True, (255, 255, 255))
+        text = self.render_text(self.small_font, label, (255, 255, 255))
         self.screen.blit(text, (rect.x + (rect.w - text.get_width()) // 2,
                                 rect.y + (rect.h - text.get_height()) // 2))
 
     # draw_small_button removed (engine toggle no longer used)
 
-    def draw_panel(self, rect, title=None):
+    def draw_panel(self, rect, title=None, surface=None):
+        surface = surface or self.screen
         # Shadow
         shadow = pygame.Rect(rect.x + 2, rect.y + 3, rect.w, rect.h)
         srf = pygame.Surface((shadow.w, shadow.h), pygame.SRCALPHA)
         pygame.draw.rect(srf, (0, 0, 0, 60), srf.get_rect(), border_radius=12)
-        self.screen.blit(srf, shadow.topleft)
+        surface.blit(srf, shadow.topleft)
         # Panel
-        pygame.draw.rect(self.screen, self.UI_PANEL, rect, border_radius=12)
-        pygame.draw.rect(self.screen, self.UI_PANEL_BORDER, rect, 1, border_radius=12)
+        pygame.draw.rect(surface, self.UI_PANEL, rect, border_radius=12)
+        pygame.draw.rect(surface, self.UI_PANEL_BORDER, rect, 1, border_radius=12)
         if title:
             title_text = self.small_font.render(title, True, self.UI_TEXT)
-            self.screen.blit(title_text, (rect.x + 12, rect.y + 10))
+            surface.blit(title_text, (rect.x + 12, rect.y + 10))
+
+    def sidebar_panels(self):
+        # Control, evaluation and move-list panel rects in screen coordinates
+        x = self.board_pixels
+        ctrl_rect = pygame.Rect(x + 6, 6, self.sidebar_width - 12, 96)
+        eval_rect = pygame.Rect(x + 6, ctrl_rect.bottom + 8, self.sidebar_width - 12, 170)
+        moves_rect = pygame.Rect(x + 6, eval_rect.bottom + 8, self.sidebar_width - 12, 800 - (eval_rect.bottom + 14))
+        return ctrl_rect, eval_rect, moves_rect
+
+    def build_sidebar_chrome(self):
+        # Background and empty panels never change, so render them once
+        chrome = pygame.Surface((self.sidebar_width, 800))
+        chrome.fill(self.UI_BG)
+        ctrl_rect, eval_rect, moves_rect = self.sidebar_panels()
+        offset = -self.board_pixels
+        self.draw_panel(ctrl_rect.move(offset, 0), surface=chrome)
+        self.draw_panel(eval_rect.move(offset, 0), title='Evaluation', surface=chrome)
+        self.draw_panel(moves_rect.move(offset, 0), title='Moves', surface=chrome)
+        self.sidebar_chrome = chrome
 
     def draw_gradient_bar(self, x, y, w, h, top_color, bottom_color, radius=8):
         # Simple vertical gradient
@@ -425,26 +621,61 @@ class Game:
         # Compute analysis using built-in engine only on a safe clone of the board
         side = self.board.current_turn
         ana_ai = AI(side)
-        ana_ai.depth = max(5, self.analysis_depth)
-        ana_ai.time_ms = 600
+        ana_ai.analysis_cache = self.analysis_cache
+        limits = SearchLimits(depth=max(5, self.analysis_depth), movetime_ms=600)
         # Search on a cloned board to guarantee no state mutations
         cloned = self.board.clone()
-        best = ana_ai.get_move(cloned)
+        best = ana_ai.get_move(cloned, limits)
         if best:
-            (sr, sc), (er, ec) = best
-            best_str = f"{self.coords_to_square(sr, sc)}-{self.coords_to_square(er, ec)}"
+            pv_str = self.format_pv(cloned, ana_ai.pv or [best], ply)
         else:
-            best_str = "(no move)"
-        white_eval = -self.ai.evaluate_board(self.board)
-        self.analysis_result = (best_str, white_eval)
+            pv_str = "(no move)"
+        white_eval = self.cached_eval()
+        self.analysis_result = (pv_str, white_eval)
         self.last_analyzed_ply = ply
 
+    def format_pv(self, board, pv, ply=None):
+        # SAN line with move numbers, e.g. "12... Nf6 13. c4 e6"
+        parts = []
+        if ply is None:
+            ply = len(board.move_history)
+        played = 0
+        try:
+            for i, move in enumerate(pv):
+                color = board.current_turn
+                if color == 'white':
+                    parts.append(f"{ply // 2 + 1}.")
+                elif i == 0:
+                    parts.append(f"{ply // 2 + 1}...")
+                parts.append(move_to_san(board, move, color))
+                board.make_move(*move[0], *move[1], switch_turn=True, validate=False)
+                played += 1
+                ply += 1
+        finally:
+            for _ in range(played):
+                board.unmake_move(switch_turn=True)
+        return ' '.join(parts)
+
+    def wrap_text(self, text, font, max_width):
+        lines = []
+        line = ''
+        for word in text.split():
+            candidate = f"{line} {word}" if line else word
+            if line and font.size(candidate)[0] > max_width:
+                lines.append(line)
+                line = word
+            else:
+                line = candidate
+        if line:
+            lines.append(line)
+        return lines
+
     def draw_sidebar(self):
-        x = self.board_pixels
+        if self.sidebar_chrome is None:
+            self.build_sidebar_chrome()
+        self.screen.blit(self.sidebar_chrome, (self.board_pixels, 0))
+        ctrl_rect, eval_rect, moves_rect = self.sidebar_panels()
 
-        # Top controls panel
-        ctrl_rect = pygame.Rect(x + 6, 6, self.sidebar_width - 12, 96)
-        self.draw_panel(ctrl_rect)
         # Icon buttons row
         self.draw_icon_button(self.btn_to_start, 'first')
         self.draw_icon_button(self.btn_back, 'prev')
@@ -458,20 +689,18 @@ class Game:
         chip_rect = self.live_chip_rect
         if chip_rect:
             pygame.draw.rect(self.screen, (90, 98, 110), chip_rect, border_radius=13)
-            chip_text = self.tiny_font.render(mode, True, (255, 255, 255))
+            chip_text = self.render_text(self.tiny_font, mode, (255, 255, 255))
             self.screen.blit(chip_text, (chip_rect.x + (chip_rect.w - chip_text.get_width()) // 2,
                                          chip_rect.y + (chip_rect.h - chip_text.get_height()) // 2))
 
         # Evaluation panel
-        eval_rect = pygame.Rect(x + 6, ctrl_rect.bottom + 8, self.sidebar_width - 12, 170)
-        self.draw_panel(eval_rect, title='Evaluation')
         # Prefer analysis engine score if available
         self.ensure_analysis()
         if self.analysis_result:
             _, white_eval_val = self.analysis_result
-            white_eval = white_eval_val if white_eval_val is not None else -self.ai.evaluate_board(self.board)
+            white_eval = white_eval_val if white_eval_val is not None else self.cached_eval()
         else:
-            white_eval = -self.ai.evaluate_board(self.board)
+            white_eval = self.cached_eval()
         score = max(-500, min(500, int(white_eval)))
         bar_h = 120
         bar_w = 28
@@ -492,39 +721,48 @@ class Game:
         # Marker line
         marker_y = inner.y + white_portion
         pygame.draw.rect(self.screen, (255, 215, 0), (inner.x - 3, max(inner.y, marker_y - 1), inner.w + 6, 2), border_radius=2)
-        eval_text = self.small_font.render(f"White {score/100:.2f}", True, self.UI_TEXT)
+        eval_text = self.render_text(self.small_font, f"White {score/100:.2f}", self.UI_TEXT)
         self.screen.blit(eval_text, (bar_x + bar_w + 12, bar_y))
         if self.analysis_result:
-            best_str, _ = self.analysis_result
-            best_text = self.small_font.render(f"Best: {best_str}", True, self.UI_TEXT)
-            self.screen.blit(best_text, (bar_x + bar_w + 12, bar_y + 28))
+            pv_str, _ = self.analysis_result
+            text_x = bar_x + bar_w + 12
+            width = eval_rect.right - text_x - 10
+            pv_lines = self.line_cache.get(('pv', pv_str, width),
+                                           lambda: self.wrap_text(f"PV: {pv_str}", self.small_font, width))
+            for i, line in enumerate(pv_lines[:5]):
+                pv_text = self.render_text(self.small_font, line, self.UI_TEXT)
+                self.screen.blit(pv_text, (text_x, bar_y + 28 + i * 20))
 
         # Moves panel
-        moves_rect = pygame.Rect(x + 6, eval_rect.bottom + 8, self.sidebar_width - 12, 800 - (eval_rect.bottom + 14))
-        self.draw_panel(moves_rect, title='Moves')
-        # Create move lines grouped by ply pairs (1. e2-e4 e7-e5)
-        lines = []
-        mh = self.board.move_history
-        for i in range(0, len(mh), 2):
-            num = i // 2 + 1
-            wmv = self.format_move(mh[i]) if i < len(mh) else ''
-            bmv = self.format_move(mh[i + 1]) if i + 1 < len(mh) else ''
-            lines.append(f"{num}. {wmv}   {bmv}")
+        # Move lines grouped by ply pairs (1. e2-e4 e7-e5) over the whole game
+        # line; only the visible ones are formatted. Clicking a move jumps to it.
+        line = self.full_line()
+        line_count = (len(line) + 1) // 2
         # Scroll clamp
         max_visible = (moves_rect.h - 40) // 24
-        max_offset = max(0, len(lines) - max_visible)
+        max_offset = max(0, line_count - max_visible)
         self.move_scroll = max(0, min(self.move_scroll, max_offset))
         start = self.move_scroll
-        end = min(len(lines), start + max_visible)
+        end = min(line_count, start + max_visible)
         y = moves_rect.y + 36
-        # Alternating stripes and highlight last line
-        last_line_index = (len(mh) - 1) // 2 if mh else -1
+        # Alternating stripes and highlight the move leading to the shown position
+        current = len(self.board.move_history) - 1
+        self.move_cells = []
         for idx in range(start, end):
             row_rect = pygame.Rect(moves_rect.x + 8, y - 2, moves_rect.w - 16, 24)
             if idx % 2 == 0:
                 pygame.draw.rect(self.screen, self.UI_STRIPE, row_rect, border_radius=6)
-            if idx == last_line_index:
-                pygame.draw.rect(self.screen, (70, 80, 100), row_rect, 2, border_radius=6)
-            text = self.small_font.render(lines[idx], True, self.UI_TEXT)
-            self.screen.blit(text, (moves_rect.x + 14, y))
+            num = self.render_text(self.small_font, f"{idx + 1}.", self.UI_TEXT_MUTED)
+            self.screen.blit(num, (row_rect.x + 6, y))
+            for half, cell_x in ((0, row_rect.x + 42), (1, row_rect.x + 42 + (row_rect.w - 42) // 2)):
+                ply = 2 * idx + half
+                if ply >= len(line):
+                    break
+                cell = pygame.Rect(cell_x, row_rect.y, (row_rect.w - 42) // 2, row_rect.h)
+                if ply == current:
+                    pygame.draw.rect(self.screen, (70, 80, 100), cell, 2, border_radius=6)
+                color = self.UI_TEXT if ply <= current else self.UI_TEXT_MUTED
+                text = self.render_text(self.small_font, self.move_text(line[ply]), color)
+                self.screen.blit(text, (cell.x + 6, y))
+                self.move_cells.append((cell, ply + 1))
             y += 24
@@ -0,0 +1,40 @@
+# limits.py
+# Search limits passed to AI.get_move.
+#
+# Any combination may be given; the search stops at whichever limit is hit
+# first. A search bounded only by nodes and/or depth never looks at the
+# clock, so it is fully deterministic for a given AI state and position.
+
+# Iteration cap for searches without a depth limit
+MAX_DEPTH = 64
+
+
+class SearchStopped(Exception):
+    # Raised inside the search when a node, time or stop limit is reached
+    pass
+
+
+class SearchLimits:
+    def __init__(self, depth=None, nodes=None, movetime_ms=None, mate=None,
+                 infinite=False, stop_event=None, clock=None, early_stop=False, searchmoves=None):
+        self.depth = depth              # max iterative-deepening depth (plies)
+        self.nodes = nodes              # max nodes searched
+        self.movetime_ms = movetime_ms  # hard time limit for this move
+        self.mate = mate                # look for a mate in N moves
+        self.infinite = infinite        # ignore time; run until stop_event is set
+        self.stop_event = stop_event    # threading.Event-like object with is_set()
+        self.clock = clock              # timeman.Clock for soft/hard allocation
+        self.early_stop = early_stop    # movetime may end early on a stable best move
+        self.searchmoves = searchmoves  # only these root moves are searched (as UCI go searchmoves)
+
+    def max_depth(self):
+        depth = self.depth or MAX_DEPTH
+        if self.mate:
+            # Mate is only recognised at full-width nodes (qsearch does not
+            # test for it), so a mate in N needs 2N plies
+            depth = min(depth, 2 * self.mate)
+        return depth
+
+    def __repr__(self):
+        fields = ', '.join(f"{k}={v!r}" for k, v in vars(self).items() if v not in (None, False))
+        return f"SearchLimits({fields})"
@@ -0,0 +1,345 @@
+# match.py
+# Headless engine-vs-engine match runner.
+#
+# Plays AI-vs-AI games in parallel worker processes, streams PGN as games
+# finish and reports an Elo estimate together with an SPRT (sequential
+# probability ratio test) so a tuning run can stop as soon as the result
+# is statistically clear.
+#
+# Example:
+#   python match.py --games 200 --depth-a 4 --depth-b 3 --pgn out.pgn
+import argparse
+import ast
+import math
+import multiprocessing
+import os
+import sys
+import time
+
+from board import Board
+from ai import AI
+from notation import move_to_san, uci_to_move
+from timeman import Clock
+from limits import SearchLimits
+
+# Short balanced openings (UCI move sequences from the initial position).
+# Each opening is played twice with colors reversed.
+DEFAULT_OPENINGS = [
+    'e2e4 e7e5 g1f3 b8c6',
+    'e2e4 c7c5 g1f3 d7d6',
+    'e2e4 e7e6 d2d4 d7d5',
+    'e2e4 c7c6 d2d4 d7d5',
+    'd2d4 d7d5 c2c4 e7e6',
+    'd2d4 g8f6 c2c4 e7e6',
+    'd2d4 g8f6 c2c4 g7g6',
+    'c2c4 e7e5 b1c3 g8f6',
+    'g1f3 d7d5 g2g3 g8f6',
+    'e2e4 e7e5 f1c4 g8f6',
+]
+
+
+def load_openings(path):
+    openings = []
+    with open(path) as f:
+        for line in f:
+            line = line.split('#', 1)[0].strip()
+            if line:
+                openings.append(line)
+    return openings
+
+
+def parse_options(pairs):
+    # ["name=value", ...] -> {name: value}; values are Python literals when possible
+    options = {}
+    for pair in pairs or []:
+        key, _, raw = pair.partition('=')
+        try:
+            value = ast.literal_eval(raw)
+        except (ValueError, SyntaxError):
+            value = raw
+        options[key.strip()] = value
+    return options
+
+
+def build_engine(cfg, color):
+    ai = AI(color)
+    ai.depth = cfg['depth']
+    ai.time_ms = cfg['time_ms'] or None
+    if cfg.get('tc'):
+        ai.clock = Clock.parse(cfg['tc'])
+    for key, value in cfg['options'].items():
+        if not hasattr(ai, key):
+            raise ValueError(f"Unknown engine option for {cfg['name']}: {key}")
+        setattr(ai, key, value)
+    return ai
+
+
+def play_game(task):
+    # Runs in a worker process; returns a plain dict so it pickles cheaply
+    index, opening, white_cfg, black_cfg, adj = task
+    board = Board()
+    sans = []
+    for uci in opening.split():
+        (sr, sc), (er, ec) = uci_to_move(uci)
+        san = move_to_san(board, ((sr, sc), (er, ec)))
+        if not board.make_move(sr, sc, er, ec):
+            raise ValueError(f"Illegal opening move {uci} in '{opening}'")
+        sans.append(san)
+    book_plies = len(sans)
+
+    cfgs = {'white': white_cfg, 'black': black_cfg}
+    engines = {color: build_engine(cfg, color) for color, cfg in cfgs.items()}
+    result, termination = None, None
+    win_streak = {'white': 0, 'black': 0}
+    draw_streak = 0
+
+    while result is None:
+        color = board.current_turn
+        status = board.status()
+        if status == 'checkmate':
+            result = '0-1' if color == 'white' else '1-0'
+            termination = 'checkmate'
+            break
+        if status == 'stalemate':
+            result, termination = '1/2-1/2', 'stalemate'
+            break
+        if status == 'draw':
+            result, termination = '1/2-1/2', board.draw_reason()
+            break
+        if len(sans) - book_plies >= adj['max_plies']:
+            result, termination = '1/2-1/2', 'adjudication: move limit'
+            break
+
+        ai = engines[color]
+        if ai.clock:
+            ai.clock.start()
+        cfg = cfgs[color]
+        # Node-limited engines search deterministically, independent of machine load
+        limits = SearchLimits(depth=cfg['depth'], nodes=cfg['nodes']) if cfg.get('nodes') else None
+        move = ai.get_move(board, limits)
+        if ai.clock and not ai.clock.stop():
+            result = '0-1' if color == 'white' else '1-0'
+            termination = 'time forfeit'
+            break
+        sans.append(move_to_san(board, move))
+        board.make_move(*move[0], *move[1], validate=False)
+
+        # Score adjudication, using the mover's own last completed score
+        score = ai.last_score
+        if score is None or abs(score) == float('inf'):
+            continue
+        white_score = score if color == 'white' else -score
+        leader = 'white' if white_score > 0 else 'black'
+        if abs(white_score) >= adj['resign_score']:
+            win_streak[leader] += 1
+            win_streak['black' if leader == 'white' else 'white'] = 0
+        else:
+            win_streak = {'white': 0, 'black': 0}
+        if win_streak[leader] >= adj['resign_plies']:
+            result = '1-0' if leader == 'white' else '0-1'
+            termination = 'adjudication: score'
+        if abs(white_score) <= adj['draw_score'] and len(sans) >= adj['draw_after']:
+            draw_streak += 1
+        else:
+            draw_streak = 0
+        if result is None and draw_streak >= adj['draw_plies']:
+            result, termination = '1/2-1/2', 'adjudication: draw score'
+
+    return {
+        'index': index,
+        'white': white_cfg['name'],
+        'black': black_cfg['name'],
+        'result': result,
+        'termination': termination,
+        'opening': opening,
+        'sans': sans,
+    }
+
+
+def format_pgn(game, round_no):
+    headers = [
+        ('Event', 'Engine match'),
+        ('Site', 'local'),
+        ('Date', time.strftime('%Y.%m.%d')),
+        ('Round', str(round_no)),
+        ('White', game['white']),
+        ('Black', game['black']),
+        ('Result', game['result']),
+        ('Termination', game['termination']),
+        ('Opening', game['opening']),
+        ('PlyCount', str(len(game['sans']))),
+    ]
+    out = [f'[{k} "{v}"]' for k, v in headers]
+    out.append('')
+    tokens = []
+    for i, san in enumerate(game['sans']):
+        if i % 2 == 0:
+            tokens.append(f"{i // 2 + 1}.")
+        tokens.append(san)
+    tokens.append(game['result'])
+    line = ''
+    for tok in tokens:
+        if line and len(line) + 1 + len(tok) > 79:
+            out.append(line)
+            line = tok
+        else:
+            line = f"{line} {tok}" if line else tok
+    out.append(line)
+    out.append('')
+    return '\n'.join(out) + '\n'
+
+
+# ---------- Statistics ----------
+
+def elo_to_score(elo):
+    return 1.0 / (1.0 + 10 ** (-elo / 400.0))
+
+
+def score_to_elo(score):
+    score = min(max(score, 1e-6), 1 - 1e-6)
+    return -400.0 * math.log10(1.0 / score - 1.0)
+
+
+def elo_estimate(wins, draws, losses):
+    # Returns (elo, 95% error margin) for engine A
+    n = wins + draws + losses
+    if n == 0:
+        return 0.0, float('inf')
+    score = (wins + 0.5 * draws) / n
+    var = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / n
+    sd = math.sqrt(var / n)
+    lo = score_to_elo(score - 1.96 * sd)
+    hi = score_to_elo(score + 1.96 * sd)
+    return score_to_elo(score), (hi - lo) / 2
+
+
+def sprt_llr(wins, draws, losses, elo0, elo1):
+    # Trinomial GSPRT log-likelihood ratio (normal approximation)
+    n = wins + draws + losses
+    if n == 0 or wins + losses == 0:
+        return 0.0
+    score = (wins + 0.5 * draws) / n
+    var = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / n
+    if var <= 0:
+        return 0.0
+    s0, s1 = elo_to_score(elo0), elo_to_score(elo1)
+    return (s1 - s0) * (2 * score - s0 - s1) * n / (2 * var)
+
+
+def sprt_bounds(alpha, beta):
+    return math.log(beta / (1 - alpha)), math.log((1 - beta) / alpha)
+
+
+def build_tasks(args, openings, cfg_a, cfg_b):
+    tasks = []
+    adj = {
+        'max_plies': args.max_plies,
+        'resign_score': args.resign_score,
+        'resign_plies': args.resign_plies,
+        'draw_score': args.draw_score,
+        'draw_plies': args.draw_plies,
+        'draw_after': args.draw_after,
+    }
+    for i in range(args.games):
+        opening = openings[(i // 2) % len(openings)]
+        if i % 2 == 0:
+            tasks.append((i, opening, cfg_a, cfg_b, adj))
+        else:
+            tasks.append((i, opening, cfg_b, cfg_a, adj))
+    return tasks
+
+
+def run_match(args):
+    openings = load_openings(args.openings) if args.openings else DEFAULT_OPENINGS
+    cfg_a = {'name': args.name_a, 'depth': args.depth_a, 'time_ms': args.time_a, 'tc': args.tc_a,
+             'nodes': args.nodes_a, 'options': parse_options(args.opt_a)}
+    cfg_b = {'name': args.name_b, 'depth': args.depth_b, 'time_ms': args.time_b, 'tc': args.tc_b,
+             'nodes': args.nodes_b, 'options': parse_options(args.opt_b)}
+    # Fail fast on bad options instead of inside every worker
+    build_engine(cfg_a, 'white')
+    build_engine(cfg_b, 'white')
+
+    tasks = build_tasks(args, openings, cfg_a, cfg_b)
+    lower, upper = sprt_bounds(args.alpha, args.beta)
+    wins = draws = losses = 0
+    verdict = None
+    started = time.time()
+    pgn_file = open(args.pgn, 'a') if args.pgn else None
+
+    ctx = multiprocessing.get_context()
+    pool = ctx.Pool(processes=args.concurrency)
+    try:
+        for n, game in enumerate(pool.imap_unordered(play_game, tasks, chunksize=1), start=1):
+            a_is_white = game['white'] == cfg_a['name']
+            if game['result'] == '1/2-1/2':
+                draws += 1
+            elif (game['result'] == '1-0') == a_is_white:
+                wins += 1
+            else:
+                losses += 1
+            if pgn_file:
+                pgn_file.write(format_pgn(game, game['index'] + 1))
+                pgn_file.flush()
+
+            elo, margin = elo_estimate(wins, draws, losses)
+            llr = sprt_llr(wins, draws, losses, args.elo0, args.elo1)
+            rate = n / max(1e-9, time.time() - started) * 3600
+            print(f"Games {n}: +{wins} ={draws} -{losses}  Elo {elo:+.1f} +/- {margin:.1f}  "
+                  f"LLR {llr:.2f} [{lower:.2f}, {upper:.2f}]  {rate:.0f} games/h", flush=True)
+            if llr >= upper:
+                verdict = 'H1 accepted'
+                break
+            if llr <= lower:
+                verdict = 'H0 accepted'
+                break
+    finally:
+        pool.terminate()
+        pool.join()
+        if pgn_file:
+            pgn_file.close()
+
+    print(f"SPRT({args.elo0}, {args.elo1}): {verdict or 'inconclusive'}")
+    return wins, draws, losses, verdict
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Parallel headless engine-vs-engine match with SPRT')
+    parser.add_argument('--games', type=int, default=100)
+    parser.add_argument('--concurrency', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--openings', help='file with one UCI move sequence per line')
+    parser.add_argument('--pgn', help='append finished games to this PGN file')
+    for side in ('a', 'b'):
+        parser.add_argument(f'--name-{side}', default=f'Engine{side.upper()}')
+        parser.add_argument(f'--depth-{side}', type=int, default=4)
+        parser.add_argument(f'--time-{side}', type=int, default=1500, help='ms per move, 0 = unlimited')
+        parser.add_argument(f'--tc-{side}', metavar='TC',
+                            help='clock, e.g. 60+0.6 or 40/120 (seconds); overrides --time')
+        parser.add_argument(f'--nodes-{side}', type=int, help='node limit per move (deterministic)')
+        parser.add_argument(f'--opt-{side}', action='append', metavar='NAME=VALUE',
+                            help='set an AI attribute, e.g. --opt-a use_null_move=False')
+    parser.add_argument('--max-plies', type=int, default=300, help='draw after this many engine plies')
+    parser.add_argument('--resign-score', type=int, default=1000, help='centipawns for win adjudication')
+    parser.add_argument('--resign-plies', type=int, default=6)
+    parser.add_argument('--draw-score', type=int, default=10, help='centipawns for draw adjudication')
+    parser.add_argument('--draw-plies', type=int, default=16)
+    parser.add_argument('--draw-after', type=int, default=80, help='earliest ply for draw adjudication')
+    parser.add_argument('--elo0', type=float, default=0.0)
+    parser.add_argument('--elo1', type=float, default=10.0)
+    parser.add_argument('--alpha', type=float, default=0.05)
+    parser.add_argument('--beta', type=float, default=0.05)
+    args = parser.parse_args(argv)
+    if args.name_a == args.name_b:
+        parser.error('engine names must differ')
+    # Unknown --opt names are reported here rather than as a traceback from
+    # build_engine once the match has started
+    probe = AI('white')
+    for side in ('a', 'b'):
+        unknown = [key for key in parse_options(getattr(args, f'opt_{side}')) if not hasattr(probe, key)]
+        if unknown:
+            parser.error(f"unknown engine option for --opt-{side}: {', '.join(unknown)}")
+    run_match(args)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,193 @@
+# nnue.py
+# Optional neural evaluation (NNUE-style), enabled with AI.load_nnue(path).
+#
+# Inputs are HalfKP-like: for each perspective (White, Black), one feature per
+# piece = king bucket x piece x square, seen from that side (Black's view is
+# mirrored vertically with own/enemy pieces swapped). The first layer sums the
+# weight rows of the active features into a 16-bit accumulator per
+# perspective; a clipped ReLU and one output neuron give the score.
+#
+# Board.make_move/unmake_move push and pop the changed (piece code, square)
+# pairs on the board's Accumulator. Deltas are applied lazily when a
+# position is evaluated, from the nearest computed ancestor, so the make/unmake
+# pairs used for legality checks cost almost nothing. A move of a side's own
+# king changes its bucket, so that perspective is recomputed from the board.
+#
+# Network file (little-endian, memory-mapped read-only):
+#   32-byte header: magic 'NNUE', version u16, buckets u16, features u32,
+#                   hidden u32, QA u16, QB u16, padding
+#   out_bias    int32
+#   ft_weights  int16[features][hidden]   first layer, scaled by QA
+#   ft_bias     int16[hidden]
+#   out_weights int16[2 * hidden]         White half, then Black half, scaled by QB
+# The score is White's, in centipawns: (out * SCALE) // (QA * QB). Like
+# evaluate_board it does not depend on the side to move.
+import mmap
+import struct
+
+import numpy as np
+
+MAGIC = b'NNUE'
+VERSION = 1
+HEADER = struct.Struct('<4sHHIIHH12x')
+QA = 255
+QB = 512
+SCALE = 400
+BUCKETS = 8
+FEATURES = BUCKETS * 768
+# Largest first-layer weight magnitude such that 32 features plus the bias
+# can never overflow the int16 accumulator
+MAX_FT_WEIGHT = 32767 // 33
+
+WHITE, BLACK = 0, 1
+KING_CODES = (5, 11)
+# Piece code as seen by Black: own pieces first
+FLIP_CODE = tuple(range(6, 12)) + tuple(range(6))
+
+
+def _king_bucket(sq):
+    # sq in the perspective's own orientation (own back rank = row 7):
+    # rank band (back rank, 2nd, 3rd-4th, beyond) x board half
+    rank = 7 - (sq >> 3)
+    band = rank if rank < 2 else (2 if rank < 4 else 3)
+    return band * 2 + ((sq & 7) >= 4)
+
+
+KING_BUCKET = tuple(_king_bucket(sq) for sq in range(64))
+
+
+def feature(perspective, king_sq, code, sq):
+    if perspective == WHITE:
+        return KING_BUCKET[king_sq] * 768 + code * 64 + sq
+    return KING_BUCKET[king_sq ^ 56] * 768 + FLIP_CODE[code] * 64 + (sq ^ 56)
+
+
+def active_features(board):
+    # ([White-perspective features], [Black-perspective features], king squares)
+    pieces = []
+    kings = [0, 0]
+    for row in range(8):
+        for col, piece in enumerate(board.board[row]):
+            if piece:
+                sq = row * 8 + col
+                pieces.append((piece.code, sq))
+                if piece.code in KING_CODES:
+                    kings[piece.code // 6] = sq
+    white = [feature(WHITE, kings[WHITE], code, sq) for code, sq in pieces]
+    black = [feature(BLACK, kings[BLACK], code, sq) for code, sq in pieces]
+    return white, black, kings
+
+
+class Network:
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, buckets, features, hidden, qa, qb = HEADER.unpack_from(self._mm)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path}: not a version {VERSION} network file")
+        if buckets != BUCKETS or features != FEATURES or (qa, qb) != (QA, QB):
+            raise ValueError(f"{path}: unsupported feature set or quantisation")
+        self.hidden = hidden
+        offset = HEADER.size
+        self.out_bias = int(np.frombuffer(self._mm, np.int32, 1, offset)[0])
+        offset += 4
+        self.ft_weights = np.frombuffer(self._mm, np.int16, features * hidden, offset).reshape(features, hidden)
+        offset += 2 * features * hidden
+        self.ft_bias = np.frombuffer(self._mm, np.int16, hidden, offset)
+        offset += 2 * hidden
+        out_weights = np.frombuffer(self._mm, np.int16, 2 * hidden, offset).astype(np.int64)
+        self.out_white = out_weights[:hidden]
+        self.out_black = out_weights[hidden:]
+
+    def close(self):
+        self.ft_weights = self.ft_bias = None
+        self._mm.close()
+
+    def refresh(self, features):
+        # Accumulator computed from scratch for a feature list
+        return self.ft_bias + self.ft_weights[features].sum(axis=0, dtype=np.int16)
+
+    def output(self, white_acc, black_acc):
+        out = (int(np.clip(white_acc, 0, QA) @ self.out_white)
+               + int(np.clip(black_acc, 0, QA) @ self.out_black) + self.out_bias)
+        return out * SCALE // (QA * QB)
+
+    def evaluate(self, board):
+        # Non-incremental evaluation (White's score) of a board
+        white, black, _ = active_features(board)
+        return self.output(self.refresh(white), self.refresh(black))
+
+    def accumulator(self, board):
+        return Accumulator(self, board)
+
+
+class Accumulator:
+    # Per-board accumulator stack, attached as board.accumulator. Each entry is
+    # [white acc, black acc, removed, added, white king sq, black king sq];
+    # the accumulators are None until the entry is evaluated.
+    def __init__(self, network, board):
+        self.network = network
+        self.board = board
+        self.reset()
+
+    def reset(self):
+        white, black, kings = active_features(self.board)
+        self.stack = [[self.network.refresh(white), self.network.refresh(black), (), (), kings[0], kings[1]]]
+
+    def push(self, removed, added):
+        if self.stack is not None:
+            self.stack.append([None, None, removed, added, None, None])
+
+    def pop(self):
+        if self.stack is not None and len(self.stack) > 1:
+            self.stack.pop()
+        else:
+            # Unmade past the position the accumulator was built from
+            self.stack = None
+
+    def evaluate(self):
+        # White's score for the board's current position
+        if self.stack is None:
+            self.reset()
+        return self.network.output(self._update(WHITE), self._update(BLACK))
+
+    def _update(self, perspective):
+        stack = self.stack
+        top = len(stack) - 1
+        king = KING_CODES[perspective]
+        i = top
+        while stack[i][perspective] is None:
+            if any(code == king for code, _ in stack[i][3]):
+                features = active_features(self.board)
+                stack[top][perspective] = self.network.refresh(features[perspective])
+                stack[top][4 + perspective] = features[2][perspective]
+                return stack[top][perspective]
+            i -= 1
+        weights = self.network.ft_weights
+        king_sq = stack[i][4 + perspective]
+        acc = stack[i][perspective]
+        for entry in stack[i + 1:]:
+            acc = acc.copy()
+            for code, sq in entry[2]:
+                acc -= weights[feature(perspective, king_sq, code, sq)]
+            for code, sq in entry[3]:
+                acc += weights[feature(perspective, king_sq, code, sq)]
+            entry[perspective] = acc
+            entry[4 + perspective] = king_sq
+        return acc
+
+
+def write_network(path, ft_weights, ft_bias, out_weights, out_bias):
+    # Quantises float weights (as trained by nnue_train.py) into a network file
+    hidden = ft_weights.shape[1]
+    ft_w = np.clip(np.rint(ft_weights * QA), -MAX_FT_WEIGHT, MAX_FT_WEIGHT).astype('<i2')
+    ft_b = np.clip(np.rint(ft_bias * QA), -MAX_FT_WEIGHT, MAX_FT_WEIGHT).astype('<i2')
+    out_w = np.clip(np.rint(out_weights * QB), -32768, 32767).astype('<i2')
+    out_b = np.array([np.rint(out_bias * QA * QB)], dtype='<i4')
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, BUCKETS, FEATURES, hidden, QA, QB))
+        f.write(out_b.tobytes())
+        f.write(ft_w.tobytes())
+        f.write(ft_b.tobytes())
+        f.write(out_w.tobytes())
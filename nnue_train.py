@@ -0,0 +1,242 @@
+# nnue_train.py
+# Trains the NNUE evaluation (nnue.py) on positions scored by the search.
+#
+#   python nnue_train.py label positions.txt labels.txt --depth 3
+#   python nnue_train.py train labels.txt net.nnue --epochs 10
+#
+# `label` reads one FEN per line (anything after the FEN fields, such as the
+# result in tune.py position files, is ignored), searches each position with
+# AI to a fixed depth in worker processes and writes "<FEN> <score>" lines,
+# the score in centipawns from White's side. --depth 0 uses evaluate_board.
+#
+# `train` fits the float network by minibatch Adam on the squared error
+# between sigmoid(output) and sigmoid(score / SCALE), then quantises it into a
+# network file for AI.load_nnue. NumPy is required.
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+
+import numpy as np
+
+from board import Board
+import nnue
+from nnue import FEATURES, QA, QB, SCALE, MAX_FT_WEIGHT
+
+# Search scores beyond this (mates) are clamped before training
+MAX_LABEL = 3000
+PAD = FEATURES
+SLOTS = 32
+
+
+def read_fens(path):
+    with open(path) as f:
+        for line in f:
+            tokens = line.split('#', 1)[0].replace(';', ' ').split()
+            if len(tokens) < 2:
+                continue
+            fields = tokens[:4]
+            for token in tokens[4:6]:
+                if not token.isdigit():
+                    break
+                fields.append(token)
+            yield ' '.join(fields)
+
+
+def label_chunk(task):
+    # Runs in a worker process; returns [(fen, white score)] for the chunk
+    fens, depth = task
+    from ai import AI
+    engines = {}
+    for color in ('white', 'black'):
+        ai = AI(color)
+        ai.depth = depth
+        ai.time_ms = None
+        ai.bitbases = None
+        engines[color] = ai
+    labelled = []
+    for fen in fens:
+        board = Board.from_fen(fen)
+        ai = engines[board.current_turn]
+        if depth > 0:
+            if ai.get_move(board) is None or ai.last_score is None:
+                continue
+            score = ai.last_score
+            ai.transposition_table.clear()
+        else:
+            score = ai.evaluate_board(board)
+        if ai.color == 'black':
+            score = -score
+        labelled.append((fen, max(-MAX_LABEL, min(MAX_LABEL, score))))
+    return labelled
+
+
+def label(in_path, out_path, depth, jobs=None, chunk=64):
+    fens = list(read_fens(in_path))
+    tasks = [(fens[i:i + chunk], depth) for i in range(0, len(fens), chunk)]
+    count = 0
+    with multiprocessing.Pool(jobs or os.cpu_count() or 1) as pool, open(out_path, 'w') as f:
+        for labelled in pool.imap(label_chunk, tasks):
+            for fen, score in labelled:
+                f.write(f"{fen} {score}\n")
+            count += len(labelled)
+    return count
+
+
+def load_labels(path):
+    # -> (white feature indices, black feature indices) as (N, SLOTS) arrays, scores
+    white_rows, black_rows, scores = [], [], []
+    with open(path) as f:
+        for line in f:
+            tokens = line.split()
+            if len(tokens) < 3:
+                continue
+            white, black, _ = nnue.active_features(Board.from_fen(' '.join(tokens[:-1])))
+            white_rows.append(white + [PAD] * (SLOTS - len(white)))
+            black_rows.append(black + [PAD] * (SLOTS - len(black)))
+            scores.append(float(tokens[-1]))
+    return (np.array(white_rows, dtype=np.int32), np.array(black_rows, dtype=np.int32),
+            np.array(scores, dtype=np.float32))
+
+
+def sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+class Trainer:
+    def __init__(self, hidden=128, seed=0):
+        rng = np.random.default_rng(seed)
+        # Row PAD of the first layer stays zero and absorbs padding slots
+        self.params = {
+            'ft_weights': (rng.standard_normal((FEATURES + 1, hidden)) * 0.05).astype(np.float32),
+            'ft_bias': np.full(hidden, 0.25, dtype=np.float32),
+            'out_weights': (rng.standard_normal(2 * hidden) / np.sqrt(2 * hidden)).astype(np.float32),
+            'out_bias': np.zeros(1, dtype=np.float32),
+        }
+        self.params['ft_weights'][PAD] = 0
+        self.hidden = hidden
+        self.m = {k: np.zeros_like(v) for k, v in self.params.items()}
+        self.v = {k: np.zeros_like(v) for k, v in self.params.items()}
+        self.step = 0
+
+    def forward(self, white, black):
+        p = self.params
+        acc_w = p['ft_weights'][white].sum(axis=1) + p['ft_bias']
+        acc_b = p['ft_weights'][black].sum(axis=1) + p['ft_bias']
+        h = self.hidden
+        out = (np.clip(acc_w, 0, 1) @ p['out_weights'][:h] + np.clip(acc_b, 0, 1) @ p['out_weights'][h:]
+               + p['out_bias'][0])
+        return out, acc_w, acc_b
+
+    def loss(self, white, black, scores, batch=8192):
+        total = 0.0
+        for i in range(0, len(scores), batch):
+            out, _, _ = self.forward(white[i:i + batch], black[i:i + batch])
+            total += ((sigmoid(out) - sigmoid(scores[i:i + batch] / SCALE)) ** 2).sum()
+        return total / max(1, len(scores))
+
+    def gradients(self, white, black, scores):
+        p = self.params
+        h = self.hidden
+        out, acc_w, acc_b = self.forward(white, black)
+        pred = sigmoid(out)
+        d_out = 2.0 * (pred - sigmoid(scores / SCALE)) * pred * (1.0 - pred) / len(scores)
+        act_w = np.clip(acc_w, 0, 1)
+        act_b = np.clip(acc_b, 0, 1)
+        d_acc_w = d_out[:, None] * p['out_weights'][:h] * ((acc_w > 0) & (acc_w < 1))
+        d_acc_b = d_out[:, None] * p['out_weights'][h:] * ((acc_b > 0) & (acc_b < 1))
+        # First-layer gradient: one-hot rows of the features seen in the
+        # batch (both perspectives) times the accumulator gradients
+        rows = np.concatenate([white, black])
+        features, inverse = np.unique(rows, return_inverse=True)
+        onehot = np.zeros((len(rows), len(features)), dtype=np.float32)
+        onehot[np.repeat(np.arange(len(rows)), rows.shape[1]), inverse.ravel()] = 1
+        ft_grad = np.zeros_like(p['ft_weights'])
+        ft_grad[features] = onehot.T @ np.concatenate([d_acc_w, d_acc_b])
+        ft_grad[PAD] = 0
+        return {
+            'ft_weights': ft_grad,
+            'ft_bias': d_acc_w.sum(axis=0) + d_acc_b.sum(axis=0),
+            'out_weights': np.concatenate([act_w.T @ d_out, act_b.T @ d_out]),
+            'out_bias': np.array([d_out.sum()], dtype=np.float32),
+        }
+
+    def update(self, grads, lr, beta1=0.9, beta2=0.999):
+        self.step += 1
+        for name, grad in grads.items():
+            m = self.m[name]
+            v = self.v[name]
+            m *= beta1
+            m += (1 - beta1) * grad
+            v *= beta2
+            v += (1 - beta2) * grad * grad
+            m_hat = m / (1 - beta1 ** self.step)
+            v_hat = v / (1 - beta2 ** self.step)
+            self.params[name] -= lr * m_hat / (np.sqrt(v_hat) + 1e-8)
+        # Keep every weight representable after quantisation
+        limit = MAX_FT_WEIGHT / QA
+        np.clip(self.params['ft_weights'], -limit, limit, out=self.params['ft_weights'])
+        np.clip(self.params['ft_bias'], -limit, limit, out=self.params['ft_bias'])
+        np.clip(self.params['out_weights'], -32767 / QB, 32767 / QB, out=self.params['out_weights'])
+
+    def train(self, white, black, scores, epochs=10, batch=1024, lr=1e-3, seed=0, report=None):
+        rng = np.random.default_rng(seed)
+        for epoch in range(1, epochs + 1):
+            order = rng.permutation(len(scores))
+            for i in range(0, len(order), batch):
+                idx = order[i:i + batch]
+                self.update(self.gradients(white[idx], black[idx], scores[idx]), lr)
+            if report:
+                report(epoch)
+
+    def save(self, path):
+        p = self.params
+        nnue.write_network(path, p['ft_weights'][:FEATURES], p['ft_bias'], p['out_weights'], p['out_bias'][0])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Train the NNUE evaluation')
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    lab = sub.add_parser('label', help='score FEN positions with the search')
+    lab.add_argument('positions')
+    lab.add_argument('out')
+    lab.add_argument('--depth', type=int, default=3)
+    lab.add_argument('--jobs', type=int, default=os.cpu_count() or 1)
+    tr = sub.add_parser('train', help='fit a network to labelled positions')
+    tr.add_argument('labels')
+    tr.add_argument('out')
+    tr.add_argument('--hidden', type=int, default=128)
+    tr.add_argument('--epochs', type=int, default=10)
+    tr.add_argument('--batch', type=int, default=1024)
+    tr.add_argument('--lr', type=float, default=1e-3)
+    tr.add_argument('--validation', type=float, default=0.05, help='fraction held out for the reported loss')
+    tr.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    if args.cmd == 'label':
+        start = time.time()
+        count = label(args.positions, args.out, args.depth, args.jobs)
+        print(f"{count} positions labelled in {time.time() - start:.1f}s -> {args.out}")
+        return 0
+
+    white, black, scores = load_labels(args.labels)
+    order = np.random.default_rng(args.seed).permutation(len(scores))
+    held = int(len(order) * args.validation)
+    val, fit = order[:held], order[held:]
+    trainer = Trainer(args.hidden, args.seed)
+
+    def report(epoch):
+        val_loss = trainer.loss(white[val], black[val], scores[val]) if held else float('nan')
+        print(f"epoch {epoch}: train {trainer.loss(white[fit], black[fit], scores[fit]):.6f} "
+              f"validation {val_loss:.6f}", flush=True)
+
+    print(f"{len(fit)} training / {held} validation positions")
+    trainer.train(white[fit], black[fit], scores[fit], args.epochs, args.batch, args.lr, args.seed, report)
+    trainer.save(args.out)
+    print(f"network written to {args.out}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,115 @@
+from pieces import King, Pawn
+
+FILES = 'abcdefgh'
+PIECE_LETTERS = {'knight': 'N', 'bishop': 'B', 'rook': 'R', 'queen': 'Q', 'king': 'K'}
+LETTER_PIECES = {v: k for k, v in PIECE_LETTERS.items()}
+
+
+def square_name(row, col):
+    # Row 0 is rank 8 (matches Board layout)
+    return f"{FILES[col]}{8 - row}"
+
+
+def parse_square(name):
+    return 8 - int(name[1]), FILES.index(name[0])
+
+
+def move_to_uci(move):
+    (sr, sc), (er, ec) = move
+    return square_name(sr, sc) + square_name(er, ec)
+
+
+def uci_to_move(text):
+    # Promotion suffix is accepted but ignored (board auto-queens)
+    return parse_square(text[0:2]), parse_square(text[2:4])
+
+
+def legal_moves(board, color):
+    moves = []
+    for (sr, sc), (er, ec) in board.generate_pseudolegal_moves(color):
+        if not board.would_be_in_check(color, sr, sc, er, ec):
+            moves.append(((sr, sc), (er, ec)))
+    return moves
+
+
+def move_to_san(board, move, color=None):
+    # SAN for a legal move of `color` (defaults to the side to move); board is left unchanged
+    color = color or board.current_turn
+    (sr, sc), (er, ec) = move
+    piece = board.get_piece(sr, sc)
+    target = board.get_piece(er, ec)
+
+    if isinstance(piece, King) and abs(ec - sc) == 2:
+        san = 'O-O' if ec == 6 else 'O-O-O'
+    elif isinstance(piece, Pawn):
+        san = f"{FILES[sc]}x{square_name(er, ec)}" if target else square_name(er, ec)
+        if er in (0, 7):
+            san += '=Q'
+    else:
+        # Disambiguate between same-type pieces that can reach the target square
+        rivals = [s for s, e in legal_moves(board, color)
+                  if e == (er, ec) and s != (sr, sc) and board.get_piece(*s).name == piece.name]
+        disambig = ''
+        if rivals:
+            if all(c != sc for _, c in rivals):
+                disambig = FILES[sc]
+            elif all(r != sr for r, _ in rivals):
+                disambig = str(8 - sr)
+            else:
+                disambig = square_name(sr, sc)
+        san = PIECE_LETTERS[piece.name] + disambig + ('x' if target else '') + square_name(er, ec)
+
+    opponent = 'black' if color == 'white' else 'white'
+    board.make_move(sr, sc, er, ec, switch_turn=False, validate=False)
+    try:
+        if board.is_in_check(opponent):
+            san += '+' if board.has_legal_move(opponent) else '#'
+    finally:
+        board.unmake_move(switch_turn=False)
+    return san
+
+
+def san_to_move(board, san, color=None):
+    # Resolve a SAN token to ((sr, sc), (er, ec)) for `color`; None if it is not legal.
+    # Under-promotions are rejected because the board always promotes to a queen.
+    color = color or board.current_turn
+    san = san.rstrip('+#!?')
+    home = 7 if color == 'white' else 0
+    if san in ('O-O', '0-0'):
+        move = ((home, 4), (home, 6))
+        return move if move in legal_moves(board, color) else None
+    if san in ('O-O-O', '0-0-0'):
+        move = ((home, 4), (home, 2))
+        return move if move in legal_moves(board, color) else None
+
+    if '=' in san:
+        san, promo = san.split('=', 1)
+        if promo[:1].upper() != 'Q':
+            return None
+    elif len(san) > 2 and san[-1] in 'NBRQ' and san[-2] in '18':
+        if san[-1] != 'Q':
+            return None
+        san = san[:-1]
+    name = 'pawn'
+    if san[:1] and san[0] in LETTER_PIECES:
+        name = LETTER_PIECES[san[0]]
+        san = san[1:]
+    san = san.replace('x', '')
+    if len(san) < 2:
+        return None
+    try:
+        dest = parse_square(san[-2:])
+    except (ValueError, IndexError):
+        return None
+    hint = san[:-2]
+
+    matches = []
+    for (sr, sc), end in legal_moves(board, color):
+        if end != dest or board.get_piece(sr, sc).name != name:
+            continue
+        if hint:
+            from_name = square_name(sr, sc)
+            if any(ch not in from_name for ch in hint):
+                continue
+        matches.append(((sr, sc), end))
+    return matches[0] if len(matches) == 1 else None
@@ -1,10 +1,17 @@
 # pieces.py
 
+# Piece index order used by the shared engine tables (tables.py, zobrist.py)
+PIECE_NAMES = ('pawn', 'knight', 'bishop', 'rook', 'queen', 'king')
+
 class Piece:
+    index = None
+
     def __init__(self, color):
         self.color = color
         self.name = ''
         self.has_moved = False
+        # Integer piece code: white 0..5, black 6..11 (see PIECE_NAMES)
+        self.code = None if self.index is None else self.index + (6 if color == 'black' else 0)
 
     def __deepcopy__(self, memo):
         # Create a new instance of the piece
@@ -18,6 +25,8 @@ class Piece:
         raise NotImplementedError("This method should be implemented by subclasses.")
 
 class Pawn(Piece):
+    index = 0
+
     def __init__(self, color):
         super().__init__(color)
         self.name = 'pawn'
@@ -44,6 +53,8 @@ class Pawn(Piece):
         return False
 
 class Rook(Piece):
+    index = 3
+
     def __init__(self, color):
         super().__init__(color)
         self.name = 'rook'
@@ -65,6 +76,8 @@ class Rook(Piece):
             return True
 
 class Knight(Piece):
+    index = 1
+
     def __init__(self, color):
         super().__init__(color)
         self.name = 'knight'
@@ -79,6 +92,8 @@ class Knight(Piece):
         return False
 
 class Bishop(Piece):
+    index = 2
+
     def __init__(self, color):
         super().__init__(color)
         self.name = 'bishop'
@@ -97,6 +112,8 @@ class Bishop(Piece):
         return False
 
 class Queen(Piece):
+    index = 4
+
     def __init__(self, color):
         super().__init__(color)
         self.name = 'queen'
@@ -128,6 +145,8 @@ class Queen(Piece):
         return False
 
 class King(Piece):
+    index = 5
+
     def __init__(self, color):
         super().__init__(color)
         self.name = 'king'
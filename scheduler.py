@@ -0,0 +1,332 @@
+# scheduler.py
+# Fair-share scheduling of engine searches for many concurrent games.
+#
+#   scheduler = SearchScheduler(workers=4)
+#   job = scheduler.submit(board, priority='interactive', time_ms=1500, depth=6)
+#   ...                      # poll job.done() each frame
+#   move = job.move          # or job.result(timeout) for the SearchInfo
+#
+# Searches run in a fixed pool of search_worker processes. Queued jobs are
+# grouped by priority class; classes share the pool in proportion to their
+# weight (stride scheduling on a per-class virtual time) and jobs within a
+# class run earliest deadline first. A job whose deadline is about to pass
+# jumps the queue.
+#
+# When a job starts it gets a slice of its requested time that shrinks with
+# load: its weighted share of the pool among all queued and running jobs,
+# never beyond the time left before its deadline and never below MIN_SLICE_MS.
+# Its depth limit is lowered by one ply per DEPTH_FACTOR-fold cut in time, so
+# a busy pool plays shallower moves on time instead of deep moves late. While
+# jobs are waiting, a running search that has used up its current fair share
+# is stopped and returns the move of its last completed iteration.
+import bisect
+import collections
+import itertools
+import math
+import os
+import threading
+import time
+from concurrent.futures import Future
+
+from search_worker import SearchWorker
+
+# Class weights: a class gets this share of the pool relative to the others
+PRIORITIES = {'interactive': 4, 'normal': 2, 'background': 1}
+MIN_SLICE_MS = 50
+# Time kept back from a deadline for dispatch and result delivery
+DEADLINE_MARGIN_MS = 30
+# A job this close to its deadline is started before any fair-share choice
+URGENT_MS = 200
+# Fraction of a fair share granted when the pool is overloaded, leaving room
+# for dispatch overhead and jobs still arriving
+LOAD_HEADROOM = 0.8
+# Running searches are checked against their current fair share this often
+TICK_MS = 10
+# Roughly the effective branching factor: each DEPTH_FACTOR-fold cut in
+# search time costs one ply
+DEPTH_FACTOR = 3
+MIN_DEPTH = 1
+# Latency percentiles are taken over this many most recent jobs per class
+LATENCY_WINDOW = 1000
+
+
+class SearchJob:
+    def __init__(self, job_id, board, priority, time_ms, depth, nodes, deadline):
+        self.id = job_id
+        self.priority = priority
+        self.fen = board.to_fen()
+        # Keys since the last irreversible move, for repetition draws
+        self.history = board.key_history[len(board.key_history) - board.halfmove_clock:]
+        self.time_ms = time_ms
+        self.depth = depth
+        self.nodes = nodes
+        self.submitted = time.monotonic()
+        self.deadline = deadline
+        self.started = None
+        self.limits = None      # the limits actually granted
+        self.degraded = False
+        self.info = None        # latest SearchInfo
+        self.cancelled = False
+        self.stopping = False   # stopped early by time slicing
+        self.future = Future()
+
+    def done(self):
+        return self.future.done()
+
+    def result(self, timeout=None):
+        # Final SearchInfo (None if the position has no moves); raises
+        # CancelledError for a job stopped by SearchScheduler.cancel
+        return self.future.result(timeout)
+
+    @property
+    def move(self):
+        # Best move once done (None while searching, if cancelled or failed)
+        if not self.future.done() or self.future.cancelled() or self.future.exception():
+            return None
+        info = self.future.result()
+        return info.move if info else None
+
+
+class SearchScheduler:
+    def __init__(self, workers=None, priorities=PRIORITIES, cache=None, nnue=None):
+        self.worker_count = workers or os.cpu_count() or 1
+        self.priorities = dict(priorities)
+        self.options = {'cache': cache, 'nnue': nnue}
+        # Re-entrant: future callbacks run under it and may submit again
+        self._lock = threading.RLock()
+        self._ids = itertools.count(1)
+        self.queues = {name: [] for name in self.priorities}   # sorted by (deadline, id)
+        self.vtime = {name: 0.0 for name in self.priorities}
+        self.running = {}
+        self.workers = []
+        self.idle = collections.deque()
+        self.closed = False
+        self.counts = collections.Counter()
+        self.latency = {name: collections.deque(maxlen=LATENCY_WINDOW) for name in self.priorities}
+        self.wait = {name: collections.deque(maxlen=LATENCY_WINDOW) for name in self.priorities}
+        for i in range(self.worker_count):
+            self._spawn(i)
+        self._monitor = threading.Thread(target=self._watch, name='search-scheduler', daemon=True)
+        self._monitor.start()
+
+    def _spawn(self, index):
+        worker = SearchWorker(index, self.options, self._on_message)
+        if index < len(self.workers):
+            self.workers[index] = worker
+        else:
+            self.workers.append(worker)
+        self.idle.append(worker)
+
+    def close(self):
+        with self._lock:
+            self.closed = True
+            workers, self.workers = self.workers, []
+            pending = [job for queue in self.queues.values() for job in queue] + list(self.running.values())
+            for queue in self.queues.values():
+                queue.clear()
+            self.running.clear()
+        for job in pending:
+            job.future.cancel()
+        for worker in workers:
+            worker.stop()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ---------- submission ----------
+
+    def submit(self, board, priority='normal', time_ms=1500, depth=None, nodes=None, deadline_ms=None):
+        # Queues a search for the side to move. time_ms is the time the caller
+        # would like to spend, deadline_ms (default time_ms) when the move is
+        # due, both from now.
+        if priority not in self.priorities:
+            raise ValueError(f"unknown priority {priority!r}")
+        deadline = time.monotonic() + (deadline_ms if deadline_ms is not None else time_ms) / 1000
+        with self._lock:
+            if self.closed:
+                raise RuntimeError('scheduler is closed')
+            job = SearchJob(next(self._ids), board, priority, time_ms, depth, nodes, deadline)
+            queue = self.queues[priority]
+            if not queue:
+                # A class returning from idle starts level with the busiest
+                # class instead of spending credit it saved while idle
+                active = [self.vtime[name] for name, q in self.queues.items() if q]
+                self.vtime[priority] = max(self.vtime[priority], min(active, default=0.0))
+            bisect.insort(queue, job, key=lambda j: (j.deadline, j.id))
+            self.counts['submitted'] += 1
+            self._dispatch()
+        return job
+
+    def cancel(self, job):
+        with self._lock:
+            queue = self.queues[job.priority]
+            if job in queue:
+                queue.remove(job)
+                job.future.cancel()
+                self.counts['cancelled'] += 1
+                return True
+            if job.id in self.running:
+                job.cancelled = job.stopping = True
+                self._worker_of(job).cancel(job.id)
+                return True
+        return False
+
+    def _worker_of(self, job):
+        return next(w for w in self.workers if w.job is job)
+
+    # ---------- dispatch ----------
+
+    def _next_job(self, now):
+        queued = [q for q in self.queues.values() if q]
+        if not queued:
+            return None
+        # Deadline about to pass: earliest deadline first over all classes
+        urgent = min(queued, key=lambda q: q[0].deadline)
+        if urgent[0].deadline - now < URGENT_MS / 1000:
+            return urgent.pop(0)
+        name = min((n for n, q in self.queues.items() if q),
+                   key=lambda n: (self.vtime[n], -self.priorities[n]))
+        return self.queues[name].pop(0)
+
+    def _fair_slice(self, job, now):
+        # The job's weighted share of the pool over all queued and running
+        # jobs, as milliseconds of its requested time
+        weight = self.priorities[job.priority]
+        demand = sum(self.priorities[j.priority] for j in self.running.values())
+        demand += sum(self.priorities[n] * len(q) for n, q in self.queues.items())
+        if job.id not in self.running:
+            demand += weight
+        share = self.worker_count * weight / demand
+        if share < 1:
+            share *= LOAD_HEADROOM
+        left_ms = (job.deadline - now) * 1000 - DEADLINE_MARGIN_MS
+        return max(MIN_SLICE_MS, min(job.time_ms * min(1.0, share), left_ms))
+
+    def _grant(self, job, now):
+        # Time slice and depth for a job about to start
+        slice_ms = self._fair_slice(job, now)
+        limits = {'movetime_ms': int(slice_ms)}
+        if job.nodes:
+            limits['nodes'] = job.nodes
+        cut = job.time_ms / slice_ms
+        if job.depth:
+            plies = int(math.log(cut, DEPTH_FACTOR)) if cut > 1 else 0
+            limits['depth'] = max(MIN_DEPTH, job.depth - plies)
+        job.degraded = cut > 1.05
+        self.vtime[job.priority] += slice_ms / self.priorities[job.priority]
+        return limits
+
+    def _dispatch(self):
+        now = time.monotonic()
+        while self.idle:
+            job = self._next_job(now)
+            if job is None:
+                break
+            worker = self.idle.popleft()
+            job.started = now
+            job.limits = self._grant(job, now)
+            self.counts['degraded'] += job.degraded
+            self.running[job.id] = job
+            worker.start(job, job.id, job.fen, history=job.history, limits=job.limits)
+
+    def _watch(self):
+        # Time slicing: a running search that has used its fair share of the
+        # pool, which shrinks as jobs arrive, is stopped and returns the best
+        # move of its last completed iteration (so not before it has one)
+        while not self.closed:
+            time.sleep(TICK_MS / 1000)
+            with self._lock:
+                if not any(self.queues.values()):
+                    continue
+                now = time.monotonic()
+                for job in self.running.values():
+                    if job.stopping or job.info is None:
+                        continue
+                    if (now - job.started) * 1000 >= self._fair_slice(job, now):
+                        job.stopping = True
+                        self.counts['preempted'] += 1
+                        self._worker_of(job).cancel(job.id)
+
+    # ---------- results ----------
+
+    def _on_message(self, worker, message):
+        with self._lock:
+            if message is None:
+                self._on_exit(worker)
+                return
+            kind, job_id, payload = message
+            job = self.running.get(job_id)
+            if job is None:
+                return
+            if kind == 'info':
+                job.info = payload
+                return
+            del self.running[job_id]
+            worker.job = None
+            if not self.closed:
+                self.idle.append(worker)
+            self._record(job)
+            if kind == 'done':
+                last, _ = payload
+                if job.cancelled:
+                    # Cancelled while running: resolved like a queued cancel,
+                    # the partial result is discarded
+                    self.counts['cancelled'] += 1
+                    job.future.cancel()
+                else:
+                    self.counts['completed'] += 1
+                    job.future.set_result(last)
+            else:
+                self.counts['failed'] += 1
+                job.future.set_exception(RuntimeError(payload))
+            self._dispatch()
+
+    def _on_exit(self, worker):
+        if self.closed or worker not in self.workers:
+            return
+        self.counts['worker_restarts'] += 1
+        if worker in self.idle:
+            self.idle.remove(worker)
+        job = worker.job
+        if job is not None and self.running.pop(job.id, None) is not None:
+            self.counts['failed'] += 1
+            self._record(job)
+            job.future.set_exception(RuntimeError('worker process exited'))
+        self._spawn(worker.index)
+        self._dispatch()
+
+    def _record(self, job):
+        # Latency samples; the class is charged the time actually used
+        # instead of the slice it was granted
+        now = time.monotonic()
+        used_ms = (now - job.started) * 1000
+        self.vtime[job.priority] += (used_ms - job.limits['movetime_ms']) / self.priorities[job.priority]
+        self.latency[job.priority].append((now - job.submitted) * 1000)
+        self.wait[job.priority].append((job.started - job.submitted) * 1000)
+        if now > job.deadline:
+            self.counts['deadline_missed'] += 1
+
+    # ---------- metrics ----------
+
+    def metrics(self):
+        # Queue depth per class, job counters and latency percentiles (ms,
+        # submission to result and submission to start) over recent jobs
+        with self._lock:
+            return {
+                'workers': len(self.workers),
+                'running': len(self.running),
+                'queued': {name: len(q) for name, q in self.queues.items()},
+                **self.counts,
+                'latency_ms': {name: _percentiles(v) for name, v in self.latency.items() if v},
+                'wait_ms': {name: _percentiles(v) for name, v in self.wait.items() if v},
+            }
+
+
+def _percentiles(samples):
+    ordered = sorted(samples)
+    n = len(ordered)
+    pick = lambda p: round(ordered[min(n - 1, int(p * n))], 1)
+    return {'p50': pick(0.5), 'p95': pick(0.95), 'p99': pick(0.99), 'max': round(ordered[-1], 1)}
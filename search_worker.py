@@ -0,0 +1,126 @@
+# search_worker.py
+# Persistent search worker processes shared by server.py and scheduler.py.
+#
+# Each worker keeps one AI per side to move (and so its transposition table)
+# between jobs. A job is (job_id, fen, moves, history, limits): the position is
+# the FEN plus UCI moves, `history` the position keys before the FEN (for
+# repetition draws) and `limits` a dict of SearchLimits fields. The worker
+# sends ('info', job_id, SearchInfo) for every result iter_search yields, then
+# ('done', job_id, (last SearchInfo or None, cancelled)) or
+# ('error', job_id, message). A shared job-id slot acts as the stop event, so a
+# late cancel can never stop the next job.
+import multiprocessing
+import threading
+
+from board import Board
+from limits import SearchLimits
+from notation import uci_to_move
+
+# Worker AIs clear their transposition table beyond this many entries
+WORKER_TT_LIMIT = 2000000
+
+
+def parse_position(fen, moves=(), history=()):
+    # -> Board after the moves; ValueError on bad input or illegal moves
+    board = Board() if fen in (None, 'startpos') else Board.from_fen(fen)
+    kings = [piece.color for row in board.board for piece in row if piece and piece.index == 5]
+    if sorted(kings) != ['black', 'white']:
+        raise ValueError('position needs exactly one king per side')
+    board.key_history = list(history)
+    for uci in moves or ():
+        try:
+            (sr, sc), (er, ec) = uci_to_move(uci)
+        except (ValueError, IndexError):
+            raise ValueError(f"bad move {uci!r}") from None
+        if not board.make_move(sr, sc, er, ec):
+            raise ValueError(f"illegal move {uci!r}")
+    return board
+
+
+class _JobCancel:
+    # stop_event for SearchLimits: set while the shared cancel slot holds this job
+    def __init__(self, slot, job_id):
+        self.slot = slot
+        self.job_id = job_id
+
+    def is_set(self):
+        return self.slot.value == self.job_id
+
+
+def worker_main(conn, cancel_slot, options):
+    from ai import AI
+    engines = {}
+    cache = None
+    if options.get('cache'):
+        from analysis_cache import AnalysisCache
+        cache = AnalysisCache(options['cache'])
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            break
+        if task is None:
+            break
+        job_id, fen, moves, history, limits = task
+        try:
+            board = parse_position(fen, moves, history)
+            color = board.current_turn
+            ai = engines.get(color)
+            if ai is None:
+                ai = engines[color] = AI(color)
+                ai.analysis_cache = cache
+                if options.get('nnue'):
+                    ai.load_nnue(options['nnue'])
+            if len(ai.transposition_table) > WORKER_TT_LIMIT:
+                ai.transposition_table.clear()
+            search_limits = SearchLimits(**limits, stop_event=_JobCancel(cancel_slot, job_id))
+            last = None
+            for info in ai.iter_search(board, search_limits):
+                last = info
+                conn.send(('info', job_id, info))
+            conn.send(('done', job_id, (last, cancel_slot.value == job_id)))
+        except Exception as exc:  # reported to the caller, the worker keeps serving
+            conn.send(('error', job_id, f"{type(exc).__name__}: {exc}"))
+    if cache is not None:
+        cache.close()
+
+
+class SearchWorker:
+    # Parent-side handle: a reader thread passes every message (None once the
+    # process has exited) to on_message(worker, message)
+    def __init__(self, index, options, on_message):
+        self.index = index
+        self.job = None
+        self.cancel_slot = multiprocessing.Value('q', -1, lock=False)
+        self.conn, child = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=worker_main, args=(child, self.cancel_slot, options),
+                                               name=f'engine-worker-{index}', daemon=True)
+        self.process.start()
+        child.close()
+        self._reader = threading.Thread(target=self._read, args=(on_message,), daemon=True)
+        self._reader.start()
+
+    def _read(self, on_message):
+        try:
+            while True:
+                on_message(self, self.conn.recv())
+        except (EOFError, OSError):
+            on_message(self, None)
+
+    def start(self, job, job_id, fen, moves=(), history=(), limits=None):
+        # `job` is the caller's own record, kept in self.job while it runs
+        self.job = job
+        self.cancel_slot.value = -1
+        self.conn.send((job_id, fen, list(moves), list(history), limits or {}))
+
+    def cancel(self, job_id):
+        self.cancel_slot.value = job_id
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(timeout=2)
+        if self.process.is_alive():
+            self.process.terminate()
@@ -0,0 +1,462 @@
+# server.py
+# Asyncio engine server: JSON lines over TCP or a Unix socket, searches run in
+# a pool of persistent worker processes (each keeps its AI and transposition
+# table between requests).
+#
+#   python server.py --port 8765 --workers 4
+#   python server.py --unix /tmp/chess-engine.sock
+#
+# Requests (one JSON object per line; "id" is chosen by the client):
+#   {"id": 1, "type": "analyse", "fen": "...", "moves": ["e2e4"], "depth": 8}
+#   {"id": 2, "type": "bestmove", "fen": "startpos", "movetime_ms": 500}
+#   {"id": 1, "type": "cancel"}
+#   {"id": 3, "type": "stats"}
+# Limits: depth, nodes, movetime_ms (capped by the server; a request without
+# any gets default_movetime_ms). "analyse" streams {"type": "info"} per
+# completed depth or bound change; both end with {"type": "bestmove"}. Scores
+# are centipawns from the side to move. Errors come back as {"type": "error"}.
+#
+# Identical searches in flight (same position, repetition history and
+# limits) are coalesced: later requests subscribe to the running job, get the
+# latest info at once and the same final result. A job is only stopped when
+# every subscriber has cancelled. The pending queue and the jobs per client
+# are bounded (requests beyond them are rejected), and info messages to a
+# client that does not read are dropped rather than buffered without limit.
+import argparse
+import asyncio
+import collections
+import itertools
+import json
+import os
+import sys
+
+from notation import move_to_uci
+from search_worker import SearchWorker, parse_position
+
+MAX_LINE = 1 << 16
+
+
+def _info_dict(info):
+    return {'depth': info.depth, 'score': info.score, 'bound': info.bound,
+            'move': move_to_uci(info.move) if info.move else None,
+            'pv': [move_to_uci(m) for m in info.pv], 'nodes': info.nodes, 'time_ms': info.time_ms}
+
+
+class _Job:
+    def __init__(self, job_id, key, fen, moves, limits):
+        self.id = job_id
+        self.key = key
+        self.fen = fen
+        self.moves = moves
+        self.limits = limits
+        self.subscribers = []   # (client, request id, stream)
+        self.last_info = None
+        self.worker = None
+
+
+class _Client:
+    # Outgoing messages go through a bounded buffer drained by a writer task,
+    # so a slow reader never blocks the server. While the buffer is full no
+    # further requests are read from the client (see wait_for_room), so TCP
+    # flow control pushes back on it.
+    def __init__(self, writer, max_buffer):
+        self.writer = writer
+        self.max_buffer = max_buffer
+        self.buffer = collections.deque()
+        self.ready = asyncio.Event()
+        self.room = asyncio.Event()
+        self.room.set()
+        self.requests = {}      # request id -> job
+        self.dropped = 0
+        self.closed = False
+        self.task = asyncio.ensure_future(self._drain())
+
+    def send(self, message, droppable=False):
+        if self.closed:
+            return
+        if droppable and len(self.buffer) >= self.max_buffer:
+            self.dropped += 1
+            return
+        self.buffer.append(message)
+        self.ready.set()
+        if len(self.buffer) >= self.max_buffer:
+            self.room.clear()
+
+    async def wait_for_room(self):
+        await self.room.wait()
+
+    async def _drain(self):
+        try:
+            while True:
+                while not self.buffer:
+                    self.ready.clear()
+                    await self.ready.wait()
+                message = self.buffer.popleft()
+                if len(self.buffer) < self.max_buffer:
+                    self.room.set()
+                if message is None:
+                    break
+                self.writer.write(json.dumps(message).encode() + b'\n')
+                await self.writer.drain()
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            self.closed = True
+            self.room.set()
+            self.writer.close()
+
+    def close(self):
+        self.send(None)
+
+
+class EngineServer:
+    def __init__(self, workers=None, max_queue=256, max_client_jobs=16, max_depth=64,
+                 max_movetime_ms=60000, default_movetime_ms=1000, client_buffer=256, cache=None, nnue=None):
+        self.worker_count = workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self.max_client_jobs = max_client_jobs
+        self.max_depth = max_depth
+        self.max_movetime_ms = max_movetime_ms
+        self.default_movetime_ms = default_movetime_ms
+        self.client_buffer = client_buffer
+        self.options = {'cache': cache, 'nnue': nnue}
+        self.workers = []
+        self.idle = collections.deque()
+        self.pending = collections.deque()
+        self.jobs = {}          # job id -> job (queued or running)
+        self.by_key = {}        # coalescing key -> job
+        self._ids = itertools.count(1)
+        self.loop = None
+        self.server = None
+        self.stats = collections.Counter()
+
+    # ---------- lifecycle ----------
+
+    async def start(self, host='127.0.0.1', port=8765, path=None):
+        self.loop = asyncio.get_running_loop()
+        for i in range(self.worker_count):
+            self._spawn(i)
+        if path:
+            self.server = await asyncio.start_unix_server(self._handle, path=path, limit=MAX_LINE)
+        else:
+            self.server = await asyncio.start_server(self._handle, host, port, limit=MAX_LINE)
+        return self.server
+
+    def _spawn(self, index):
+        worker = SearchWorker(index, self.options, self._post)
+        if index < len(self.workers):
+            self.workers[index] = worker
+        else:
+            self.workers.append(worker)
+        self.idle.append(worker)
+
+    def _post(self, worker, message):
+        # From a worker's reader thread; after shutdown the loop may be gone
+        try:
+            self.loop.call_soon_threadsafe(self._on_worker_message, worker, message)
+        except RuntimeError:
+            pass
+
+    async def close(self):
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+        workers, self.workers = self.workers, []
+        await self.loop.run_in_executor(None, lambda: [w.stop() for w in workers])
+
+    # ---------- connections ----------
+
+    async def _handle(self, reader, writer):
+        client = _Client(writer, self.client_buffer)
+        self.stats['connections'] += 1
+        try:
+            while not client.closed:
+                await client.wait_for_room()
+                if client.closed:
+                    break
+                try:
+                    line = await reader.readline()
+                except (ValueError, asyncio.LimitOverrunError):
+                    client.send({'type': 'error', 'message': 'request line too long'})
+                    break
+                except ConnectionError:
+                    break
+                if not line:
+                    break
+                if line.strip():
+                    self._request(client, line)
+        finally:
+            for request_id in list(client.requests):
+                self._cancel(client, request_id, notify=False)
+            client.close()
+
+    def _request(self, client, line):
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError('request must be a JSON object')
+        except ValueError as exc:
+            client.send({'type': 'error', 'message': f'bad request: {exc}'})
+            return
+        request_id = request.get('id')
+        kind = request.get('type')
+        if request_id is not None and (not isinstance(request_id, (str, int)) or isinstance(request_id, bool)):
+            client.send({'type': 'error', 'message': 'id must be a string, an integer or null'})
+            return
+        if kind in ('analyse', 'analyze', 'bestmove'):
+            self._submit(client, request_id, request, stream=kind != 'bestmove')
+        elif kind == 'cancel':
+            if not self._cancel(client, request_id):
+                client.send({'id': request_id, 'type': 'error', 'message': 'no such request'})
+        elif kind == 'stats':
+            client.send({'id': request_id, 'type': 'stats', **self.metrics()})
+        elif kind == 'ping':
+            client.send({'id': request_id, 'type': 'pong'})
+        else:
+            client.send({'id': request_id, 'type': 'error', 'message': f'unknown request type {kind!r}'})
+
+    def _limits(self, request):
+        limits = {}
+        depth = request.get('depth')
+        if depth is not None:
+            limits['depth'] = max(1, min(int(depth), self.max_depth))
+        if request.get('nodes') is not None:
+            limits['nodes'] = max(1, int(request['nodes']))
+        movetime = request.get('movetime_ms')
+        if movetime is None and not limits:
+            movetime = self.default_movetime_ms
+        # Every search is bounded in time so a worker cannot be held forever
+        limits['movetime_ms'] = max(1, min(int(movetime or self.max_movetime_ms), self.max_movetime_ms))
+        return limits
+
+    def _submit(self, client, request_id, request, stream):
+        def reject(message):
+            self.stats['rejected'] += 1
+            client.send({'id': request_id, 'type': 'error', 'message': message})
+
+        if request_id in client.requests:
+            return reject('request id already in use')
+        if len(client.requests) >= self.max_client_jobs:
+            return reject('too many requests in flight for this connection')
+        moves = request.get('moves') or []
+        if not isinstance(moves, list) or not all(isinstance(move, str) for move in moves):
+            return reject('moves must be a list of UCI strings')
+        fen = request.get('fen')
+        if fen is not None and not isinstance(fen, str):
+            return reject('fen must be a string')
+        try:
+            board = parse_position(fen, moves)
+            limits = self._limits(request)
+        except (ValueError, TypeError, OverflowError) as exc:
+            return reject(str(exc))
+        if not board.has_legal_move(board.current_turn):
+            client.send({'id': request_id, 'type': 'bestmove', 'move': None, 'ponder': None,
+                         'status': board.status()})
+            return
+        # Same placement, castling rights, side to move, repetition-relevant
+        # history and limits give the same search
+        history = tuple(board.key_history[len(board.key_history) - board.halfmove_clock:])
+        key = (board.hash, board.current_turn, board.halfmove_clock, history, tuple(sorted(limits.items())))
+        job = self.by_key.get(key)
+        if job is not None:
+            self.stats['coalesced'] += 1
+            if job.last_info and stream:
+                client.send({'id': request_id, 'type': 'info', **job.last_info}, droppable=True)
+        else:
+            if len(self.pending) >= self.max_queue and not self.idle:
+                return reject('server busy')
+            job = _Job(next(self._ids), key, fen, moves, limits)
+            self.jobs[job.id] = job
+            self.by_key[key] = job
+            self.pending.append(job)
+        job.subscribers.append((client, request_id, stream))
+        client.requests[request_id] = job
+        self.stats['requests'] += 1
+        self._dispatch()
+
+    def _cancel(self, client, request_id, notify=True):
+        job = client.requests.pop(request_id, None)
+        if job is None:
+            return False
+        job.subscribers = [s for s in job.subscribers if not (s[0] is client and s[1] == request_id)]
+        if notify:
+            final = {'id': request_id, 'type': 'bestmove', 'cancelled': True}
+            final.update({k: job.last_info[k] for k in ('move', 'score', 'depth')} if job.last_info else {'move': None})
+            client.send(final)
+        if not job.subscribers:
+            self.stats['cancelled'] += 1
+            self.by_key.pop(job.key, None)
+            if job.worker is not None:
+                job.worker.cancel(job.id)
+            else:
+                self.pending.remove(job)
+                del self.jobs[job.id]
+        return True
+
+    # ---------- workers ----------
+
+    def _dispatch(self):
+        while self.pending and self.idle:
+            job = self.pending.popleft()
+            worker = self.idle.popleft()
+            job.worker = worker
+            worker.start(job, job.id, job.fen, job.moves, limits=job.limits)
+
+    def _on_worker_message(self, worker, message):
+        if message is None:
+            self._on_worker_exit(worker)
+            return
+        kind, job_id, payload = message
+        job = self.jobs.get(job_id)
+        if kind == 'info':
+            if job is None:
+                return
+            job.last_info = payload = _info_dict(payload)
+            for client, request_id, stream in job.subscribers:
+                if stream:
+                    client.send({'id': request_id, 'type': 'info', **payload}, droppable=True)
+            return
+        # 'done' or 'error': the worker is free again
+        if kind == 'done':
+            last, cancelled = payload
+            payload = _info_dict(last) if last else {'move': None, 'pv': []}
+            payload['ponder'] = payload['pv'][1] if len(payload['pv']) > 1 else None
+            payload['cancelled'] = cancelled
+        self._finish(job, kind, payload)
+        if worker.job is not None and worker.job.id == job_id:
+            worker.job = None
+            if worker in self.workers:
+                self.idle.append(worker)
+        self._dispatch()
+
+    def _finish(self, job, kind, payload):
+        if job is None:
+            return
+        self.jobs.pop(job.id, None)
+        if self.by_key.get(job.key) is job:
+            del self.by_key[job.key]
+        self.stats['completed' if kind == 'done' else 'failed'] += 1
+        for client, request_id, _ in job.subscribers:
+            client.requests.pop(request_id, None)
+            if kind == 'done':
+                client.send({'id': request_id, 'type': 'bestmove', **payload})
+            else:
+                client.send({'id': request_id, 'type': 'error', 'message': payload})
+        job.subscribers = []
+
+    def _on_worker_exit(self, worker):
+        if worker not in self.workers:
+            return  # shutting down
+        self.stats['worker_restarts'] += 1
+        if worker in self.idle:
+            self.idle.remove(worker)
+        if worker.job is not None:
+            self._finish(worker.job, 'error', 'worker process exited')
+        self._spawn(worker.index)
+        self._dispatch()
+
+    def metrics(self):
+        return {'workers': len(self.workers), 'idle': len(self.idle), 'queued': len(self.pending),
+                'running': len(self.jobs) - len(self.pending), **self.stats}
+
+
+class EngineClient:
+    # Minimal asyncio client for the server's JSON-lines protocol
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self._ids = itertools.count(1)
+        self._queues = {}
+        self._task = asyncio.ensure_future(self._read())
+
+    @classmethod
+    async def connect(cls, host='127.0.0.1', port=8765, path=None):
+        if path:
+            reader, writer = await asyncio.open_unix_connection(path, limit=MAX_LINE)
+        else:
+            reader, writer = await asyncio.open_connection(host, port, limit=MAX_LINE)
+        return cls(reader, writer)
+
+    async def _read(self):
+        while True:
+            line = await self.reader.readline()
+            if not line:
+                break
+            message = json.loads(line)
+            queue = self._queues.get(message.get('id'))
+            if queue is not None:
+                queue.put_nowait(message)
+        for queue in self._queues.values():
+            queue.put_nowait({'type': 'error', 'message': 'connection closed'})
+
+    async def request(self, kind, request_id=None, **fields):
+        request_id = next(self._ids) if request_id is None else request_id
+        self._queues.setdefault(request_id, asyncio.Queue())
+        self.writer.write(json.dumps({'id': request_id, 'type': kind, **fields}).encode() + b'\n')
+        await self.writer.drain()
+        return request_id
+
+    async def responses(self, request_id):
+        # Yields messages for a request until its final bestmove/error/stats
+        queue = self._queues[request_id]
+        while True:
+            message = await queue.get()
+            yield message
+            if message['type'] != 'info':
+                del self._queues[request_id]
+                return
+
+    async def analyse(self, fen='startpos', moves=(), **limits):
+        request_id = await self.request('analyse', fen=fen, moves=list(moves), **limits)
+        async for message in self.responses(request_id):
+            yield message
+
+    async def bestmove(self, fen='startpos', moves=(), **limits):
+        request_id = await self.request('bestmove', fen=fen, moves=list(moves), **limits)
+        async for message in self.responses(request_id):
+            result = message
+        return result
+
+    async def cancel(self, request_id):
+        self.writer.write(json.dumps({'id': request_id, 'type': 'cancel'}).encode() + b'\n')
+        await self.writer.drain()
+
+    async def close(self):
+        self.writer.close()
+        self._task.cancel()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='JSON-lines engine server backed by a worker process pool')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', metavar='PATH', help='listen on a Unix socket instead of TCP')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--max-queue', type=int, default=256)
+    parser.add_argument('--max-client-jobs', type=int, default=16)
+    parser.add_argument('--max-movetime', type=int, default=60000, help='ms cap per search')
+    parser.add_argument('--cache', metavar='PATH', help='shared analysis_cache.py SQLite file')
+    parser.add_argument('--nnue', metavar='PATH', help='NNUE network file for the workers')
+    args = parser.parse_args(argv)
+
+    async def serve():
+        server = EngineServer(args.workers, args.max_queue, args.max_client_jobs,
+                              max_movetime_ms=args.max_movetime, cache=args.cache, nnue=args.nnue)
+        listener = await server.start(args.host, args.port, args.unix)
+        where = args.unix or f"{args.host}:{args.port}"
+        print(f"engine server on {where} with {server.worker_count} workers", flush=True)
+        try:
+            async with listener:
+                await listener.serve_forever()
+        finally:
+            await server.close()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,140 @@
+# tables.py
+# Evaluation tables shared by every AI instance.
+#
+# Built once at import as flat, immutable 64-entry tuples indexed by square
+# (row * 8 + col, row 0 = rank 8) and by integer piece code (Piece.code:
+# white pawn..king = 0..5, black = 6..11). Black's tables are the white ones
+# mirrored vertically, so lookups need no per-call mirroring. Forked worker
+# processes share them copy-on-write.
+#
+# If eval_weights.json (written by tune.py) sits next to this module, its
+# piece-square tables and (mg, eg) term weights replace the defaults below.
+import json
+import os
+
+from pieces import PIECE_NAMES
+
+WEIGHTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'eval_weights.json')
+
+PIECE_INDEX = {name: i for i, name in enumerate(PIECE_NAMES)}
+# Material (centipawns) and game-phase weight, indexed by piece index (0..5)
+PIECE_VALUE = (100, 320, 330, 500, 900, 0)
+PHASE_WEIGHT = (0, 1, 1, 2, 4, 0)
+MAX_PHASE = 24
+# Move ordering: MVV-LVA values (king counted high as an attacker) and a
+# small bias towards moving the more forcing pieces first
+ORDER_VALUE = (100, 320, 330, 500, 900, 20000)
+ATTACKER_BIAS = (1, 3, 3, 5, 6, 0)
+# Evaluation terms as (midgame, endgame) centipawns per occurrence
+BISHOP_PAIR = (30, 40)
+DOUBLED_PAWN = (20, 10)       # penalty per extra pawn on a file
+ISOLATED_PAWN = (15, 10)      # penalty per file with isolated pawns
+ROOK_OPEN_FILE = (20, 15)
+ROOK_SEMI_OPEN_FILE = (10, 8)
+TERM_NAMES = ('bishop_pair', 'doubled_pawn', 'isolated_pawn', 'rook_open_file', 'rook_semi_open_file')
+# King safety (midgame): centipawns per attacked king-zone square by attacker
+# piece index, scaled by a percentage for the number of attacking pieces
+KING_ATTACK_WEIGHT = (0, 8, 8, 12, 20, 0)
+KING_ATTACK_SCALE = (0, 0, 50, 75, 88, 94, 97, 99)
+
+# Midgame piece-square tables (values in centipawns)
+_PAWN = [
+    [0,   0,   0,   0,   0,   0,   0,   0],
+    [50,  50,  50,  50,  50,  50,  50,  50],
+    [10,  10,  20,  30,  30,  20,  10,  10],
+    [5,   5,  10,  25,  25,  10,   5,   5],
+    [0,   0,   0,  20,  20,   0,   0,   0],
+    [5,  -5, -10,   0,   0, -10, -5,   5],
+    [5,  10,  10, -20, -20,  10, 10,   5],
+    [0,   0,   0,   0,   0,   0,  0,   0],
+]
+_KNIGHT = [
+    [-50, -40, -30, -30, -30, -30, -40, -50],
+    [-40, -20,   0,   0,   0,   0, -20, -40],
+    [-30,   0,  10,  15,  15,  10,   0, -30],
+    [-30,   5,  15,  20,  20,  15,   5, -30],
+    [-30,   0,  15,  20,  20,  15,   0, -30],
+    [-30,   5,  10,  15,  15,  10,   5, -30],
+    [-40, -20,   0,   5,   5,   0, -20, -40],
+    [-50, -40, -30, -30, -30, -30, -40, -50],
+]
+_BISHOP = [
+    [-20, -10, -10, -10, -10, -10, -10, -20],
+    [-10,   5,   0,   0,   0,   0,   5, -10],
+    [-10,  10,  10,  10,  10,  10,  10, -10],
+    [-10,   0,  10,  10,  10,  10,   0, -10],
+    [-10,   5,   5,  10,  10,   5,   5, -10],
+    [-10,   0,   5,  10,  10,   5,   0, -10],
+    [-10,   0,   0,   0,   0,   0,   0, -10],
+    [-20, -10, -10, -10, -10, -10, -10, -20],
+]
+_ROOK = [
+    [0,   0,  5,  10,  10,   5,   0,   0],
+    [-5,  0,  0,   0,   0,   0,   0,  -5],
+    [-5,  0,  0,   0,   0,   0,   0,  -5],
+    [-5,  0,  0,   0,   0,   0,   0,  -5],
+    [-5,  0,  0,   0,   0,   0,   0,  -5],
+    [-5,  0,  0,   0,   0,   0,   0,  -5],
+    [5,  10, 10,  10,  10,  10,  10,  5],
+    [0,   0,  0,   0,   0,   0,   0,   0],
+]
+_QUEEN = [
+    [-20, -10, -10, -5, -5, -10, -10, -20],
+    [-10,   0,   5,  0,  0,   0,   0, -10],
+    [-10,   5,   5,  5,  5,   5,   0, -10],
+    [ -5,   0,   5,  5,  5,   5,   0,  -5],
+    [  0,   0,   5,  5,  5,   5,   0,  -5],
+    [-10,   5,   5,  5,  5,   5,   0, -10],
+    [-10,   0,   5,  0,  0,   0,   0, -10],
+    [-20, -10, -10, -5, -5, -10, -10, -20],
+]
+_KING_MG = [
+    [-30, -40, -40, -50, -50, -40, -40, -30],
+    [-30, -40, -40, -50, -50, -40, -40, -30],
+    [-30, -40, -40, -50, -50, -40, -40, -30],
+    [-30, -40, -40, -50, -50, -40, -40, -30],
+    [-20, -30, -30, -40, -40, -30, -30, -20],
+    [-10, -20, -20, -20, -20, -20, -20, -10],
+    [ 20,  20,   0,   0,   0,   0,  20,  20],
+    [ 20,  30,  10,   0,   0,  10,  30,  20],
+]
+# Endgame king table (centralization)
+_KING_EG = [
+    [-50, -40, -30, -20, -20, -30, -40, -50],
+    [-40, -20,   0,  10,  10,   0, -20, -40],
+    [-30,  10,  20,  30,  30,  20,  10, -30],
+    [-20,  20,  40,  50,  50,  40,  20, -20],
+    [-20,  20,  40,  50,  50,  40,  20, -20],
+    [-30,  10,  20,  30,  30,  20,  10, -30],
+    [-40, -20,   0,  10,  10,   0, -20, -40],
+    [-50, -40, -30, -20, -20, -30, -40, -50],
+]
+
+
+def _flatten(tables):
+    # 12 tuples of 64: white tables as written, black mirrored
+    white = [tuple(v for row in tables[name] for v in row) for name in PIECE_NAMES]
+    black = [tuple(v for row in tables[name][::-1] for v in row) for name in PIECE_NAMES]
+    return tuple(white + black)
+
+
+TABLES_MG = {'pawn': _PAWN, 'knight': _KNIGHT, 'bishop': _BISHOP, 'rook': _ROOK, 'queen': _QUEEN, 'king': _KING_MG}
+TABLES_EG = {'pawn': _PAWN, 'knight': _KNIGHT, 'bishop': _BISHOP, 'rook': _ROOK, 'queen': _QUEEN, 'king': _KING_EG}
+
+
+def load_weights(path):
+    # {"pst_mg": {name: 8x8}, "pst_eg": {name: 8x8}, "bishop_pair": [mg, eg], ...}
+    with open(path) as f:
+        return json.load(f)
+
+
+if os.path.exists(WEIGHTS_PATH):
+    _tuned = load_weights(WEIGHTS_PATH)
+    TABLES_MG = dict(TABLES_MG, **_tuned.get('pst_mg', {}))
+    TABLES_EG = dict(TABLES_EG, **_tuned.get('pst_eg', {}))
+    BISHOP_PAIR, DOUBLED_PAWN, ISOLATED_PAWN, ROOK_OPEN_FILE, ROOK_SEMI_OPEN_FILE = (
+        tuple(_tuned.get(name, default)) for name, default in zip(
+            TERM_NAMES, (BISHOP_PAIR, DOUBLED_PAWN, ISOLATED_PAWN, ROOK_OPEN_FILE, ROOK_SEMI_OPEN_FILE)))
+
+PST_MG = _flatten(TABLES_MG)
+PST_EG = _flatten(TABLES_EG)
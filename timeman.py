@@ -0,0 +1,67 @@
+# timeman.py
+# Clock handling and per-move time allocation.
+#
+# allocate_time() turns a clock state into a soft limit (do not start another
+# iteration after this) and a hard limit (abort the search). The search then
+# scales the soft limit by best-move stability and score trend.
+import time
+
+# Assumed number of moves left in sudden-death games
+DEFAULT_MOVES_TO_GO = 30
+# Safety margin for process/GUI latency (ms)
+MOVE_OVERHEAD_MS = 30
+
+
+def allocate_time(time_left_ms, increment_ms=0, moves_to_go=None, overhead_ms=MOVE_OVERHEAD_MS):
+    # Returns (soft_ms, hard_ms)
+    usable = max(1.0, time_left_ms - overhead_ms)
+    mtg = min(moves_to_go or DEFAULT_MOVES_TO_GO, 50)
+    soft = usable / mtg + 0.75 * increment_ms
+    if mtg <= 1:
+        hard = usable * 0.9
+    else:
+        hard = min(usable * 0.5, soft * 4)
+    soft = min(soft, hard)
+    return soft, hard
+
+
+class Clock:
+    # A chess clock: base time plus increment, optionally N moves per period
+    def __init__(self, base_ms, increment_ms=0, moves_per_period=None):
+        self.base_ms = base_ms
+        self.increment_ms = increment_ms
+        self.moves_per_period = moves_per_period
+        self.remaining_ms = base_ms
+        self.moves_to_go = moves_per_period
+        self._started = None
+
+    @classmethod
+    def parse(cls, text):
+        # "60+0.5" (seconds + increment) or "40/120" / "40/120+1" (moves/seconds)
+        moves = None
+        if '/' in text:
+            moves, text = text.split('/', 1)
+            moves = int(moves)
+        base, _, inc = text.partition('+')
+        return cls(float(base) * 1000, float(inc or 0) * 1000, moves)
+
+    def start(self):
+        self._started = time.monotonic()
+
+    def stop(self):
+        # Charges the elapsed time; returns False if the flag fell
+        elapsed = (time.monotonic() - self._started) * 1000
+        self._started = None
+        self.remaining_ms -= elapsed
+        if self.remaining_ms < 0:
+            return False
+        self.remaining_ms += self.increment_ms
+        if self.moves_per_period:
+            self.moves_to_go -= 1
+            if self.moves_to_go == 0:
+                self.moves_to_go = self.moves_per_period
+                self.remaining_ms += self.base_ms
+        return True
+
+    def allocate(self):
+        return allocate_time(self.remaining_ms, self.increment_ms, self.moves_to_go)
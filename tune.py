@@ -0,0 +1,344 @@
+# tune.py
+# Texel-style tuning of the evaluation weights.
+#
+# The tuned weights are the (mg, eg) material + piece-square values of every
+# piece on every square and the bishop-pair, doubled/isolated pawn and rook
+# file terms. Everything else evaluate_board adds (passed pawns, pawn shield,
+# centre, mobility and king attacks, check) is folded into a fixed
+# per-position base score.
+#
+# Feature extraction runs once and caches a sparse feature matrix as .npy
+# files; tuning memory-maps them and runs full-batch Adam on the sigmoid
+# (Texel) loss, so repeated runs over millions of positions only pay for the
+# vectorized passes:
+#   python tune.py positions games.pgn positions.txt   (optional, e.g. match.py output)
+#   python tune.py extract positions.txt cache/
+#   python tune.py tune cache/ --epochs 300            (writes eval_weights.json)
+#
+# Position files hold one "<FEN> <result>" per line; the result is 1-0, 0-1,
+# 1/2-1/2 or a White score in [0, 1] and may be quoted (EPD: c9 "1-0";).
+# Quiet positions give the best results. NumPy is required.
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import sys
+import time
+
+import numpy as np
+
+from board import Board
+import batch_eval
+import tables
+from tables import PIECE_VALUE, MAX_PHASE, TERM_NAMES
+from pieces import PIECE_NAMES
+
+RESULTS = {'1-0': 1.0, '0-1': 0.0, '1/2-1/2': 0.5, '1/2': 0.5}
+
+# Sparse (ELL) layout: each position stores WIDTH (feature index, coefficient)
+# pairs, padded with the always-zero PAD weight. Features are piece index * 64
+# + square (Black's squares mirrored, coefficient -1), then the terms.
+PIECE_SLOTS = 32
+N_PST = 6 * 64
+PAD = N_PST + len(TERM_NAMES)
+N_WEIGHTS = PAD + 1
+WIDTH = PIECE_SLOTS + len(TERM_NAMES)
+
+EXTRACT_CHUNK = 4096
+TUNE_CHUNK = 1 << 20
+CACHE_FILES = ('index', 'coef', 'phase', 'base', 'result')
+
+
+def parse_line(line):
+    # "<FEN> <result>" -> (fen, white score); None for blank/comment lines
+    line = line.split('#', 1)[0]
+    tokens = line.replace('"', ' ').replace(';', ' ').replace('[', ' ').replace(']', ' ').split()
+    if not tokens:
+        return None
+    if len(tokens) < 3:
+        raise ValueError(f"Expected '<FEN> <result>': {line.strip()!r}")
+    raw = tokens[-1]
+    result = RESULTS.get(raw)
+    if result is None:
+        result = float(raw)
+    fields = tokens[:4]
+    for token in tokens[4:6]:
+        if not token.isdigit():
+            break
+        fields.append(token)
+    return ' '.join(fields), result
+
+
+def read_positions(path):
+    with open(path) as f:
+        for number, line in enumerate(f, 1):
+            try:
+                parsed = parse_line(line)
+            except ValueError as exc:
+                raise ValueError(f"{path}:{number}: {exc}") from None
+            if parsed:
+                yield parsed
+
+
+def initial_weights():
+    # Current tables as an (N_WEIGHTS, 2) float array (material included)
+    weights = np.zeros((N_WEIGHTS, 2))
+    for i in range(6):
+        weights[i * 64:(i + 1) * 64, 0] = np.array(tables.PST_MG[i]) + PIECE_VALUE[i]
+        weights[i * 64:(i + 1) * 64, 1] = np.array(tables.PST_EG[i]) + PIECE_VALUE[i]
+    weights[N_PST:PAD] = batch_eval.TERMS
+    return weights
+
+
+def extract_chunk(chunk):
+    # Runs in a worker process: features for a list of (fen, result)
+    from ai import AI
+    boards = [Board.from_fen(fen) for fen, _ in chunk]
+    n = len(boards)
+    planes = batch_eval.planes_from_boards(boards)
+    mg, eg, phase = batch_eval.evaluate_planes(planes)
+
+    index = np.full((n, WIDTH), PAD, dtype=np.int16)
+    coef = np.zeros((n, WIDTH), dtype=np.int8)
+    rows, codes, squares = np.nonzero(planes)
+    slots = np.arange(len(rows)) - np.searchsorted(rows, rows)
+    if len(slots) and slots.max() >= PIECE_SLOTS:
+        raise ValueError(f"More than {PIECE_SLOTS} pieces in a position")
+    black = codes >= 6
+    index[rows, slots] = np.where(black, (codes - 6) * 64 + (squares ^ 56), codes * 64 + squares)
+    coef[rows, slots] = np.where(black, -1, 1)
+    index[:, PIECE_SLOTS:] = np.arange(N_PST, PAD)
+    coef[:, PIECE_SLOTS:] = batch_eval.term_features(planes)
+
+    # Base = everything the tuned weights do not cover
+    weights = initial_weights()
+    covered = (weights[index] * coef[:, :, None]).sum(axis=1)
+    base_mg = mg - covered[:, 0]
+    base_eg = eg - covered[:, 1]
+    ai = AI('white')
+    extra = np.zeros(n)
+    for k, board in enumerate(boards):
+        attack_mg, extra[k] = ai.attack_terms(board)
+        base_mg[k] += attack_mg
+    base = (base_mg * phase + base_eg * (MAX_PHASE - phase)) / MAX_PHASE + extra
+    result = np.array([r for _, r in chunk], dtype=np.float32)
+    return index, coef, phase.astype(np.uint8), base.astype(np.float32), result
+
+
+def _chunks(positions, size):
+    chunk = []
+    for item in positions:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def extract(path, cache_dir, jobs=None):
+    # Writes the feature cache for a position file; returns the position count
+    count = sum(1 for _ in read_positions(path))
+    os.makedirs(cache_dir, exist_ok=True)
+    shapes = {'index': ((count, WIDTH), np.int16), 'coef': ((count, WIDTH), np.int8),
+              'phase': ((count,), np.uint8), 'base': ((count,), np.float32),
+              'result': ((count,), np.float32)}
+    arrays = {name: np.lib.format.open_memmap(os.path.join(cache_dir, name + '.npy'), mode='w+',
+                                              dtype=dtype, shape=shape)
+              for name, (shape, dtype) in shapes.items()}
+    start = 0
+    with multiprocessing.Pool(jobs or os.cpu_count() or 1) as pool:
+        for parts in pool.imap(extract_chunk, _chunks(read_positions(path), EXTRACT_CHUNK)):
+            end = start + len(parts[0])
+            for name, part in zip(CACHE_FILES, parts):
+                arrays[name][start:end] = part
+            start = end
+    for array in arrays.values():
+        array.flush()
+    stat = os.stat(path)
+    with open(os.path.join(cache_dir, 'meta.json'), 'w') as f:
+        json.dump({'source': os.path.abspath(path), 'size': stat.st_size, 'mtime': stat.st_mtime,
+                   'count': count, 'width': WIDTH, 'weights': N_WEIGHTS}, f, indent=1)
+    return count
+
+
+def load_cache(cache_dir):
+    with open(os.path.join(cache_dir, 'meta.json')) as f:
+        meta = json.load(f)
+    if meta['width'] != WIDTH or meta['weights'] != N_WEIGHTS:
+        raise ValueError(f"{cache_dir} was extracted with a different feature layout; re-run extract")
+    return {name: np.load(os.path.join(cache_dir, name + '.npy'), mmap_mode='r') for name in CACHE_FILES}
+
+
+class TexelTuner:
+    def __init__(self, data, weights=None, k=None):
+        self.data = data
+        self.count = len(data['result'])
+        self.weights = initial_weights() if weights is None else weights
+        self.k = k if k is not None else self.fit_k()
+
+    def chunks(self):
+        for start in range(0, self.count, TUNE_CHUNK):
+            end = start + TUNE_CHUNK
+            yield tuple(np.asarray(self.data[name][start:end]) for name in CACHE_FILES)
+
+    def evaluate(self, index, coef, phase, base, weights=None):
+        # White-perspective evaluation of a chunk (float centipawns)
+        w = self.weights if weights is None else weights
+        mg = (w[index, 0] * coef).sum(axis=1)
+        eg = (w[index, 1] * coef).sum(axis=1)
+        return (mg * phase + eg * (MAX_PHASE - phase)) / MAX_PHASE + base
+
+    def sigmoid(self, score, k=None):
+        return 1.0 / (1.0 + 10.0 ** (-(self.k if k is None else k) * score / 400.0))
+
+    def loss(self, k=None):
+        total = 0.0
+        for index, coef, phase, base, result in self.chunks():
+            total += ((result - self.sigmoid(self.evaluate(index, coef, phase, base), k)) ** 2).sum()
+        return total / self.count
+
+    def fit_k(self, low=0.1, high=3.0, iterations=30):
+        # Golden-section search for the scaling constant that best fits the
+        # current weights
+        ratio = (math.sqrt(5) - 1) / 2
+        a, b = low, high
+        c, d = b - ratio * (b - a), a + ratio * (b - a)
+        fc, fd = self.loss(c), self.loss(d)
+        for _ in range(iterations):
+            if fc < fd:
+                b, d, fd = d, c, fc
+                c = b - ratio * (b - a)
+                fc = self.loss(c)
+            else:
+                a, c, fc = c, d, fd
+                d = a + ratio * (b - a)
+                fd = self.loss(d)
+        return (a + b) / 2
+
+    def gradient(self):
+        grad = np.zeros((N_WEIGHTS, 2))
+        total = 0.0
+        scale = self.k * math.log(10) / 400.0
+        for index, coef, phase, base, result in self.chunks():
+            s = self.sigmoid(self.evaluate(index, coef, phase, base))
+            total += ((result - s) ** 2).sum()
+            # d(loss)/d(eval) per position, then spread over its features
+            d = 2.0 * (s - result) * s * (1.0 - s) * scale
+            flat = index.ravel()
+            contrib = coef * d[:, None]
+            grad[:, 0] += np.bincount(flat, (contrib * (phase / MAX_PHASE)[:, None]).ravel(), N_WEIGHTS)
+            grad[:, 1] += np.bincount(flat, (contrib * (1.0 - phase / MAX_PHASE)[:, None]).ravel(), N_WEIGHTS)
+        grad[PAD] = 0
+        return grad / self.count, total / self.count
+
+    def tune(self, epochs=300, lr=1.0, beta1=0.9, beta2=0.999, report=None):
+        # Full-batch Adam; lr is roughly the largest per-epoch step in centipawns
+        m = np.zeros_like(self.weights)
+        v = np.zeros_like(self.weights)
+        for epoch in range(1, epochs + 1):
+            grad, loss = self.gradient()
+            m = beta1 * m + (1 - beta1) * grad
+            v = beta2 * v + (1 - beta2) * grad * grad
+            m_hat = m / (1 - beta1 ** epoch)
+            v_hat = v / (1 - beta2 ** epoch)
+            self.weights -= lr * m_hat / (np.sqrt(v_hat) + 1e-12)
+            if report:
+                report(epoch, loss)
+        return self.loss()
+
+
+def weights_to_json(weights):
+    # Tuned weights in the format tables.py loads (PSTs without material)
+    rounded = np.rint(weights).astype(int)
+    out = {'pst_mg': {}, 'pst_eg': {}}
+    for i, name in enumerate(PIECE_NAMES):
+        for phase, key in ((0, 'pst_mg'), (1, 'pst_eg')):
+            values = rounded[i * 64:(i + 1) * 64, phase] - PIECE_VALUE[i]
+            out[key][name] = values.reshape(8, 8).tolist()
+    for j, name in enumerate(TERM_NAMES):
+        out[name] = rounded[N_PST + j].tolist()
+    return out
+
+
+def write_weights(weights, path):
+    data = weights_to_json(weights)
+    with open(path, 'w') as f:
+        f.write('{\n')
+        items = []
+        for key in ('pst_mg', 'pst_eg'):
+            tables_text = ',\n'.join(f'  "{name}": {json.dumps(rows)}' for name, rows in data[key].items())
+            items.append(f'"{key}": {{\n{tables_text}\n}}')
+        items += [f'"{name}": {json.dumps(data[name])}' for name in TERM_NAMES]
+        f.write(',\n'.join(items) + '\n}\n')
+
+
+def pgn_positions(pgn_paths, skip=8):
+    # (fen, result) for every position of decisive or drawn games after the
+    # first `skip` plies, leaving out positions with the side to move in check
+    from book import read_pgn_games
+    from notation import san_to_move
+    for path in pgn_paths:
+        for headers, sans in read_pgn_games(path):
+            result = RESULTS.get(headers.get('Result'))
+            if result is None:
+                continue
+            board = Board.from_fen(headers['FEN']) if headers.get('FEN') else Board()
+            for ply, san in enumerate(sans):
+                color = board.current_turn
+                if ply >= skip and not board.is_in_check(color):
+                    yield board.to_fen(), result
+                move = san_to_move(board, san, color)
+                if move is None:
+                    break
+                board.make_move(*move[0], *move[1], validate=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Texel tuning of the evaluation weights')
+    sub = parser.add_subparsers(dest='cmd', required=True)
+    p = sub.add_parser('positions', help='write "<FEN> <result>" lines from PGN games')
+    p.add_argument('pgn', nargs='+')
+    p.add_argument('out')
+    p.add_argument('--skip', type=int, default=8, help='opening plies to leave out')
+    e = sub.add_parser('extract', help='extract and cache features for a position file')
+    e.add_argument('positions')
+    e.add_argument('cache')
+    e.add_argument('--jobs', type=int, default=os.cpu_count() or 1)
+    t = sub.add_parser('tune', help='tune weights on a feature cache')
+    t.add_argument('cache')
+    t.add_argument('--epochs', type=int, default=300)
+    t.add_argument('--lr', type=float, default=1.0)
+    t.add_argument('--k', type=float, help='sigmoid scale (fitted to the current weights if omitted)')
+    t.add_argument('--out', default=tables.WEIGHTS_PATH)
+    t.add_argument('--report', type=int, default=10, help='print the loss every N epochs')
+    args = parser.parse_args(argv)
+
+    if args.cmd == 'positions':
+        count = 0
+        with open(args.out, 'w') as f:
+            for fen, result in pgn_positions(args.pgn, args.skip):
+                f.write(f"{fen} {result}\n")
+                count += 1
+        print(f"{count} positions written to {args.out}")
+    elif args.cmd == 'extract':
+        start = time.time()
+        count = extract(args.positions, args.cache, args.jobs)
+        print(f"{count} positions extracted to {args.cache} in {time.time() - start:.1f}s")
+    else:
+        tuner = TexelTuner(load_cache(args.cache), k=args.k)
+        print(f"{tuner.count} positions, K = {tuner.k:.4f}, loss = {tuner.loss():.6f}")
+
+        def report(epoch, loss):
+            if args.report and epoch % args.report == 0:
+                print(f"epoch {epoch}: loss {loss:.6f}", flush=True)
+
+        loss = tuner.tune(args.epochs, args.lr, report=report)
+        write_weights(tuner.weights, args.out)
+        print(f"final loss {loss:.6f}; weights written to {args.out}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,36 @@
+# uicache.py
+# Bounded LRU cache for data the GUI derives from the current position.
+#
+# Game keys its entries by position hash and/or ply, so making or unmaking a
+# move simply changes the key: stale entries are never returned and drop out
+# of the cache once it is full.
+from collections import OrderedDict
+
+
+class LRUCache:
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, compute):
+        # Cached value for key, calling compute() and storing it on a miss
+        try:
+            value = self._data[key]
+        except KeyError:
+            self.misses += 1
+            value = compute()
+            self._data[key] = value
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+            return value
+        self.hits += 1
+        self._data.move_to_end(key)
+        return value
+
+    def clear(self):
+        self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
@@ -0,0 +1,26 @@
+# zobrist.py
+# Zobrist keys shared by Board's incremental position hash and the AI's
+# transposition table.
+#
+# Keys come from a private RNG so importing this module never touches the
+# global `random` state. The board hash covers piece placement and castling
+# rights only; side to move is implied by ply parity in the key history, and
+# the search adds SIDE_KEY for its own table keys.
+import random
+
+_rng = random.Random(0x2F6B1D)
+
+# Flat array indexed by Piece.code * 64 + square
+PIECE_KEYS = tuple(_rng.getrandbits(64) for _ in range(12 * 64))
+SIDE_KEY = _rng.getrandbits(64)  # white to move
+
+# Castling rights as a 4-bit mask: 1 = K, 2 = Q, 4 = k, 8 = q
+_RIGHT_KEYS = [_rng.getrandbits(64) for _ in range(4)]
+_castling = []
+for _mask in range(16):
+    _h = 0
+    for _bit in range(4):
+        if _mask & (1 << _bit):
+            _h ^= _RIGHT_KEYS[_bit]
+    _castling.append(_h)
+CASTLING_KEYS = tuple(_castling)